@@ -0,0 +1,80 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Fold case, punctuation and whitespace so trivially different phrasings share a key"""
+    folded = _PUNCTUATION.sub(" ", (question or "").lower())
+    return _WHITESPACE.sub(" ", folded).strip()
+
+
+class AnswerCache:
+    """Thread-safe LRU cache of formatted answers with a per-entry TTL.
+
+    Entries are keyed on the normalized question plus a data-version stamp, so
+    bumping the version (after a view refresh or a data load) makes every older
+    entry unreachable; stale entries are then aged out by LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, question: str, data_version):
+        return (normalize_question(question), data_version)
+
+    def get(self, question: str, data_version=None):
+        """Return the cached answer, or None on a miss or an expired entry"""
+        key = self._key(question, data_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            answer, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, question: str, answer: str, data_version=None):
+        """Store an answer, evicting the least recently used entries when full"""
+        if self.max_entries <= 0:
+            return
+
+        key = self._key(question, data_version)
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
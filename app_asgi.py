@@ -0,0 +1,168 @@
+"""ASGI version of app_postgres.py, answering /ask with AsyncIPLStatsChatbot.ask_async.
+
+One process keeps hundreds of questions in flight on a single event loop:
+
+    uvicorn app_asgi:app --host 0.0.0.0 --port 8080
+"""
+import contextlib
+import os
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Route
+
+from async_chatbot import AsyncIPLStatsChatbot
+from db import pool_stats
+from live_ingest import start_live_ingest
+from refresh_jobs import RefreshJobQueue
+
+# Load environment variables from .env file
+load_dotenv()
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'fullscreen_ui.html')
+
+# Initialize the async chatbot
+try:
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+
+    if not DATABASE_URL or not GROQ_API_KEY:
+        raise ValueError("Missing required environment variables: DATABASE_URL and GROQ_API_KEY must be set in .env file")
+
+    chatbot = AsyncIPLStatsChatbot(DATABASE_URL, GROQ_API_KEY)
+    print("✅ Async PostgreSQL Chatbot initialized successfully!")
+except Exception as e:
+    print(f"❌ Error initializing async PostgreSQL chatbot: {e}")
+    chatbot = None
+
+# Summary refreshes run on a background thread so /refresh returns immediately
+refresh_jobs = RefreshJobQueue(chatbot.refresh_materialized_views, chatbot.engine) if chatbot else None
+if refresh_jobs:
+    refresh_jobs.start_schedule()
+    # Live match stats from LIVE_FEED, answered from memory
+    start_live_ingest(chatbot)
+
+
+def not_initialized():
+    return JSONResponse({'error': 'Chatbot not initialized.'}, status_code=500)
+
+
+async def index(request):
+    return FileResponse(TEMPLATE_PATH)
+
+
+async def ask_question(request):
+    if not chatbot:
+        return JSONResponse({
+            'error': 'PostgreSQL chatbot not initialized. Please check the database connection.'
+        }, status_code=500)
+
+    try:
+        data = await request.json()
+        question = data.get('question', '').strip()
+
+        if not question:
+            return JSONResponse({'error': 'Please enter a valid question.'}, status_code=400)
+
+        answer = await chatbot.ask_async(question)
+
+        return JSONResponse({
+            'question': question,
+            'answer': answer
+        })
+
+    except Exception as e:
+        return JSONResponse({
+            'error': f'Error processing question: {str(e)}'
+        }, status_code=500)
+
+
+async def cache_stats(request):
+    """Endpoint to report answer and SQL cache hit/miss counters"""
+    if not chatbot:
+        return not_initialized()
+
+    return JSONResponse({
+        'answer_cache': chatbot.answer_cache.stats(),
+        'sql_cache': chatbot.sql_cache.stats(),
+        'semantic_cache': chatbot.semantic_cache.stats()
+    })
+
+
+async def prompt_stats(request):
+    """Endpoint to report LLM token counts and few-shot example retrieval"""
+    if not chatbot:
+        return not_initialized()
+
+    return JSONResponse({
+        'tokens': chatbot.prompt_builder.stats(),
+        'examples': chatbot.example_store.stats()
+    })
+
+
+async def get_pool_stats(request):
+    """Endpoint to report the asyncpg pool used by /ask, and the sync pool used for refreshes and fallbacks"""
+    if not chatbot:
+        return not_initialized()
+
+    return JSONResponse(dict(pool_stats(chatbot.async_engine), sync=pool_stats(chatbot.engine)))
+
+
+async def refresh_views(request):
+    """Endpoint to queue a summary refresh; poll /refresh/<job_id> for its status"""
+    if not chatbot:
+        return not_initialized()
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = {}
+    payload = payload or {}
+    options = {}
+    if payload.get('match_ids'):
+        options['match_ids'] = list(payload['match_ids'])
+    if payload.get('full'):
+        options['full'] = True
+    job = refresh_jobs.submit(**options)
+    return JSONResponse({
+        'message': 'Refresh queued.',
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': request.url_for('refresh_status', job_id=job['job_id']).path
+    }, status_code=202)
+
+
+async def refresh_status(request):
+    """Endpoint to report the status of a queued refresh"""
+    job_id = request.path_params['job_id']
+    job = refresh_jobs.get(job_id) if refresh_jobs else None
+    if job is None:
+        return JSONResponse({'error': f'Unknown refresh job {job_id}.'}, status_code=404)
+    return JSONResponse(job)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    if chatbot:
+        await chatbot.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/ask', ask_question, methods=['POST']),
+        Route('/cache-stats', cache_stats, methods=['GET']),
+        Route('/prompt-stats', prompt_stats, methods=['GET']),
+        Route('/pool-stats', get_pool_stats, methods=['GET']),
+        Route('/refresh', refresh_views, methods=['POST']),
+        Route('/refresh/{job_id}', refresh_status, methods=['GET'], name='refresh_status'),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=8080)
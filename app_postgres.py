@@ -1,5 +1,8 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, url_for
 from ipl_chatbot_enhanced import IPLStatsEnhancedChatbot
+from db import pool_stats
+from refresh_jobs import RefreshJobQueue
+from live_ingest import start_live_ingest
 import os
 from dotenv import load_dotenv
 
@@ -22,6 +25,13 @@ except Exception as e:
     print(f"❌ Error initializing Enhanced PostgreSQL chatbot: {e}")
     chatbot = None
 
+# Summary refreshes run on a background thread so /refresh returns immediately
+refresh_jobs = RefreshJobQueue(chatbot.refresh_materialized_views, chatbot.engine) if chatbot else None
+if refresh_jobs:
+    refresh_jobs.start_schedule()
+    # Live match stats from LIVE_FEED, answered from memory
+    start_live_ingest(chatbot)
+
 @app.route('/')
 def index():
     return render_template('fullscreen_ui.html')
@@ -53,17 +63,73 @@ def ask_question():
             'error': f'Error processing question: {str(e)}'
         }), 500
 
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Endpoint to report answer and SQL cache hit/miss counters"""
+    if not chatbot:
+        return jsonify({'error': 'Chatbot not initialized.'}), 500
+    
+    return jsonify({
+        'answer_cache': chatbot.answer_cache.stats(),
+        'sql_cache': chatbot.sql_cache.stats(),
+        'semantic_cache': chatbot.semantic_cache.stats()
+    })
+
+@app.route('/prompt-stats', methods=['GET'])
+def prompt_stats():
+    """Endpoint to report LLM token counts and few-shot example retrieval"""
+    if not chatbot:
+        return jsonify({'error': 'Chatbot not initialized.'}), 500
+    
+    return jsonify({
+        'tokens': chatbot.prompt_builder.stats(),
+        'examples': chatbot.example_store.stats()
+    })
+
+@app.route('/pool-stats', methods=['GET'])
+def get_pool_stats():
+    """Endpoint to report database connection pool occupancy"""
+    if not chatbot:
+        return jsonify({'error': 'Chatbot not initialized.'}), 500
+    
+    return jsonify(pool_stats(chatbot.engine))
+
+@app.route('/cancel', methods=['POST'])
+def cancel_queries():
+    """Endpoint to cancel SQL currently running for questions in this worker"""
+    if not chatbot:
+        return jsonify({'error': 'Chatbot not initialized.'}), 500
+    
+    cancelled = chatbot.query_guard.cancel_all()
+    return jsonify({'message': f'Cancelled {cancelled} running quer{"y" if cancelled == 1 else "ies"}.'})
+
 @app.route('/refresh', methods=['POST'])
 def refresh_views():
-    """Endpoint to refresh materialized views"""
+    """Endpoint to queue a summary refresh; poll /refresh/<job_id> for its status"""
     if not chatbot:
         return jsonify({'error': 'Chatbot not initialized.'}), 500
     
-    try:
-        chatbot.refresh_materialized_views()
-        return jsonify({'message': 'Materialized views refreshed successfully!'})
-    except Exception as e:
-        return jsonify({'error': f'Error refreshing views: {str(e)}'}), 500
+    payload = request.get_json(silent=True) or {}
+    options = {}
+    if payload.get('match_ids'):
+        options['match_ids'] = list(payload['match_ids'])
+    if payload.get('full'):
+        options['full'] = True
+    job = refresh_jobs.submit(**options)
+    return jsonify({
+        'message': 'Refresh queued.',
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': url_for('refresh_status', job_id=job['job_id'])
+    }), 202
+
+@app.route('/refresh/<job_id>', methods=['GET'])
+def refresh_status(job_id):
+    """Endpoint to report the status of a queued refresh"""
+    job = refresh_jobs.get(job_id) if refresh_jobs else None
+    if job is None:
+        return jsonify({'error': f'Unknown refresh job {job_id}.'}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8080)
\ No newline at end of file
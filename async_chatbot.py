@@ -0,0 +1,182 @@
+"""Non-blocking question answering for asyncio servers (see app_asgi.py).
+
+AsyncIPLStatsChatbot is the enhanced chatbot with an `ask_async` coroutine.
+The Groq call goes through AsyncGroq and SQL runs on an asyncpg AsyncEngine
+through AsyncQueryGuard, so a question waiting on the LLM holds neither a
+thread nor a database connection, and one process can keep hundreds of
+questions in flight with a small pool. Identical questions asked at the
+same time share one answer.
+
+Startup, caches, intent templates, prompts and formatting are shared with
+IPLStatsEnhancedChatbot, and the synchronous `ask` still works. The steps
+that remain blocking (the periodic data version check, reloading names after
+a data change, the standard fallback queries and the SQLite cache writes)
+run in worker threads.
+"""
+import asyncio
+import time
+
+from groq import AsyncGroq
+
+from answer_cache import normalize_question
+from db import get_async_engine
+from ipl_chatbot_enhanced import LLM_MODEL, IPLStatsEnhancedChatbot
+from query_guard import AsyncQueryGuard, QueryLimitError
+
+
+class AsyncIPLStatsChatbot(IPLStatsEnhancedChatbot):
+    def __init__(self, database_url: str, groq_api_key: str):
+        """Initialize the chatbot, plus the async Groq client and asyncpg engine used by ask_async"""
+        super().__init__(database_url, groq_api_key)
+        self.async_client = AsyncGroq(api_key=groq_api_key)
+        self.async_engine = get_async_engine(database_url)
+        self.async_query_guard = AsyncQueryGuard(self.async_engine)
+        self._in_flight = {}
+
+    async def _get_query_from_llm_async(self, user_question: str) -> str:
+        """Use the async Groq client to convert natural language to SQL query"""
+        # Names are reloaded from the database after a data change, so build the prompt off the loop
+        messages = await asyncio.to_thread(self._llm_messages, user_question)
+
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=0.1,
+                max_tokens=800
+            )
+
+            query_code = response.choices[0].message.content.strip()
+            self.prompt_builder.record_usage(messages, response, query_code)
+            return self._clean_llm_sql(query_code)
+
+        except Exception as e:
+            print(f"Error getting query from LLM: {e}")
+            return None
+
+    async def _execute_query_async(self, query_code: str, params: dict = None, generated: bool = False,
+                                   rewrite: bool = None):
+        """_execute_query on the async engine: same rewrite, cost gate and error handling"""
+        if rewrite is None:
+            rewrite = generated
+        if rewrite:
+            query_code = self._rewrite_query(query_code)
+
+        try:
+            print(f"Executing query: {query_code[:100]}...")
+            start_time = time.time()
+
+            result_df = await self.async_query_guard.run(query_code, params, check_cost=generated)
+
+            execution_time = time.time() - start_time
+            print(f"Query executed in {execution_time:.2f}s, returned {len(result_df)} rows")
+
+            return result_df
+
+        except QueryLimitError as e:
+            print(f"Query stopped by limits: {e}")
+            raise
+        except Exception as e:
+            print(f"Error executing query: {e}")
+            return None
+
+    async def _run_intent_async(self, question: str):
+        """Answer a recognized question shape from its parameterized template, or None"""
+        if self.intent_engine is None:
+            return None
+        intent = await asyncio.to_thread(self.intent_engine.match, question)
+        if intent is None:
+            return None
+        print(f"Matched intent {intent.name}: {intent.params}")
+
+        try:
+            result = await self._execute_query_async(intent.sql, intent.params, rewrite=True)
+        except QueryLimitError:
+            return None
+        if result is None or len(result) == 0:
+            return None
+        return result
+
+    async def _run_cached_query_async(self, question: str):
+        """Execute previously verified SQL for this question, if any"""
+        cached = await asyncio.to_thread(self._cached_sql, question)
+        if not cached:
+            return None
+        query_code, similar = cached
+
+        try:
+            result = await self._execute_query_async(query_code, generated=True)
+        except QueryLimitError:
+            result = None
+        if result is None or len(result) == 0:
+            await asyncio.to_thread(self._forget_sql, question, query_code)
+            return None
+
+        if not similar:
+            await asyncio.to_thread(self.sql_cache.put, question, query_code, len(result))
+        return result
+
+    async def ask_async(self, question: str) -> str:
+        """ask() for asyncio; concurrent identical questions wait on the same answer"""
+        key = normalize_question(question)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._answer_async(question))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            print(f"Joining in-flight question: {question}")
+        # A client that disconnects cancels its own wait, not the answer others are waiting for
+        return await asyncio.shield(task)
+
+    async def _answer_async(self, question: str) -> str:
+        print(f"\nQuestion: {question}")
+
+        # Live questions change ball by ball, so they bypass every cache
+        live = self.live_answer(question)
+        if live is not None:
+            return live
+
+        # Serve repeat questions straight from the answer cache
+        await asyncio.to_thread(self.check_data_version)
+        data_version = self.data_version
+        cached_answer = self.answer_cache.get(question, data_version)
+        if cached_answer is not None:
+            print("Answer served from cache")
+            return cached_answer
+
+        # Recognized question shapes skip the LLM; otherwise reuse SQL that already worked for this question
+        result = await self._run_intent_async(question)
+        if result is None:
+            result = await self._run_cached_query_async(question)
+
+        if result is None:
+            print("Generating SQL query...")
+
+            query_code = await self._get_query_from_llm_async(question)
+            if not query_code:
+                return await asyncio.to_thread(self._try_enhanced_fallback_queries, question)
+
+            # Execute the query, falling back to a known-good query if it trips the limits
+            try:
+                result = await self._execute_query_async(query_code, generated=True)
+            except QueryLimitError as e:
+                print("Primary query exceeded limits, trying fallback...")
+                fallback = await asyncio.to_thread(self._try_enhanced_fallback_queries, question)
+                return f"⚠️ {e} Showing the closest standard query instead.\n\n" + fallback
+
+            if result is None or len(result) == 0:
+                print("Primary query failed, trying enhanced fallback...")
+                return await asyncio.to_thread(self._try_enhanced_fallback_queries, question)
+
+            await asyncio.to_thread(self._remember_sql, question, query_code, len(result))
+
+        formatted_result = self._format_result(result, question)
+        self.answer_cache.put(question, formatted_result, data_version)
+        print(f"\nAnswer:\n{formatted_result}")
+        return formatted_result
+
+    async def aclose(self):
+        """Close the async HTTP client and database pool"""
+        await self.async_client.close()
+        await self.async_engine.dispose()
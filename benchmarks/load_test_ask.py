@@ -0,0 +1,133 @@
+"""Fire concurrent /ask requests at the Flask app and check the pool holds up.
+
+Start the app first (e.g. `gunicorn -w 4 --threads 25 app_postgres:app -b :8080`),
+then run:
+
+    python benchmarks/load_test_ask.py --url http://localhost:8080 --concurrency 100 --workers 4
+
+The run fails if any request errors or is answered with an error message, if
+any worker's pool timed out a checkout during the run, if /pool-stats ever
+reports more checked-out connections than DB_POOL_SIZE + DB_MAX_OVERFLOW
+allow, or if fewer than --workers worker processes were sampled.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Answers the bots give when a question could not be answered at all
+ERROR_ANSWERS = ("Sorry, I couldn't", "Sorry, I encountered an error")
+
+QUESTIONS = [
+    "Who are the top 10 run scorers in IPL history?",
+    "Best batters vs pace bowling in death overs",
+    "Top wicket takers in IPL 2024",
+    "Strike rate in death overs",
+    "Most economical bowlers in powerplay",
+]
+
+
+def post_question(base_url, question, timeout):
+    """(failure or None, latency) for one /ask request"""
+    body = json.dumps({'question': question}).encode('utf-8')
+    request = urllib.request.Request(f"{base_url}/ask", data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            answer = json.loads(response.read()).get('answer') or ''
+        failure = 'error answer' if answer.startswith(ERROR_ANSWERS) else None if answer else 'empty answer'
+    except urllib.error.HTTPError as e:
+        failure = f"HTTP {e.code}"
+    except Exception as e:
+        failure = type(e).__name__
+    return failure, time.perf_counter() - start
+
+
+def get_pool_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/pool-stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def pools(stats):
+    """The pools in a /pool-stats response: the app_asgi.py one nests its sync pool"""
+    return [stats] + ([stats['sync']] if 'sync' in stats else [])
+
+
+def sample_workers(base_url, workers, attempts=50):
+    """Latest /pool-stats of each worker, polling until `workers` distinct pids answered"""
+    seen = {}
+    for _ in range(attempts):
+        try:
+            stats = get_pool_stats(base_url)
+            seen[stats.get('pid')] = stats
+        except Exception:
+            pass
+        if len(seen) >= workers:
+            break
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=None, help='total requests (default: concurrency)')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes behind --url')
+    args = parser.parse_args()
+
+    total = args.requests or args.concurrency
+    pool_limit = int(os.getenv('DB_POOL_SIZE', '5')) + int(os.getenv('DB_MAX_OVERFLOW', '5'))
+    # Checkout timeouts are cumulative per worker, so compare against each worker's count before the run
+    timeouts_before = {pid: sum(pool.get('timeouts', 0) for pool in pools(stats))
+                       for pid, stats in sample_workers(args.url, args.workers).items()}
+    peak = {}
+    done = threading.Event()
+
+    def sample_pool():
+        while not done.is_set():
+            try:
+                stats = get_pool_stats(args.url)
+                checked_out = max(pool.get('checked_out', 0) for pool in pools(stats))
+                peak[stats.get('pid')] = max(peak.get(stats.get('pid'), 0), checked_out)
+            except Exception:
+                pass
+            time.sleep(0.1 / args.workers)
+
+    sampler = threading.Thread(target=sample_pool, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda i: post_question(args.url, QUESTIONS[i % len(QUESTIONS)], args.timeout),
+            range(total)
+        ))
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    after = sample_workers(args.url, max(args.workers, len(timeouts_before)))
+    timeouts = {pid: sum(pool.get('timeouts', 0) for pool in pools(stats)) - timeouts_before.get(pid, 0)
+                for pid, stats in after.items()}
+
+    latencies = sorted(latency for _, latency in results)
+    failures = [failure for failure, _ in results if failure]
+    sampled = set(peak) | set(after)
+    print(f"{total} requests, concurrency {args.concurrency}, {elapsed:.1f}s wall, {total / elapsed:.1f} req/s")
+    print(f"p50 {latencies[len(latencies) // 2]:.2f}s  p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}s  max {latencies[-1]:.2f}s")
+    print(f"failures: {len(failures)} {sorted(set(failures))}")
+    print(f"workers sampled: {len(sampled)} / {args.workers}")
+    for pid in sorted(sampled, key=str):
+        print(f"  worker {pid}: peak checked-out {peak.get(pid, 0)} / {pool_limit}, "
+              f"pool timeouts {timeouts.get(pid, 'not sampled after the run')}")
+
+    if (failures or len(sampled) < args.workers or any(peak_out > pool_limit for peak_out in peak.values())
+            or any(count > 0 for count in timeouts.values())):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Compare season-specific queries on partitioned ipl_balls against the original table.
+
+Run `python migrate_partitions.py --keep-old` first so ipl_balls_unpartitioned
+still exists, then:
+
+    python benchmarks/partition_pruning_bench.py --repeat 5 --year 2024
+
+Each query is run with EXPLAIN (ANALYZE, FORMAT JSON) against both tables and
+the median execution time and the number of ipl_balls relations actually
+scanned are reported.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dotenv import load_dotenv
+
+from db import get_engine
+from migrate_partitions import OLD_TABLE, is_fact_relation
+from query_guard import walk_plan
+
+QUERIES = {
+    'season top scorers': """
+        SELECT "batter", SUM("runs_batter") as total_runs, COUNT(*) as balls_faced,
+               ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) as strike_rate
+        FROM {table} WHERE "year" = {year} AND "batter" != '' AND "batter" IS NOT NULL
+        GROUP BY "batter" HAVING SUM("runs_batter") > 200 ORDER BY total_runs DESC LIMIT 12""",
+    'season wicket takers': """
+        SELECT "bowler", COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as wickets
+        FROM {table} WHERE "year" = {year} AND "bowler" != ''
+        GROUP BY "bowler" ORDER BY wickets DESC LIMIT 10""",
+    'season death overs': """
+        SELECT "batter", SUM("runs_batter") as death_runs, COUNT(*) as death_balls
+        FROM {table} WHERE "year" = {year} AND "over" >= 16 AND "batter" != ''
+        GROUP BY "batter" ORDER BY death_runs DESC LIMIT 10""",
+    'two seasons': """
+        SELECT "batting_team", SUM("runs_total") as runs
+        FROM {table} WHERE "year" IN ({year} - 1, {year})
+        GROUP BY "batting_team" ORDER BY runs DESC""",
+}
+
+
+def explain(conn, sql):
+    output = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}").scalar()
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]
+
+
+def measure(conn, sql, repeat):
+    times, relations = [], set()
+    for _ in range(repeat):
+        result = explain(conn, sql)
+        times.append(result['Execution Time'])
+        relations = {node.get('Relation Name') for node in walk_plan(result['Plan'])
+                     if node.get('Relation Name') and (is_fact_relation(node['Relation Name'])
+                                                      or node['Relation Name'] == OLD_TABLE)}
+    return statistics.median(times), len(relations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    print(f"{'query':<22} {'unpartitioned ms':>17} {'partitioned ms':>15} {'speedup':>8} {'relations':>10}")
+    with engine.connect() as conn:
+        for name, template in QUERIES.items():
+            before, _ = measure(conn, template.format(table=OLD_TABLE, year=args.year), args.repeat)
+            after, scanned = measure(conn, template.format(table='ipl_balls', year=args.year), args.repeat)
+            speedup = before / after if after else float('inf')
+            print(f"{name:<22} {before:>17.1f} {after:>15.1f} {speedup:>7.1f}x {scanned:>10}")
+
+
+if __name__ == '__main__':
+    main()
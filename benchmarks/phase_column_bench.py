@@ -0,0 +1,84 @@
+"""Compare death-overs queries filtered on "over" ranges against the "phase" column.
+
+Run `python derived_columns.py` first so ipl_balls has "phase" and the
+(phase, batter) and (phase, bowler) indexes, then:
+
+    python benchmarks/phase_column_bench.py --repeat 5
+
+Each query shape is run against ipl_balls directly (no summary views) with
+EXPLAIN (ANALYZE, FORMAT JSON), once with the original "over" predicate and
+once with the equivalent "phase" predicate. The median execution time and the
+indexes each plan used are reported.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dotenv import load_dotenv
+
+from db import get_engine
+from query_guard import walk_plan
+
+# {death} is replaced by an "over" range or the matching "phase" filter
+QUERIES = {
+    'death run scorers': """
+        SELECT "batter", SUM("runs_batter") as death_runs, COUNT(*) as death_balls
+        FROM ipl_balls WHERE {death} AND "batter" != ''
+        GROUP BY "batter" ORDER BY death_runs DESC LIMIT 10""",
+    'death vs pace': """
+        SELECT "batter", SUM("runs_batter") as runs FROM ipl_balls
+        WHERE {death} AND "bowl_kind" = 'pace' AND "batter" != ''
+        GROUP BY "batter" HAVING SUM("runs_batter") > 50 ORDER BY runs DESC LIMIT 10""",
+    'death economy': """
+        SELECT "bowler", ROUND((SUM("runs_total")::numeric / NULLIF(COUNT(*), 0)) * 6, 2) as economy
+        FROM ipl_balls WHERE {death} AND "bowler" != ''
+        GROUP BY "bowler" HAVING COUNT(*) >= 120 ORDER BY economy LIMIT 10""",
+    'one batter at the death': """
+        SELECT SUM("runs_batter") as runs, COUNT(*) as balls
+        FROM ipl_balls WHERE {death} AND "batter" = 'V Kohli'""",
+    'one bowler at the death': """
+        SELECT COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as wickets, COUNT(*) as balls
+        FROM ipl_balls WHERE {death} AND "bowler" = 'JJ Bumrah'""",
+}
+
+PREDICATES = {'over': '"over" >= 16', 'phase': '"phase" = 3'}
+
+
+def explain(conn, sql):
+    output = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}").scalar()
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]
+
+
+def measure(conn, sql, repeat):
+    times, indexes = [], set()
+    for _ in range(repeat):
+        result = explain(conn, sql)
+        times.append(result['Execution Time'])
+        indexes = {node['Index Name'] for node in walk_plan(result['Plan']) if node.get('Index Name')}
+    return statistics.median(times), indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    print(f"{'query':<26} {'over ms':>9} {'phase ms':>9} {'speedup':>8}  indexes (phase)")
+    with engine.connect() as conn:
+        for name, template in QUERIES.items():
+            before, _ = measure(conn, template.format(death=PREDICATES['over']), args.repeat)
+            after, indexes = measure(conn, template.format(death=PREDICATES['phase']), args.repeat)
+            speedup = before / after if after else float('inf')
+            print(f"{name:<26} {before:>9.1f} {after:>9.1f} {speedup:>7.1f}x  {', '.join(sorted(indexes)) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Measure semantic cache hit rate and lookup latency on a recorded question corpus.
+
+The corpus is line-delimited JSON of {"group": ..., "question": ...}; questions in
+the same group must be answerable by the same SQL. The first question of each
+group seeds the cache and the remaining phrasings are looked up against it.
+Records of {"near_miss_of": group, "question": ...} are worded like that group
+but need different SQL (spin for pace, worst for best, an added venue, ...);
+any hit on one is counted as a near-miss false hit. Names in the corpus are
+tagged with a resolver over CORPUS_NAMES, as EntityCatalog does in the apps.
+
+    python benchmarks/semantic_cache_bench.py --thresholds 0.6 0.7 0.8 0.85 0.9
+
+Recorded with the hashed n-gram vectorizer (53 questions, 12 groups, 20 near misses):
+
+    threshold  hit rate  false hit  near miss   p50 ms   p99 ms
+         0.60     34.1%       0.0%       0.0%    0.059    0.155
+         0.70     29.3%       0.0%       0.0%    0.057    0.155
+         0.80     14.6%       0.0%       0.0%    0.051    0.111
+         0.85      4.9%       0.0%       0.0%    0.051    0.118
+
+Without the slot check, near misses such as "vs spin" for "vs pace" (0.83) or an
+added "at Wankhede" (0.90) clear every threshold above and get the wrong SQL.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from entity_resolver import EntityResolver
+from semantic_cache import SemanticQueryCache, load_embedder
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'question_corpus.jsonl')
+CORPUS_NAMES = {
+    'player': ['Rashid Khan', 'V Kohli', 'JJ Bumrah'],
+    'team': ['Mumbai Indians', 'Chennai Super Kings'],
+    'venue': ['Wankhede Stadium, Mumbai', 'Eden Gardens, Kolkata'],
+}
+
+
+def load_corpus(path):
+    groups, near_misses = {}, []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if 'near_miss_of' in record:
+                    near_misses.append(record['question'])
+                else:
+                    groups.setdefault(record['group'], []).append(record['question'])
+    return groups, near_misses
+
+
+def run(groups, near_misses, threshold, embedder):
+    cache = SemanticQueryCache(embedder=embedder, threshold=threshold, tagger=EntityResolver(CORPUS_NAMES).tag)
+    for group, questions in groups.items():
+        cache.add(questions[0], f"-- sql for {group}")
+
+    correct = wrong = missed = 0
+    latencies = []
+    for group, questions in groups.items():
+        for question in questions[1:]:
+            start = time.perf_counter()
+            match = cache.lookup(question)
+            latencies.append(time.perf_counter() - start)
+            if match is None:
+                missed += 1
+            elif match[0] == f"-- sql for {group}":
+                correct += 1
+            else:
+                wrong += 1
+
+    near_miss_hits = sum(cache.lookup(question) is not None for question in near_misses)
+
+    latencies.sort()
+    total = correct + wrong + missed
+    return {
+        'threshold': threshold,
+        'lookups': total,
+        'hit_rate': correct / total,
+        'false_hit_rate': wrong / total,
+        'near_miss_hit_rate': near_miss_hits / len(near_misses) if near_misses else 0.0,
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--model', default=None, help='sentence-transformers model name (default: hashed n-grams)')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.6, 0.7, 0.75, 0.8, 0.85, 0.9])
+    args = parser.parse_args()
+
+    groups, near_misses = load_corpus(args.corpus)
+    embedder = load_embedder(args.model)
+    print(f"Embedder: {type(embedder).__name__}, {sum(len(q) for q in groups.values())} questions in {len(groups)} groups, "
+          f"{len(near_misses)} near misses")
+    print(f"{'threshold':>9} {'hit rate':>9} {'false hit':>10} {'near miss':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for threshold in args.thresholds:
+        r = run(groups, near_misses, threshold, embedder)
+        print(f"{r['threshold']:>9.2f} {r['hit_rate']:>9.1%} {r['false_hit_rate']:>10.1%} "
+              f"{r['near_miss_hit_rate']:>10.1%} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare table size and aggregate latency of the text table and the star schema.
+
+Run `python star_schema.py --keep-old` first so ipl_balls_text still exists,
+then:
+
+    python benchmarks/star_schema_bench.py --repeat 5
+
+Sizes include indexes and TOAST. Each aggregate is run with EXPLAIN (ANALYZE,
+FORMAT JSON) against ipl_balls_text and against the ipl_balls view over
+ipl_balls_fact, and the median execution times are compared.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dotenv import load_dotenv
+
+from db import get_engine
+from star_schema import DIMENSIONS, FACT_TABLE, OLD_TABLE, relation_size
+
+QUERIES = {
+    'top run scorers': """
+        SELECT "batter", SUM("runs_batter") as total_runs, COUNT(*) as balls_faced
+        FROM {table} WHERE "batter" != '' GROUP BY "batter" ORDER BY total_runs DESC LIMIT 10""",
+    'top wicket takers': """
+        SELECT "bowler", COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as wickets
+        FROM {table} WHERE "bowler" != '' GROUP BY "bowler" ORDER BY wickets DESC LIMIT 10""",
+    'team runs by season': """
+        SELECT "batting_team", "year", SUM("runs_total") as runs
+        FROM {table} GROUP BY "batting_team", "year" ORDER BY runs DESC LIMIT 20""",
+    'venue boundaries': """
+        SELECT "venue", SUM("isFour"::int) + SUM("isSix"::int) as boundaries
+        FROM {table} GROUP BY "venue" ORDER BY boundaries DESC LIMIT 10""",
+    'one batter': """
+        SELECT SUM("runs_batter") as runs, COUNT(*) as balls FROM {table} WHERE "batter" = 'V Kohli'""",
+    'death overs': """
+        SELECT "batter", SUM("runs_batter") as death_runs FROM {table}
+        WHERE "phase" = 3 AND "batter" != '' GROUP BY "batter" ORDER BY death_runs DESC LIMIT 10""",
+}
+
+
+def explain(conn, sql):
+    output = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}").scalar()
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]
+
+
+def measure(conn, sql, repeat):
+    return statistics.median(explain(conn, sql)['Execution Time'] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    with engine.connect() as conn:
+        before = relation_size(conn, [OLD_TABLE])
+        after = relation_size(conn, [FACT_TABLE] + list(DIMENSIONS))
+        ratio = f" ({after / before:.0%})" if before else ""
+        print(f"size: {OLD_TABLE} {before / 2**20:,.1f} MB, "
+              f"{FACT_TABLE} + dimensions {after / 2**20:,.1f} MB{ratio}\n")
+
+        print(f"{'query':<22} {'text ms':>9} {'star ms':>9} {'speedup':>8}")
+        for name, template in QUERIES.items():
+            text_ms = measure(conn, template.format(table=OLD_TABLE), args.repeat)
+            star_ms = measure(conn, template.format(table='ipl_balls'), args.repeat)
+            speedup = text_ms / star_ms if star_ms else float('inf')
+            print(f"{name:<22} {text_ms:>9.1f} {star_ms:>9.1f} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Bowling type lookup for ipl_balls.
+
+Pace or spin is the generated "bowl_kind" column (see derived_columns.py).
+The bowling_types table adds arm and variation for every distinct
+"bowling_style", keyed by a smallint id and joined on "bowling_style";
+classify_bowling_style applies the same rule in Python.
+
+    python bowling_types.py     # add the derived columns and fill the lookup table
+"""
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from derived_columns import ensure_derived_columns
+from summary_views import PACE_STYLES
+
+LOOKUP_TABLE = 'bowling_types'
+
+# Descriptions of the style codes used in the source data
+STYLE_VARIATIONS = {
+    'rf': 'fast', 'rfm': 'fast-medium', 'rmf': 'medium-fast', 'rm': 'medium',
+    'lf': 'fast', 'lfm': 'fast-medium', 'lmf': 'medium-fast', 'lm': 'medium',
+    'ob': 'off-break', 'lb': 'leg-break', 'lbg': 'leg-break googly',
+    'sla': 'orthodox', 'lws': 'wrist-spin',
+}
+RIGHT_ARM_SPIN = ('ob', 'lb', 'lbg')
+
+
+def classify_bowling_style(style):
+    """(bowl_kind, arm, variation) for a "bowling_style" value; bowl_kind matches the SQL column"""
+    style = style or ''
+    if not style:
+        return 'unknown', None, None
+    # Same rule as BOWL_KIND_EXPRESSION, which is case-sensitive like LIKE
+    kind = 'pace' if 'rm' in style or 'rf' in style or style in PACE_STYLES else 'spin'
+    code = style.strip().lower()
+    if code in RIGHT_ARM_SPIN or code.startswith('r'):
+        arm = 'right'
+    elif code.startswith('l') or code == 'sla':
+        arm = 'left'
+    else:
+        arm = None
+    return kind, arm, STYLE_VARIATIONS.get(code)
+
+
+def sync_bowling_types(conn, match_ids=None) -> int:
+    """Add lookup rows for styles not seen before (only in these matches when given)"""
+    match_filter = 'AND "match_id" = ANY(:match_ids)' if match_ids is not None else ''
+    styles = [row[0] for row in conn.execute(text(f"""
+        SELECT DISTINCT "bowling_style" FROM ipl_balls b
+        WHERE "bowling_style" IS NOT NULL {match_filter}
+          AND NOT EXISTS (SELECT 1 FROM {LOOKUP_TABLE} t WHERE t."bowling_style" = b."bowling_style")
+    """), {'match_ids': list(match_ids or [])}).fetchall()]
+    for style in styles:
+        kind, arm, variation = classify_bowling_style(style)
+        conn.execute(text(f"""
+            INSERT INTO {LOOKUP_TABLE} ("bowling_style", "bowl_kind", "arm", "variation")
+            VALUES (:style, :kind, :arm, :variation) ON CONFLICT ("bowling_style") DO NOTHING
+        """), {'style': style, 'kind': kind, 'arm': arm, 'variation': variation})
+    return len(styles)
+
+
+def ensure_bowling_types(conn) -> bool:
+    """Create and fill the lookup table when missing; returns True when it was just created"""
+    if conn.execute(text(f"SELECT to_regclass('{LOOKUP_TABLE}') IS NOT NULL")).scalar():
+        return False
+    conn.execute(text(f"""
+        CREATE TABLE {LOOKUP_TABLE} (
+            id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            "bowling_style" TEXT NOT NULL UNIQUE,
+            "bowl_kind" TEXT NOT NULL,
+            "arm" TEXT,
+            "variation" TEXT
+        )
+    """))
+    sync_bowling_types(conn)
+    return True
+
+
+def main():
+    from db import get_engine
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    with engine.begin() as conn:
+        ensure_derived_columns(conn)
+        ensure_bowling_types(conn)
+        added = sync_bowling_types(conn)
+    print(f"✅ bowling_types is up to date ({added} new style(s))")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import os
+import threading
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+_engines = {}
+_async_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class _CountTimeouts:
+    """Counts checkouts that gave up after pool_timeout, reported by pool_stats"""
+    timeouts = 0
+
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+
+
+class CountingQueuePool(_CountTimeouts, QueuePool):
+    pass
+
+
+class CountingAsyncQueuePool(_CountTimeouts, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options() -> dict:
+    """Pool settings for create_engine, driven by environment variables.
+
+    Each process holds at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so
+    size these so that workers * (size + overflow) stays below the server's
+    max_connections. With DB_PGBOUNCER=true the app keeps no pool of its own and
+    leaves pooling to PgBouncer in transaction mode.
+    """
+    options = {
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', 'true'),
+        'connect_args': {
+            'application_name': os.getenv('DB_APPLICATION_NAME', 'ipl-chatbot'),
+            # Detect sockets silently dropped by load balancers during idle periods
+            'keepalives': 1,
+            'keepalives_idle': int(os.getenv('DB_KEEPALIVES_IDLE', '30')),
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+        },
+    }
+
+    if _env_flag('DB_PGBOUNCER', 'false'):
+        options['poolclass'] = NullPool
+    else:
+        options.update({
+            'poolclass': CountingQueuePool,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+            'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            'pool_use_lifo': True,
+        })
+    return options
+
+
+def get_engine(database_url: str):
+    """Return the process-wide SQLAlchemy engine for a database URL, creating it once"""
+    with _engines_lock:
+        engine = _engines.get(database_url)
+        if engine is None:
+            engine = create_engine(database_url, **engine_options())
+            _engines[database_url] = engine
+        return engine
+
+
+def async_database_url(database_url: str):
+    """The same database addressed through asyncpg (postgres:// and sslmode= are libpq spellings)"""
+    url = make_url(database_url).set(drivername='postgresql+asyncpg')
+    query = dict(url.query)
+    if 'sslmode' in query:
+        query['ssl'] = query.pop('sslmode')
+    if _env_flag('DB_PGBOUNCER', 'false'):
+        # PgBouncer in transaction mode cannot keep prepared statements across transactions
+        query['prepared_statement_cache_size'] = '0'
+    return url.set(query=query)
+
+
+def async_engine_options() -> dict:
+    """engine_options() for create_async_engine; the same pool limits apply per process"""
+    options = engine_options()
+    # keepalives are libpq settings; asyncpg takes the application name as a server setting
+    options['connect_args'] = {'server_settings': {'application_name': options['connect_args']['application_name']}}
+    if options['poolclass'] is NullPool:
+        options['connect_args']['statement_cache_size'] = 0
+    else:
+        options['poolclass'] = CountingAsyncQueuePool
+    return options
+
+
+def get_async_engine(database_url: str):
+    """Return the process-wide asyncpg AsyncEngine for a database URL, creating it once"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    with _engines_lock:
+        engine = _async_engines.get(database_url)
+        if engine is None:
+            engine = create_async_engine(async_database_url(database_url), **async_engine_options())
+            _async_engines[database_url] = engine
+        return engine
+
+
+def pool_stats(engine) -> dict:
+    """Current pool occupancy and checkout timeouts for monitoring (an AsyncEngine reports its sync_engine's pool)"""
+    pool = getattr(engine, 'sync_engine', engine).pool
+    # pid tells apart the workers behind one address, whose pools are separate
+    stats = {'pool': type(pool).__name__, 'status': pool.status(), 'pid': os.getpid()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+            'timeouts': pool.timeouts if isinstance(pool, _CountTimeouts) else 0,
+        })
+    return stats
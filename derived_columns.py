@@ -0,0 +1,77 @@
+"""Stored generated columns on ipl_balls and the indexes built on them.
+
+Classifications that every prompt and fallback repeats - pace or spin, and
+the phase of the innings - are computed once per row when it is inserted,
+instead of per query with LIKE patterns and "over" ranges the planner cannot
+combine with batter or bowler grouping:
+
+- "bowl_kind": 'pace', 'spin' or 'unknown' from "bowling_style"
+- "phase": 1 = powerplay (overs 1-6), 2 = middle (7-15), 3 = death (16-20)
+
+Adding the columns rewrites ipl_balls once; afterwards Postgres keeps them in
+step with every COPY or INSERT. Loaders must leave them out of their column
+lists (see migrate_partitions.insertable_columns). Under the star schema the
+columns live on the fact table and the ipl_balls view is extended to match.
+
+    python derived_columns.py
+"""
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from star_schema import create_view, fact_column, fact_table, quoted_columns
+from summary_views import BOWL_KIND_EXPRESSION, PHASE_EXPRESSION
+
+DERIVED_COLUMNS = {
+    'bowl_kind': ('TEXT', BOWL_KIND_EXPRESSION),
+    'phase': ('SMALLINT', PHASE_EXPRESSION),
+}
+
+DERIVED_INDEXES = {
+    'idx_ipl_balls_bowl_kind_over': ('bowl_kind', 'over'),
+    'idx_ipl_balls_phase_batter': ('phase', 'batter'),
+    'idx_ipl_balls_phase_bowler': ('phase', 'bowler'),
+}
+
+
+def existing_columns(conn, table: str = 'ipl_balls') -> set:
+    return {row[0] for row in conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = :table AND table_schema = current_schema()
+    """), {'table': table}).fetchall()}
+
+
+def ensure_derived_columns(conn) -> list:
+    """Add missing generated columns and their indexes; returns the columns added"""
+    table = fact_table(conn)
+    missing = [name for name in DERIVED_COLUMNS if name not in existing_columns(conn, table)]
+    if missing:
+        # One ALTER so the table is rewritten once however many columns are added;
+        # the expressions hold LIKE patterns, so bypass bind parsing
+        conn.exec_driver_sql(f"ALTER TABLE {table} " + ", ".join(
+            f'ADD COLUMN "{name}" {DERIVED_COLUMNS[name][0]} GENERATED ALWAYS AS ({DERIVED_COLUMNS[name][1]}) STORED'
+            for name in missing
+        ))
+        print(f"✅ Added generated column(s) to {table}: {', '.join(missing)}")
+        if table != 'ipl_balls' and conn.execute(text("SELECT to_regclass('ipl_balls') IS NOT NULL")).scalar():
+            create_view(conn)
+    for name, columns in DERIVED_INDEXES.items():
+        columns = [fact_column(column) for column in columns] if table != 'ipl_balls' else columns
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({quoted_columns(columns)})")
+    if missing:
+        conn.execute(text(f"ANALYZE {table}"))
+    return missing
+
+
+def main():
+    from db import get_engine
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    with engine.begin() as conn:
+        added = ensure_derived_columns(conn)
+    print(f"✅ Derived columns are up to date ({len(added)} added)")
+
+
+if __name__ == '__main__':
+    main()
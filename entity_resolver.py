@@ -0,0 +1,338 @@
+"""Tag player, team and venue names in questions with their canonical values in ipl_balls.
+
+"Kohli", "V Kohli" and "Virat" all mean 'V Kohli'; "RCB" means both
+'Royal Challengers Bangalore' and 'Royal Challengers Bengaluru'; "Wankhede"
+means every venue spelled with it. Names are read once from the data and put
+in a token trie together with surnames, the alias tables below and
+distinctive venue words, so tagging a question is a single pass over its
+words. Words that match nothing are tried against single-word keys within a
+small edit distance, which catches typos such as "Bumra" or "Wankede". The
+keys are indexed by their deletion variants (symmetric deletion), so only
+keys sharing a variant with the typed word are compared, not every key.
+
+The canonical names feed the intent templates (intent_engine.py) and a
+"names as stored" section of the LLM prompts.
+"""
+import re
+import threading
+
+from sqlalchemy import text
+
+from star_schema import is_star_schema
+
+KINDS = ('player', 'team', 'venue')
+# Columns each kind of name is stored in, for the prompt hint
+KIND_COLUMNS = {
+    'player': '"batter"/"bowler"',
+    'team': '"batting_team"/"bowling_team"',
+    'venue': '"venue"',
+}
+MAX_CANDIDATES = 8
+# Shortest word tried for fuzzy matches, and the edit distance allowed by word length
+FUZZY_MIN_LENGTH = 5
+FUZZY_LONG_WORD = 8
+
+# Nicknames and spellings people use, keyed to canonical names; entries whose
+# names are not in the data are ignored
+PLAYER_ALIASES = {
+    'virat': 'V Kohli', 'virat kohli': 'V Kohli', 'king kohli': 'V Kohli',
+    'rohit': 'RG Sharma', 'rohit sharma': 'RG Sharma', 'hitman': 'RG Sharma',
+    'dhoni': 'MS Dhoni', 'msd': 'MS Dhoni', 'thala': 'MS Dhoni', 'mahi': 'MS Dhoni',
+    'abd': 'AB de Villiers', 'ab de villiers': 'AB de Villiers', 'mr 360': 'AB de Villiers',
+    'jasprit bumrah': 'JJ Bumrah', 'boom boom': 'JJ Bumrah',
+    'chris gayle': 'CH Gayle', 'universe boss': 'CH Gayle',
+    'david warner': 'DA Warner', 'sky': 'SA Yadav', 'suryakumar': 'SA Yadav', 'surya': 'SA Yadav',
+    'jaddu': 'RA Jadeja', 'ravindra jadeja': 'RA Jadeja', 'mr ipl': 'SK Raina', 'suresh raina': 'SK Raina',
+    'dre russ': 'AD Russell', 'andre russell': 'AD Russell', 'sunil narine': 'SP Narine',
+    'lasith malinga': 'SL Malinga', 'yuzi': 'YS Chahal', 'yuzvendra chahal': 'YS Chahal',
+    'ravichandran ashwin': 'R Ashwin', 'ash': 'R Ashwin', 'rishabh pant': 'RR Pant',
+    'shubman gill': 'Shubman Gill', 'kl rahul': 'KL Rahul', 'jos buttler': 'JC Buttler',
+    'hardik': 'HH Pandya', 'hardik pandya': 'HH Pandya', 'krunal': 'KH Pandya',
+    'kieron pollard': 'KA Pollard', 'bhuvi': 'B Kumar', 'bhuvneshwar': 'B Kumar',
+    'dk': 'KD Karthik', 'dinesh karthik': 'KD Karthik', 'sanju': 'SV Samson', 'sanju samson': 'SV Samson',
+    'yashasvi': 'YBK Jaiswal', 'yashasvi jaiswal': 'YBK Jaiswal', 'gambhir': 'G Gambhir',
+    'sehwag': 'V Sehwag', 'shikhar': 'S Dhawan', 'gabbar': 'S Dhawan', 'shikhar dhawan': 'S Dhawan',
+}
+TEAM_ALIASES = {
+    'csk': ['Chennai Super Kings'], 'chennai': ['Chennai Super Kings'],
+    'mi': ['Mumbai Indians'], 'mumbai': ['Mumbai Indians'],
+    'rcb': ['Royal Challengers Bangalore', 'Royal Challengers Bengaluru'],
+    'bangalore': ['Royal Challengers Bangalore', 'Royal Challengers Bengaluru'],
+    'bengaluru': ['Royal Challengers Bangalore', 'Royal Challengers Bengaluru'],
+    'kkr': ['Kolkata Knight Riders'], 'kolkata': ['Kolkata Knight Riders'],
+    'srh': ['Sunrisers Hyderabad'], 'sunrisers': ['Sunrisers Hyderabad'], 'hyderabad': ['Sunrisers Hyderabad'],
+    'dc': ['Delhi Capitals', 'Delhi Daredevils'], 'dd': ['Delhi Daredevils'],
+    'delhi': ['Delhi Capitals', 'Delhi Daredevils'],
+    'pbks': ['Punjab Kings', 'Kings XI Punjab'], 'kxip': ['Kings XI Punjab', 'Punjab Kings'],
+    'punjab': ['Punjab Kings', 'Kings XI Punjab'],
+    'rr': ['Rajasthan Royals'], 'rajasthan': ['Rajasthan Royals'],
+    'gt': ['Gujarat Titans'], 'lsg': ['Lucknow Super Giants'], 'lucknow': ['Lucknow Super Giants'],
+    'deccan': ['Deccan Chargers'], 'rps': ['Rising Pune Supergiant', 'Rising Pune Supergiants'],
+    'gl': ['Gujarat Lions'], 'pwi': ['Pune Warriors'], 'ktk': ['Kochi Tuskers Kerala'],
+}
+# Alias: text every matching venue name contains
+VENUE_ALIASES = {
+    'wankhede': 'wankhede', 'chepauk': 'chidambaram', 'chinnaswamy': 'chinnaswamy', 'eden': 'eden gardens',
+    'kotla': 'kotla', 'feroz shah kotla': 'kotla', 'arun jaitley': 'jaitley', 'motera': 'narendra modi',
+    'ahmedabad': 'ahmedabad', 'uppal': 'rajiv gandhi', 'mohali': 'bindra', 'ekana': 'ekana',
+    'jaipur': 'sawai mansingh', 'brabourne': 'brabourne', 'dy patil': 'patil', 'sharjah': 'sharjah',
+    'abu dhabi': 'zayed', 'dubai': 'dubai',
+}
+# Words in venue names too generic to identify one
+VENUE_WORDS = {'stadium', 'cricket', 'ground', 'international', 'association', 'sports', 'academy',
+               'complex', 'national', 'memorial', 'centre', 'center', 'club', 'park', 'oval'}
+# Question words that must never be read as a name, exactly or fuzzily
+COMMON_WORDS = {
+    'short', 'head', 'green', 'rise', 'best', 'most', 'more', 'over', 'overs', 'runs', 'king', 'power',
+    'death', 'pace', 'spin', 'left', 'right', 'hand', 'bowler', 'bowlers', 'player', 'players', 'season',
+    'seasons', 'sixes', 'fours', 'total', 'score', 'scored', 'scorer', 'scorers', 'strike', 'economy',
+    'wicket', 'wickets', 'batter', 'batters', 'batting', 'bowling', 'against', 'middle', 'which', 'where',
+    'highest', 'lowest', 'leading', 'record', 'average', 'innings', 'match', 'matches', 'venue', 'venues',
+    'teams', 'there', 'their', 'about', 'spinners', 'pacers', 'career', 'history', 'stats', 'during',
+    'since', 'after', 'before', 'until', 'powerplay', 'between', 'compare', 'batsman', 'batsmen', 'hitters',
+    'takers', 'conceded', 'economical', 'balls', 'boundaries', 'fastest', 'spinner', 'bowled', 'hitting',
+}
+# Words after which an ambiguous city name means the venue rather than the team
+VENUE_PREPOSITIONS = {'at', 'in'}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_END = object()
+
+
+def tokens(value: str) -> list:
+    return _TOKEN.findall(value.lower())
+
+
+def load_names(conn, summary_views=None) -> dict:
+    """Distinct player, team and venue names, from the dimension tables or cubes when they exist"""
+    if is_star_schema(conn):
+        return {kind: [row[0] for row in conn.execute(text(f"SELECT name FROM {kind}s")).fetchall()]
+                for kind in KINDS}
+
+    view_names = {view.name for view in summary_views or []}
+    batting = 'cube_batting' if 'cube_batting' in view_names else 'ipl_balls'
+    bowling = 'cube_bowling' if 'cube_bowling' in view_names else 'ipl_balls'
+    players = [row[0] for row in conn.execute(text(
+        f'SELECT "batter" FROM {batting} UNION SELECT "bowler" FROM {bowling}'
+    )).fetchall()]
+    teams, venues = set(), set()
+    for team, venue in conn.execute(text('SELECT DISTINCT "batting_team", "venue" FROM ipl_balls')).fetchall():
+        teams.add(team)
+        venues.add(venue)
+    return {kind: sorted(name for name in values if name)
+            for kind, values in (('player', players), ('team', teams), ('venue', venues))}
+
+
+def edit_distance(left: str, right: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(right) + 1))
+    for i in range(1, len(left) + 1):
+        current = [i] + [0] * len(right)
+        for j in range(1, len(right) + 1):
+            cost = left[i - 1] != right[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and left[i - 1] == right[j - 2] and left[i - 2] == right[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletions(word: str, depth: int) -> set:
+    """The word and every string made by deleting up to depth of its characters"""
+    variants, frontier = {word}, {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class EntityMatch:
+    """A name found in a question: its kind, the canonical values and where it was typed"""
+
+    def __init__(self, kind: str, names: list, start: int, end: int, typed: str, fuzzy: bool = False):
+        self.kind = kind
+        self.names = names
+        self.start = start
+        self.end = end
+        self.typed = typed
+        self.fuzzy = fuzzy
+
+    def __repr__(self):
+        return f"EntityMatch({self.kind}, {self.typed!r} -> {self.names})"
+
+
+class EntityResolver:
+    """Token trie over canonical names and their aliases"""
+
+    def __init__(self, names: dict):
+        self._trie = {}
+        self._fuzzy_keys = {}  # single-word key -> trie node
+        self._deletions = {}  # deletion variant -> single-word keys it comes from
+        players = set(names.get('player', []))
+        teams = set(names.get('team', []))
+        venues = set(names.get('venue', []))
+
+        surnames = {}
+        for name in players:
+            self._add(name, 'player', [name])
+            words = name.split()
+            # Surname is everything after the leading initials: 'AB de Villiers' -> 'de villiers'
+            rest = words[1:] if len(words) > 1 and words[0].isupper() and len(words[0]) <= 3 else words[-1:]
+            surname = " ".join(rest)
+            if len(surname) >= 4 and surname.lower() not in COMMON_WORDS:
+                surnames.setdefault(surname, set()).add(name)
+        for surname, found in surnames.items():
+            self._add(surname, 'player', sorted(found))
+        for alias, name in PLAYER_ALIASES.items():
+            if name in players:
+                self._add(alias, 'player', [name])
+
+        for name in teams:
+            self._add(name, 'team', [name])
+            words = tokens(name)
+            initials = "".join(word[0] for word in words)
+            # Where initials clash (Delhi Capitals / Deccan Chargers) the alias table decides
+            if len(words) > 1 and initials not in TEAM_ALIASES:
+                self._add(initials, 'team', [name])
+        for alias, aliased in TEAM_ALIASES.items():
+            found = [name for name in aliased if name in teams]
+            if found:
+                self._add(alias, 'team', found)
+
+        venue_words = {}
+        for name in venues:
+            self._add(name, 'venue', [name])
+            for word in tokens(name):
+                if len(word) >= FUZZY_MIN_LENGTH and word not in VENUE_WORDS and not word.isdigit():
+                    venue_words.setdefault(word, set()).add(name)
+        for word, found in venue_words.items():
+            self._add(word, 'venue', sorted(found))
+        for alias, contained in VENUE_ALIASES.items():
+            found = sorted(name for name in venues if contained in name.lower())
+            if found:
+                self._add(alias, 'venue', found)
+
+    def _add(self, key: str, kind: str, names: list):
+        words = tokens(key)
+        if not words or (len(words) == 1 and words[0] in COMMON_WORDS):
+            return
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        entries = node.setdefault(_END, {})
+        entries[kind] = sorted(set(entries.get(kind, [])) | set(names))
+        word = words[0]
+        if len(words) == 1 and len(word) >= FUZZY_MIN_LENGTH and word not in self._fuzzy_keys:
+            self._fuzzy_keys[word] = node
+            # Keys this short are only ever compared with words allowed one edit
+            depth = 2 if len(word) >= FUZZY_LONG_WORD - 2 else 1
+            for variant in deletions(word, depth):
+                self._deletions.setdefault(variant, []).append(word)
+
+    def _fuzzy(self, word: str):
+        """Trie node of the closest single-word key within the allowed distance, or None"""
+        limit = 2 if len(word) >= FUZZY_LONG_WORD else 1
+        # Keys within `limit` edits share a variant with the word after at most `limit` deletions from each
+        candidates = {key for variant in deletions(word, limit) for key in self._deletions.get(variant, ())}
+        best, best_rank = None, None
+        for key in candidates:
+            distance = edit_distance(word, key, limit)
+            rank = (distance, len(key), key)
+            if distance <= limit and (best_rank is None or rank < best_rank):
+                best, best_rank = self._fuzzy_keys[key], rank
+        return best
+
+    @staticmethod
+    def _choose(entries: dict, previous_word: str):
+        """Pick one kind for a key that names several, e.g. "mumbai" the team or the venue"""
+        order = ('venue', 'player', 'team') if previous_word in VENUE_PREPOSITIONS else KINDS
+        return next((kind, entries[kind]) for kind in order if kind in entries)
+
+    def tag(self, question: str) -> list:
+        """Names mentioned in the question, longest match first at each position, left to right"""
+        words = [(match.group(), match.start(), match.end()) for match in _TOKEN.finditer(question.lower())]
+        matches, i = [], 0
+        while i < len(words):
+            node, found, j = self._trie, None, i
+            while j < len(words) and words[j][0] in node:
+                node = node[words[j][0]]
+                j += 1
+                if _END in node:
+                    found = (node[_END], j)
+            fuzzy = False
+            if found is None:
+                word = words[i][0]
+                fuzzy_node = None
+                if len(word) >= FUZZY_MIN_LENGTH and word not in COMMON_WORDS and not word.isdigit():
+                    fuzzy_node = self._fuzzy(word)
+                if fuzzy_node is None:
+                    i += 1
+                    continue
+                found, fuzzy = (fuzzy_node[_END], i + 1), True
+            entries, j = found
+            kind, names = self._choose(entries, words[i - 1][0] if i else None)
+            start, end = words[i][1], words[j - 1][2]
+            matches.append(EntityMatch(kind, names, start, end, question[start:end], fuzzy))
+            i = j
+        return matches
+
+    def prompt_hint(self, question: str) -> str:
+        """Prompt lines giving the stored spelling of every name in the question, or ''"""
+        lines = []
+        for match in self.tag(question):
+            names = match.names[:MAX_CANDIDATES]
+            values = " or ".join("'" + name.replace("'", "''") + "'" for name in names)
+            if len(names) == 1:
+                note = ""
+            elif match.kind == 'player':
+                note = "; ambiguous, pick the player meant or use IN (...)"
+            else:
+                note = "; use IN (...) for all of them"
+            lines.append(f'- "{match.typed}" -> {match.kind} {values} ({KIND_COLUMNS[match.kind]}{note})')
+        if not lines:
+            return ""
+        return "NAMES IN THIS QUESTION AS STORED IN THE DATA (use these exact values):\n" + "\n".join(lines) + "\n"
+
+
+class EntityCatalog:
+    """Builds the resolver from the database on first use and again after invalidate()"""
+
+    def __init__(self, engine, summary_views=None):
+        self.engine = engine
+        self.summary_views = summary_views
+        self._resolver = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, summary_views=None):
+        """Reload names on next use, e.g. after a data load"""
+        with self._lock:
+            self._resolver = None
+            if summary_views is not None:
+                self.summary_views = summary_views
+
+    def resolver(self):
+        with self._lock:
+            if self._resolver is None:
+                with self.engine.connect() as conn:
+                    names = load_names(conn, self.summary_views)
+                self._resolver = EntityResolver(names)
+                print(f"✅ Entity resolver loaded {sum(len(values) for values in names.values()):,} names")
+            return self._resolver
+
+    def tag(self, question: str) -> list:
+        try:
+            return self.resolver().tag(question)
+        except Exception as e:
+            print(f"Entity tagging failed: {e}")
+            return []
+
+    def prompt_hint(self, question: str) -> str:
+        try:
+            return self.resolver().prompt_hint(question)
+        except Exception as e:
+            print(f"Entity tagging failed: {e}")
+            return ""
@@ -0,0 +1,173 @@
+"""Few-shot examples for the LLM prompt, retrieved per question with BM25.
+
+The store holds question -> SQL pairs: the curated pairs below, plus every
+generated query that executed successfully (seeded from the SQL cache at
+startup and added as questions are answered). For each new question the
+top-k most similar pairs by BM25 over canonicalized words (see
+semantic_cache.canonical_question) are put in the prompt instead of fixed
+examples, so the LLM sees SQL for questions shaped like the one asked.
+"""
+import math
+import os
+import threading
+from collections import Counter
+
+from semantic_cache import canonical_question
+
+EXAMPLE_STORE_TOP_K = int(os.getenv('EXAMPLE_STORE_TOP_K', '3'))
+EXAMPLE_STORE_SIZE = int(os.getenv('EXAMPLE_STORE_SIZE', '2000'))
+
+# Standard BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {'a', 'an', 'the', 'in', 'of', 'for', 'by', 'to', 'and', 'is', 'are', 'was', 'were', 'with',
+             'who', 'what', 'which', 'how', 'me', 'show', 'list', 'give', 'tell', 'has', 'have', 'did',
+             'do', 'does', 'on', 'at', 'ipl', 'all', 'time', 'ever', 'history'}
+
+CURATED_EXAMPLES = [
+    ("Top run scorers with complete stats", """SELECT "batter", COUNT(*) AS balls_faced, SUM("runs_batter") AS total_runs,
+       SUM("isFour"::int) AS fours, SUM("isSix"::int) AS sixes,
+       ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) AS strike_rate,
+       ROUND(SUM("runs_batter")::numeric / NULLIF(COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END), 0), 2) AS batting_average
+FROM ipl_balls WHERE "batter" != '' AND "batter" IS NOT NULL
+GROUP BY "batter" HAVING SUM("runs_batter") > 500 ORDER BY total_runs DESC LIMIT 10"""),
+    ("Best batters in death overs vs pace", """SELECT "batter", COUNT(*) AS balls_faced, SUM("runs_batter") AS death_runs,
+       ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) AS death_sr,
+       SUM("isFour"::int) + SUM("isSix"::int) AS boundaries
+FROM ipl_balls WHERE "phase" = 3 AND "bowl_kind" = 'pace' AND "batter" != '' AND "batter" IS NOT NULL
+GROUP BY "batter" HAVING COUNT(*) >= 30 ORDER BY death_runs DESC LIMIT 10"""),
+    ("Top wicket takers", """SELECT "bowler", COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) AS wickets, COUNT(*) AS balls_bowled,
+       SUM("runs_total") AS runs_conceded,
+       ROUND((SUM("runs_total")::numeric / NULLIF(COUNT(*), 0)) * 6, 2) AS economy_rate
+FROM ipl_balls WHERE "bowler" != '' AND "bowler" IS NOT NULL
+GROUP BY "bowler" HAVING COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) >= 10 ORDER BY wickets DESC LIMIT 10"""),
+    ("Most economical bowlers in the powerplay in 2023", """SELECT "bowler", COUNT(*) AS balls_bowled, SUM("runs_total") AS runs_conceded,
+       ROUND((SUM("runs_total")::numeric / NULLIF(COUNT(*), 0)) * 6, 2) AS economy_rate
+FROM ipl_balls WHERE "phase" = 1 AND "year" = 2023 AND "bowler" != '' AND "bowler" IS NOT NULL
+GROUP BY "bowler" HAVING COUNT(*) >= 60 ORDER BY economy_rate ASC LIMIT 10"""),
+    ("Left-handed batters with the best strike rate against spin", """SELECT "batter", COUNT(*) AS balls_faced, SUM("runs_batter") AS total_runs,
+       ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) AS strike_rate
+FROM ipl_balls WHERE "bat_hand" = 'LHB' AND "bowl_kind" = 'spin' AND "batter" != '' AND "batter" IS NOT NULL
+GROUP BY "batter" HAVING COUNT(*) >= 100 ORDER BY strike_rate DESC LIMIT 10"""),
+    ("Highest individual scores in an innings", """SELECT "batter", "match_id", "batting_team", "bowling_team", "year",
+       SUM("runs_batter") AS runs, COUNT(*) AS balls_faced
+FROM ipl_balls WHERE "batter" != '' AND "batter" IS NOT NULL
+GROUP BY "batter", "match_id", "batting_team", "bowling_team", "year" ORDER BY runs DESC LIMIT 10"""),
+    ("Which team has won the most matches", """SELECT "winner", COUNT(DISTINCT "match_id") AS wins
+FROM ipl_balls WHERE "winner" IS NOT NULL AND "winner" != ''
+GROUP BY "winner" ORDER BY wins DESC LIMIT 10"""),
+    ("Most player of the match awards", """SELECT "playerofmatch", COUNT(DISTINCT "match_id") AS awards
+FROM ipl_balls WHERE "playerofmatch" IS NOT NULL AND "playerofmatch" != ''
+GROUP BY "playerofmatch" ORDER BY awards DESC LIMIT 10"""),
+    ("Highest team totals by season", """SELECT DISTINCT ON ("year") "year", "batting_team", "bowling_team", "match_id", runs
+FROM (SELECT "year", "match_id", "innings", "batting_team", "bowling_team", SUM("runs_total") AS runs
+      FROM ipl_balls WHERE "batting_team" != ''
+      GROUP BY "year", "match_id", "innings", "batting_team", "bowling_team") innings_totals
+ORDER BY "year", runs DESC"""),
+    ("Most wickets by left-arm spinners", """SELECT b."bowler", COUNT(CASE WHEN b."isWicket" = TRUE THEN 1 END) AS wickets, COUNT(*) AS balls_bowled
+FROM ipl_balls b JOIN bowling_types t ON t."bowling_style" = b."bowling_style"
+WHERE t."bowl_kind" = 'spin' AND t."arm" = 'left' AND b."bowler" != ''
+GROUP BY b."bowler" ORDER BY wickets DESC LIMIT 10"""),
+]
+
+
+def terms(question: str) -> list:
+    return [word for word in canonical_question(question).split() if word not in STOPWORDS]
+
+
+class ExampleStore:
+    """In-process BM25 index over question -> SQL pairs; curated pairs are never evicted"""
+
+    def __init__(self, max_entries: int = None, curated=None):
+        self.max_entries = max_entries if max_entries is not None else EXAMPLE_STORE_SIZE
+        self._entries = {}   # canonical question -> entry, oldest first
+        self._postings = {}  # term -> set of canonical questions
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.returned = 0
+        for question, sql in CURATED_EXAMPLES if curated is None else curated:
+            self.add(question, sql, curated=True)
+
+    def add(self, question: str, sql: str, curated: bool = False):
+        key = canonical_question(question)
+        words = terms(question)
+        if not key or not words or not sql:
+            return
+        with self._lock:
+            if key in self._entries:
+                curated = curated or self._entries[key]['curated']
+                self._remove(key)
+            self._entries[key] = {'question': question, 'sql': sql, 'counts': Counter(words),
+                                  'length': len(words), 'curated': curated}
+            self._total_length += len(words)
+            for word in set(words):
+                self._postings.setdefault(word, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next((k for k, entry in self._entries.items() if not entry['curated']), None)
+                if oldest is None:
+                    break
+                self._remove(oldest)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_length -= entry['length']
+        for word in entry['counts']:
+            keys = self._postings.get(word)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[word]
+
+    def remove_sql(self, sql: str):
+        """Forget learned examples using this SQL, e.g. once it stops working"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry['sql'] == sql and not entry['curated']]:
+                self._remove(key)
+
+    def search(self, question: str, k: int = None) -> list:
+        """Top-k (question, sql) pairs by BM25 score; pairs sharing SQL are returned once"""
+        k = k if k is not None else EXAMPLE_STORE_TOP_K
+        words = terms(question)
+        with self._lock:
+            count = len(self._entries)
+            if not count or not words or k <= 0:
+                return []
+            average_length = self._total_length / count
+            scores = {}
+            for word in set(words):
+                keys = self._postings.get(word)
+                if not keys:
+                    continue
+                idf = math.log(1 + (count - len(keys) + 0.5) / (len(keys) + 0.5))
+                for key in keys:
+                    entry = self._entries[key]
+                    frequency = entry['counts'][word]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * entry['length'] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+            results, seen_sql = [], set()
+            for key in sorted(scores, key=lambda key: (-scores[key], key)):
+                entry = self._entries[key]
+                sql = " ".join(entry['sql'].split())
+                if sql in seen_sql:
+                    continue
+                seen_sql.add(sql)
+                results.append((entry['question'], entry['sql']))
+                if len(results) == k:
+                    break
+            self.searches += 1
+            self.returned += len(results)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'curated': sum(entry['curated'] for entry in self._entries.values()),
+                'searches': self.searches,
+                'avg_examples': round(self.returned / self.searches, 2) if self.searches else 0.0,
+            }
@@ -0,0 +1,309 @@
+"""Suggest indexes on ipl_balls from the queries the chatbots actually ran.
+
+QueryGuard appends executed statements to QUERY_PLAN_LOG. The advisor groups
+those statements by shape (their text with every literal replaced by a
+placeholder), replays the costliest shapes with EXPLAIN ANALYZE and derives
+one candidate index per shape:
+
+- columns compared with = or IN, and GROUP BY columns, form the index key
+- filters on constants such as "over" >= 16 or "isWicket" = TRUE become the
+  partial-index predicate, but only when every call of the shape used the same
+  constant; a filter like "bowler" ILIKE '%bumrah%' that varies between calls
+  never becomes a one-off partial index
+- other columns the query reads go into INCLUDE, so it can be answered with an
+  index-only scan
+
+When the hypopg extension is installed each candidate is created as a
+hypothetical index and the planner's cost with and without it is reported.
+--apply creates the candidates (CONCURRENTLY unless ipl_balls is partitioned)
+and replays the queries again to report before/after latency.
+
+    python index_advisor.py                  # propose indexes for the logged workload
+    python index_advisor.py --top 20 --apply # create them and measure the difference
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+
+import sqlglot
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlglot import exp
+
+from migrate_partitions import is_partitioned
+from query_guard import QUERY_PLAN_LOG, QUERY_TIMEOUT_MS
+from star_schema import DIMENSION_COLUMNS, FACT_TABLE, fact_column, is_star_schema
+from view_rewriter import DIALECT, SOURCE_TABLE, _conjuncts, normalize_sql
+
+INDEX_ADVISOR_TOP = int(os.getenv('INDEX_ADVISOR_TOP', '10'))
+INDEX_ADVISOR_MAX_INCLUDE = int(os.getenv('INDEX_ADVISOR_MAX_INCLUDE', '6'))
+INDEX_PREFIX = 'ix_advisor_'
+
+RANGE_TYPES = (exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between)
+PARTIAL_TYPES = RANGE_TYPES + (exp.Or, exp.Like, exp.ILike)
+
+
+def query_shape(sql: str) -> str:
+    """Canonical text of a query with its literals replaced by placeholders, so calls differing only in constants group together"""
+    tree = sqlglot.parse_one(sql, read=DIALECT)
+    return normalize_sql(tree.transform(lambda node: exp.Placeholder() if isinstance(node, exp.Literal) else node))
+
+
+def where_filters(sql: str) -> set:
+    """Canonical text of each WHERE conjunct of a query"""
+    where = sqlglot.parse_one(sql, read=DIALECT).args.get('where')
+    return {normalize_sql(conjunct) for conjunct in _conjuncts(where.this)} if where else set()
+
+
+def read_query_log(path: str = None) -> list:
+    """Executed ipl_balls statements from the QueryGuard log (and its rotated file), grouped by shape, most total time first
+
+    Each shape keeps the WHERE conjuncts shared by all of its calls as 'stable_filters'.
+    """
+    path = path or QUERY_PLAN_LOG
+    workload = {}
+    paths = [candidate for candidate in (f"{path}.1", path) if os.path.exists(candidate)]
+    if not paths:
+        print(f"Could not read query log {path}: no such file")
+        return []
+    for log_path in paths:
+        try:
+            with open(log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if entry.get('verdict') != 'executed' or SOURCE_TABLE not in (entry.get('sql') or ''):
+                            continue
+                        key = query_shape(entry['sql'])
+                        filters = where_filters(entry['sql'])
+                    except (ValueError, sqlglot.errors.ParseError):
+                        continue
+                    query = workload.setdefault(key, {
+                        'sql': entry['sql'], 'params': entry.get('params'), 'calls': 0, 'total_ms': 0.0,
+                        'stable_filters': filters,
+                    })
+                    # Sampled entries stand for 1 / sample_rate calls
+                    weight = 1 / (entry.get('sample_rate') or 1)
+                    query['calls'] += weight
+                    query['total_ms'] += (entry.get('elapsed_ms') or 0) * weight
+                    query['stable_filters'] &= filters
+        except OSError as e:
+            print(f"Could not read query log {log_path}: {e}")
+    for query in workload.values():
+        query['calls'] = round(query['calls'])
+    return sorted(workload.values(), key=lambda query: query['total_ms'], reverse=True)
+
+
+def propose_index(sql: str, table_columns: set, stable_filters: set = None):
+    """Candidate index {'key', 'include', 'where'} for one query reading only ipl_balls, or None
+
+    With stable_filters (see read_query_log), only those constant filters can
+    become the partial-index predicate.
+    """
+    try:
+        select = sqlglot.parse_one(sql, read=DIALECT)
+    except sqlglot.errors.ParseError:
+        return None
+    if not isinstance(select, exp.Select) or {table.name for table in select.find_all(exp.Table)} != {SOURCE_TABLE}:
+        return None
+
+    key, ranges, partial, filtered = [], [], [], set()
+    where = select.args.get('where')
+    for conjunct in _conjuncts(where.this) if where else []:
+        columns = {column.name for column in conjunct.find_all(exp.Column)}
+        if len(columns) != 1 or not columns <= table_columns:
+            continue
+        column = next(iter(columns))
+        if isinstance(conjunct, exp.EQ) and isinstance(conjunct.expression, exp.Boolean):
+            partial.append(conjunct)
+            filtered.add(column)
+        elif isinstance(conjunct, (exp.EQ, exp.In)) and isinstance(conjunct.this, exp.Column):
+            key.append(column)
+        elif (isinstance(conjunct, PARTIAL_TYPES) and not conjunct.find(exp.Placeholder)
+              and (stable_filters is None or normalize_sql(conjunct) in stable_filters)):
+            # Only constants shared by every call can be a partial-index predicate the planner will match
+            partial.append(conjunct)
+            filtered.add(column)
+        elif isinstance(conjunct, RANGE_TYPES):
+            ranges.append(column)
+        # != '' and IS NOT NULL keep almost every row, so they are left out
+
+    group = select.args.get('group')
+    for node in group.expressions if group else []:
+        if isinstance(node, exp.Column) and node.name in table_columns:
+            key.append(node.name)
+    key.extend(ranges[:1])
+    key = list(dict.fromkeys(key))
+    if not key and filtered:
+        key = sorted(filtered)[:1]
+    if not key:
+        return None
+
+    read = {column.name for column in select.find_all(exp.Column) if column.name in table_columns}
+    include = sorted(read - set(key) - (filtered - {column.name for node in select.expressions
+                                                     for column in node.find_all(exp.Column)}))
+    if len(include) > INDEX_ADVISOR_MAX_INCLUDE:
+        include = []
+    # and_ parenthesizes OR filters so they keep their meaning inside the predicate
+    predicate = normalize_sql(exp.and_(*[conjunct.copy() for conjunct in partial])) if partial else None
+    return {'key': key, 'include': include, 'where': predicate}
+
+
+def on_fact_table(candidate: dict):
+    """The candidate translated to the star-schema fact table's id columns, or None when it cannot be"""
+    if candidate['where'] and any(column.name in DIMENSION_COLUMNS for column in
+                                  sqlglot.parse_one(candidate['where'], read=DIALECT).find_all(exp.Column)):
+        return None
+    return dict(candidate, key=[fact_column(column) for column in candidate['key']],
+                include=[fact_column(column) for column in candidate['include']], table=FACT_TABLE)
+
+
+def index_name(candidate: dict) -> str:
+    digest = hashlib.md5(json.dumps(candidate, sort_keys=True).encode()).hexdigest()[:8]
+    return f"{INDEX_PREFIX}{'_'.join(candidate['key']).lower()[:40]}_{digest}"
+
+
+def _column_list(columns) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def index_sql(candidate: dict, concurrently: bool = True, if_not_exists: bool = True) -> str:
+    sql = "CREATE INDEX "
+    if concurrently:
+        sql += "CONCURRENTLY "
+    if if_not_exists:
+        sql += "IF NOT EXISTS "
+    sql += f"{index_name(candidate)} ON {candidate.get('table', SOURCE_TABLE)} ({_column_list(candidate['key'])})"
+    if candidate['include']:
+        sql += f" INCLUDE ({_column_list(candidate['include'])})"
+    if candidate['where']:
+        sql += f" WHERE {candidate['where']}"
+    return sql
+
+
+def explain(conn, sql: str, params: dict = None, analyze: bool = True) -> dict:
+    statement = f"EXPLAIN ({'ANALYZE, ' if analyze else ''}FORMAT JSON) {sql}"
+    if params is None:
+        output = conn.exec_driver_sql(statement).scalar()
+    else:
+        output = conn.execute(text(statement), params).scalar()
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]
+
+
+def replay(engine, queries, repeat: int = 3, field: str = 'before'):
+    """Run each query with EXPLAIN ANALYZE and store its median execution time and plan cost"""
+    for query in queries:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("SELECT set_config('statement_timeout', :timeout, true)"),
+                             {'timeout': str(QUERY_TIMEOUT_MS)})
+                results = [explain(conn, query['sql'], query['params']) for _ in range(repeat)]
+            query[f'{field}_ms'] = statistics.median(result['Execution Time'] for result in results)
+            query[f'{field}_cost'] = results[0]['Plan']['Total Cost']
+        except Exception as e:
+            print(f"⚠️ Could not replay query: {e}")
+            query[f'{field}_ms'] = query[f'{field}_cost'] = None
+
+
+def estimate_with_hypopg(engine, candidates) -> bool:
+    """Planner cost of each candidate's queries with the candidate as a hypothetical index"""
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'hypopg')")).scalar():
+            return False
+        for candidate in candidates:
+            # A savepoint per candidate, so one failure does not abort the transaction for the rest
+            try:
+                with conn.begin_nested():
+                    conn.execute(text("SELECT hypopg_reset()"))
+                    conn.execute(text("SELECT * FROM hypopg_create_index(:sql)"),
+                                 {'sql': index_sql(candidate, concurrently=False, if_not_exists=False)})
+                    for query in candidate['queries']:
+                        query['hypothetical_cost'] = explain(conn, query['sql'], query['params'], analyze=False)['Plan']['Total Cost']
+            except Exception as e:
+                print(f"⚠️ hypopg could not evaluate {index_name(candidate)}: {e}")
+        conn.execute(text("SELECT hypopg_reset()"))
+    return True
+
+
+def advise(engine, log_path: str = None, top: int = None, repeat: int = 3) -> list:
+    """Candidate indexes for the costliest logged queries, each with the queries it serves"""
+    queries = read_query_log(log_path)[:top or INDEX_ADVISOR_TOP]
+    with engine.connect() as conn:
+        table_columns = {row[0] for row in conn.execute(text(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = :table"
+        ), {'table': SOURCE_TABLE}).fetchall()}
+        star = is_star_schema(conn)
+
+    candidates = {}
+    for query in queries:
+        candidate = propose_index(query['sql'], table_columns, query['stable_filters'])
+        if candidate is not None and star:
+            # ipl_balls is a view; the index goes on the fact table's id columns
+            candidate = on_fact_table(candidate)
+        if candidate is None:
+            continue
+        entry = candidates.setdefault(index_name(candidate), dict(candidate, queries=[]))
+        entry['queries'].append(query)
+    candidates = list(candidates.values())
+
+    replay(engine, [query for candidate in candidates for query in candidate['queries']], repeat)
+    if not estimate_with_hypopg(engine, candidates):
+        print("ℹ️ hypopg is not installed; use --apply to measure the benefit directly")
+    for candidate in candidates:
+        before = sum((query['before_cost'] or 0) * query['calls'] for query in candidate['queries'])
+        after = sum((query.get('hypothetical_cost') or query['before_cost'] or 0) * query['calls']
+                    for query in candidate['queries'])
+        candidate['estimated_saving'] = (1 - after / before) if before else None
+    return sorted(candidates, key=lambda candidate: candidate['estimated_saving'] or 0, reverse=True)
+
+
+def apply_indexes(engine, candidates, repeat: int = 3):
+    """Create the candidate indexes and replay their queries to measure the new latency"""
+    with engine.connect() as conn:
+        # CREATE INDEX CONCURRENTLY is not supported on a partitioned parent
+        concurrently = not is_partitioned(conn)
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for candidate in candidates:
+            conn.exec_driver_sql(index_sql(candidate, concurrently=concurrently))
+            print(f"✅ Created {index_name(candidate)}")
+    replay(engine, [query for candidate in candidates for query in candidate['queries']], repeat, field='after')
+
+
+def print_report(candidates):
+    if not candidates:
+        print("No index candidates found in the query log")
+        return
+    for candidate in candidates:
+        saving = candidate['estimated_saving']
+        print(f"\n{index_sql(candidate)};")
+        print(f"   estimated cost saving: {'n/a' if saving is None else f'{saving:.0%}'}")
+        for query in candidate['queries']:
+            line = f"   {query['calls']:>5} call(s)  before {query['before_ms'] or 0:>9.1f} ms"
+            if query.get('after_ms') is not None:
+                line += f"  after {query['after_ms']:>9.1f} ms"
+            print(f"{line}  {' '.join(query['sql'].split())[:70]}...")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose indexes for ipl_balls from the query log")
+    parser.add_argument('--log', help=f'query log to read (default {QUERY_PLAN_LOG})')
+    parser.add_argument('--top', type=int, help=f'number of query shapes to analyse (default {INDEX_ADVISOR_TOP})')
+    parser.add_argument('--repeat', type=int, default=3, help='EXPLAIN ANALYZE runs per query')
+    parser.add_argument('--apply', action='store_true', help='create the indexes and report before/after latency')
+    args = parser.parse_args()
+
+    from db import get_engine
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    candidates = advise(engine, args.log, args.top, args.repeat)
+    if args.apply and candidates:
+        apply_indexes(engine, candidates, args.repeat)
+    print_report(candidates)
+
+
+if __name__ == '__main__':
+    main()
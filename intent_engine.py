@@ -0,0 +1,249 @@
+"""Answer recognized question shapes from parameterized SQL templates, without the LLM.
+
+Questions such as "top 5 run scorers in 2016", "most economical spinners in
+the death overs" or "Kohli's strike rate against pace" are matched against
+the templates below. Slots (player, team, venue, year, phase, pace/spin,
+batting hand, N) are pulled out of the question and bound as parameters, so
+the same question always runs the same SQL and the answer costs one database
+round trip instead of an LLM call. Anything the templates cannot express
+(comparisons, partnerships, results, ...) returns None and goes to the LLM,
+and so does any question with a word no slot accounts for: a confident answer
+to half of the question is worse than a slower answer to all of it.
+
+Player, team and venue names are resolved to their stored values by
+entity_resolver.py, so "Kohli", "RCB" or "Wankhede" become bound parameters.
+"""
+import re
+
+from entity_resolver import VENUE_WORDS, tokens
+from summary_views import BATTING_DERIVED, BATTING_MEASURES, BOWLING_DERIVED, BOWLING_MEASURES
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# Minimum balls for rate rankings, so one lucky over does not top the table
+MIN_BALLS_FACED = 100
+MIN_BALLS_FACED_FILTERED = 30
+MIN_BALLS_BOWLED = 120
+MIN_BALLS_BOWLED_FILTERED = 60
+
+BATTING_COLUMNS = ['total_runs', 'balls_faced', 'strike_rate', 'batting_average', 'fours', 'sixes']
+BOWLING_COLUMNS = ['wickets', 'balls_bowled', 'runs_conceded', 'economy_rate', 'bowling_avg']
+
+# metric: (player column, output columns, column ranked on, order)
+METRICS = {
+    'runs': ('batter', BATTING_COLUMNS, 'total_runs', 'DESC'),
+    'strike_rate': ('batter', BATTING_COLUMNS, 'strike_rate', 'DESC'),
+    'sixes': ('batter', BATTING_COLUMNS, 'sixes', 'DESC'),
+    'fours': ('batter', BATTING_COLUMNS, 'fours', 'DESC'),
+    'wickets': ('bowler', BOWLING_COLUMNS, 'wickets', 'DESC'),
+    'economy': ('bowler', BOWLING_COLUMNS, 'economy_rate', 'ASC'),
+}
+MEASURES = dict(BATTING_MEASURES, **BATTING_DERIVED, **BOWLING_MEASURES, **BOWLING_DERIVED)
+# Only rates can sensibly be ranked lowest first; the lowest run totals are just players with one ball
+RATE_METRICS = {'strike_rate', 'economy'}
+
+# Question shapes the templates cannot answer faithfully; these go to the LLM
+UNSUPPORTED = re.compile(
+    r"\b(compare|comparison|between|partnership|captain|toss|won|win|wins|chase|chasing|innings|"
+    r"centur(y|ies)|fift(y|ies)|hundreds?|average|conceded|extras?|wides?|no.?balls?|dismiss\w*|caught|"
+    r"lbw|final|playoffs?|each|every|per|trend|both|worst|least|fewest|maiden|dot|match(es)?|season.?wise|"
+    r"figures|score|single|an over|a season|one season|last|this|current|previous|recent|"
+    r"by (teams?|venues?|seasons?|years?)|(which|what|whose) (teams?|venues?|grounds?|stadiums?|sides?|"
+    r"franchises?|cit(y|ies)))\b"
+)
+# Negations and exclusions ("not including Kohli", "except 2020") would be dropped by the templates
+NEGATION = re.compile(r"\b(not|no|never|non|without|except\w*|exclud\w*|other than|apart from|aside from|"
+                      r"besides|barring|minus)\b|n't\b")
+RANKING = re.compile(r"\b(top|best|most|highest|leading|lowest|who|which|list|rank\w*)\b")
+NUMBER_WORDS = {'three': 3, 'five': 5, 'ten': 10, 'fifteen': 15, 'twenty': 20}
+LIMIT_PATTERN = re.compile(r"\b(?:top|best|leading|highest)\s+(\d{1,3}|" + "|".join(NUMBER_WORDS) + r")\b")
+YEAR_PATTERN = re.compile(r"\b(?:(since|from|after|before|until|till)\s+)?((?:19|20)\d\d)\b")
+YEAR_OPERATORS = {None: '=', 'since': '>=', 'from': '>=', 'after': '>', 'before': '<', 'until': '<=', 'till': '<='}
+PHASES = [(re.compile(r"\bpower.?play"), 1), (re.compile(r"\bmiddle.?overs?\b"), 2), (re.compile(r"\bdeath\b"), 3)]
+BOWL_KINDS = [(re.compile(r"\b(pace|pacers?|fast|seam\w*|quicks?)\b"), 'pace'), (re.compile(r"\bspin\w*\b"), 'spin')]
+BAT_HANDS = [(re.compile(r"\b(left.?hand\w*|lhb|lefties)\b"), 'LHB'), (re.compile(r"\b(right.?hand\w*|rhb)\b"), 'RHB')]
+OPPONENT_PATTERN = re.compile(r"\b(against|vs\.?|versus|facing|off)\s+(the\s+)?$")
+METRIC_WORDS = re.compile(
+    r"\b(strike.?rates?|sr|economy( rates?)?|economical|expensive|sixes|six.?hitters?|fours|wicket.?takers?|"
+    r"wickets?|run.?scorers?|runs?|scorers?|scored|batters?|batsm[ae]n|batting|hitters?|bowlers?|bowling)\b"
+)
+# Words that carry no slot; any other word left in the question means it asks for something more
+FILLER_WORDS = {
+    'who', 'which', 'what', 'how', 'many', 'much', 'is', 'are', 'was', 'were', 'has', 'have', 'had', 'do',
+    'does', 'did', 'the', 'a', 'an', 'of', 'in', 'for', 'by', 'with', 'at', 'on', 'from', 'during', 'me',
+    'show', 'list', 'give', 'tell', 's', 'hit', 'hits', 'hitting', 'take', 'takes', 'taken', 'took', 'taking',
+    'player', 'players', 'ipl', 'all', 'time', 'ever', 'history', 'overall', 'career', 'over', 'overs',
+    'top', 'best', 'most', 'highest', 'lowest', 'leading', 'rank', 'ranked', 'ranking', 'rankings',
+    'against', 'vs', 'versus', 'facing', 'off',
+}
+
+class Intent:
+    """A recognized question: template name, SQL, bound parameters and the slots they came from"""
+
+    def __init__(self, name: str, sql: str, params: dict, slots: dict):
+        self.name = name
+        self.sql = sql
+        self.params = params
+        self.slots = slots
+
+
+class IntentEngine:
+    """Matches questions to parameterized templates, with names resolved by an EntityCatalog"""
+
+    def __init__(self, entities):
+        self.entities = entities
+
+    def extract_slots(self, question: str):
+        """Slots for the templates, or None when the question is outside what they cover"""
+        question = " ".join(question.lower().replace("'s ", " ").split())
+        if UNSUPPORTED.search(question) or NEGATION.search(question):
+            return None
+
+        if re.search(r"\b(economy|economical|expensive)\b", question):
+            metric = 'economy'
+        elif 'strike rate' in question or 'strike-rate' in question or re.search(r"\bsr\b", question):
+            if re.search(r"\b(bowlers?|bowling strike)\b", question):
+                return None
+            metric = 'strike_rate'
+        elif re.search(r"\b(sixes|six.?hitters?)\b", question):
+            metric = 'sixes'
+        elif re.search(r"\bfours\b", question):
+            metric = 'fours'
+        elif re.search(r"\bwickets?\b", question):
+            metric = 'wickets'
+        # "batters against spin bowling" ranks batters, so batting words win over "bowling"
+        elif re.search(r"\b(runs?|scorers?|scored|batters?|batsm[ae]n|batting|hitters?)\b", question):
+            metric = 'runs'
+        elif re.search(r"\b(bowlers?|bowling)\b", question):
+            metric = 'wickets'
+        else:
+            return None
+        slots = {'metric': metric}
+
+        # "Lowest strike rate" and "most expensive" rank the other way round from "best"
+        lowest = re.search(r"\blowest\b", question)
+        highest = re.search(r"\b(highest|expensive)\b", question)
+        if lowest and highest:
+            return None
+        if lowest:
+            if metric not in RATE_METRICS:
+                return None
+            slots['order'] = 'ASC'
+        elif highest and metric in RATE_METRICS:
+            slots['order'] = 'DESC'
+
+        matches = self.entities.tag(question)
+        players = [match for match in matches if match.kind == 'player']
+        # Two players, or a surname several players share, is more than one template can answer
+        if len(players) > 1 or (players and len(players[0].names) > 1):
+            return None
+        if players and OPPONENT_PATTERN.search(question[:players[0].start]):
+            # "Sixes off Rashid Khan" ranks the batters facing him, not his own batting
+            if not RANKING.search(question):
+                return None
+            slots['facing'] = players[0].names[0]
+        elif players:
+            slots['player'] = players[0].names[0]
+        elif not RANKING.search(question):
+            return None
+
+        for match in matches:
+            if match.kind == 'team':
+                slot = 'opponent' if OPPONENT_PATTERN.search(question[:match.start]) else 'team'
+            elif match.kind == 'venue':
+                slot = 'venues'
+            else:
+                continue
+            slots.setdefault(slot, []).extend(name for name in match.names if name not in slots.get(slot, []))
+        remaining = question
+        for match in matches:
+            remaining = remaining[:match.start] + " " * (match.end - match.start) + remaining[match.end:]
+
+        years = YEAR_PATTERN.findall(remaining)
+        if len(years) > 1:
+            return None
+        if years:
+            slots['year'] = (YEAR_OPERATORS[years[0][0] or None], int(years[0][1]))
+        for slot, choices in (('phase', PHASES), ('bowl_kind', BOWL_KINDS), ('bat_hand', BAT_HANDS)):
+            matched = [value for pattern, value in choices if pattern.search(remaining)]
+            if len(matched) > 1:
+                return None
+            if matched:
+                slots[slot] = matched[0]
+
+        limit = LIMIT_PATTERN.search(remaining)
+        if limit:
+            value = limit.group(1)
+            slots['limit'] = NUMBER_WORDS.get(value) or int(value)
+            if not 0 < slots['limit'] <= MAX_LIMIT:
+                return None
+
+        # Anything no slot consumed ("openers", "minimum 500 balls", "batting first") is a filter we would drop
+        consumed = [YEAR_PATTERN, METRIC_WORDS, LIMIT_PATTERN]
+        consumed += [pattern for choices in (PHASES, BOWL_KINDS, BAT_HANDS) for pattern, _ in choices]
+        for pattern in consumed:
+            remaining = pattern.sub(" ", remaining)
+        allowed = FILLER_WORDS | VENUE_WORDS if 'venues' in slots else FILLER_WORDS
+        if any(word not in allowed for word in tokens(remaining)):
+            return None
+        return slots
+
+    def match(self, question: str):
+        """The Intent for a recognized question, or None"""
+        try:
+            slots = self.extract_slots(question)
+        except Exception as e:
+            print(f"Intent matching failed: {e}")
+            return None
+        if slots is None:
+            return None
+        return build_intent(slots)
+
+
+def build_intent(slots: dict) -> Intent:
+    """Render the template for these slots; the SQL depends only on which slots are present"""
+    role, columns, ranked_on, order = METRICS[slots['metric']]
+    order = slots.get('order', order)
+    batting = role == 'batter'
+    conditions = [f'"{role}" != \'\'']
+    params = {}
+
+    if 'player' in slots:
+        conditions.append(f'"{role}" = :player')
+        params['player'] = slots['player']
+    if 'facing' in slots:
+        conditions.append(f'"{"bowler" if batting else "batter"}" = :facing')
+        params['facing'] = slots['facing']
+    if 'team' in slots:
+        conditions.append(f'"{"batting_team" if batting else "bowling_team"}" = ANY(:teams)')
+        params['teams'] = slots['team']
+    if 'opponent' in slots:
+        conditions.append(f'"{"bowling_team" if batting else "batting_team"}" = ANY(:opponents)')
+        params['opponents'] = slots['opponent']
+    if 'venues' in slots:
+        conditions.append('"venue" = ANY(:venues)')
+        params['venues'] = slots['venues']
+    if 'year' in slots:
+        operator, params['year'] = slots['year']
+        conditions.append(f'"year" {operator} :year')
+    for slot in ('phase', 'bowl_kind', 'bat_hand'):
+        if slot in slots:
+            conditions.append(f'"{slot}" = :{slot}')
+            params[slot] = slots[slot]
+
+    sql = (f'SELECT "{role}", ' + ", ".join(f"{MEASURES[column]} AS {column}" for column in columns)
+           + f"\nFROM ipl_balls\nWHERE {' AND '.join(conditions)}\nGROUP BY \"{role}\"")
+    if 'player' not in slots:
+        if slots['metric'] in ('strike_rate', 'economy'):
+            filtered = len(conditions) > 1
+            if batting:
+                params['min_balls'] = MIN_BALLS_FACED_FILTERED if filtered else MIN_BALLS_FACED
+            else:
+                params['min_balls'] = MIN_BALLS_BOWLED_FILTERED if filtered else MIN_BALLS_BOWLED
+            sql += "\nHAVING COUNT(*) >= :min_balls"
+        # The player name breaks ties, so equal totals always come back in the same order
+        sql += f"\nORDER BY {ranked_on} {order}, \"{role}\"\nLIMIT :limit"
+        params['limit'] = slots.get('limit', DEFAULT_LIMIT)
+
+    name = slots['metric'] if 'player' not in slots else f"player_{slots['metric']}"
+    return Intent(name, sql, params, slots)
@@ -1,20 +1,65 @@
 import pandas as pd
 from groq import Groq
-from sqlalchemy import create_engine, text
 import time
 import os
 from dotenv import load_dotenv
+from db import get_engine
+from query_guard import QueryGuard, QueryLimitError
+from summary_views import CUBE_PROMPT_SECTION, PACE_STYLES, SPIN_STYLES, existing_summary_views
+from bowling_types import classify_bowling_style
+from summary_maintenance import refresh_summaries
+from view_rewriter import rewrite_query
+from entity_resolver import EntityCatalog
+from intent_engine import IntentEngine
+from prompt_builder import PromptBuilder
+from example_store import ExampleStore
+from answer_cache import AnswerCache
+from sql_cache import SQLQueryCache
+from semantic_cache import SemanticQueryCache
+from schema_snapshot import (
+    current_data_version, estimated_row_count,
+    load_summary_snapshot, save_summary_snapshot, source_digest, table_stats
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
+LLM_MODEL = "llama3-8b-8192"
+DATA_VERSION_CHECK_SECONDS = float(os.getenv('DATA_VERSION_CHECK_SECONDS', '30'))
+VIEW_REWRITE = os.getenv('VIEW_REWRITE', 'true').lower() in ('1', 'true', 'yes', 'on')
+INTENT_ENGINE = os.getenv('INTENT_ENGINE', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+# Rendered schema summaries are persisted per data version and per version of this file
+SUMMARY_SNAPSHOT_NAME = f"enhanced_{source_digest(__file__)}"
+
 class IPLStatsEnhancedChatbot:
     def __init__(self, database_url: str, groq_api_key: str):
         """Initialize the Enhanced IPL Stats Chatbot with PostgreSQL backend"""
         self.database_url = database_url
         self.client = Groq(api_key=groq_api_key)
         self.engine = None
+        self.summary_views = []
+        self.live_stats = None  # set by live_ingest.start_live_ingest when LIVE_FEED is configured
+        self.data_version = None
+        self._data_version_checked_at = time.time()
+        self.answer_cache = AnswerCache(
+            max_entries=int(os.getenv('ANSWER_CACHE_SIZE', '500')),
+            ttl_seconds=float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+        )
+        self.sql_cache = SQLQueryCache(os.getenv('SQL_CACHE_PATH', 'sql_cache.db'), model=LLM_MODEL)
+        semantic_threshold = os.getenv('SEMANTIC_CACHE_THRESHOLD')
+        self.semantic_cache = SemanticQueryCache(
+            threshold=float(semantic_threshold) if semantic_threshold else None
+        )
+        self.example_store = ExampleStore()
+        for cached_question, cached_sql in self.sql_cache.entries():
+            self.semantic_cache.add(cached_question, cached_sql)
+            self.example_store.add(cached_question, cached_sql)
         self._connect_database()
+        self.entities = EntityCatalog(self.engine, self.summary_views)
+        self.semantic_cache.tagger = self.entities.tag
+        self.prompt_builder = PromptBuilder()
+        self.intent_engine = IntentEngine(self.entities) if INTENT_ENGINE else None
         self._create_data_summary()
         self._initialize_bowling_classifications()
     
@@ -22,215 +67,135 @@ class IPLStatsEnhancedChatbot:
         """Connect to PostgreSQL database"""
         print("Connecting to PostgreSQL database...")
         try:
-            self.engine = create_engine(self.database_url)
+            self.engine = get_engine(self.database_url)
+            self.query_guard = QueryGuard(self.engine)
             # Test connection
             with self.engine.connect() as conn:
-                result = conn.execute(text("SELECT COUNT(*) FROM ipl_balls")).fetchone()
-                print(f"✅ Connected to database with {result[0]:,} records")
+                row_count = estimated_row_count(conn)
+                self.summary_views = existing_summary_views(conn)
+                print(f"✅ Connected to database with ~{row_count:,} records")
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
             raise
     
     def _initialize_bowling_classifications(self):
-        """Initialize bowling style classifications"""
-        self.pace_styles = ['rm', 'rfm', 'rmf', 'lf', 'lfm', 'lmf']
-        self.spin_styles = ['ob', 'lb', 'sla', 'lbg', 'lws']
+        """Initialize bowling style classifications (the same rule generates "bowl_kind")"""
+        self.pace_styles = list(PACE_STYLES)
+        self.spin_styles = list(SPIN_STYLES)
+        self.classify_bowling_style = classify_bowling_style
         
     def _create_data_summary(self):
         """Create a comprehensive summary of the database schema for the LLM"""
+        stats = None
         try:
             with self.engine.connect() as conn:
-                # Get basic stats
-                stats = conn.execute(text("""
-                    SELECT 
-                        COUNT(*) as total_records,
-                        COUNT(DISTINCT season) as seasons,
-                        COUNT(DISTINCT match_id) as matches,
-                        MIN(date) as first_date,
-                        MAX(date) as last_date,
-                        MIN(year) as first_year,
-                        MAX(year) as last_year
-                    FROM ipl_balls
-                """)).fetchone()
+                self.data_version = current_data_version(conn)
                 
-                # Get teams
-                teams = conn.execute(text("""
-                    SELECT DISTINCT batting_team 
-                    FROM ipl_balls 
-                    WHERE batting_team != '' 
-                    ORDER BY batting_team
-                """)).fetchall()
+                # Reuse the summary rendered by a previous start for the same data
+                snapshot = load_summary_snapshot(SUMMARY_SNAPSHOT_NAME, self.data_version)
+                if snapshot:
+                    print(f"Loaded schema summary snapshot for data version {self.data_version}")
+                    self.data_summary = snapshot
+                    return
                 
-                team_list = [team[0] for team in teams][:15]  # Top 15 teams
+                # Get basic stats from load-time metadata or planner statistics
+                table = table_stats(conn)
+                stats = (table['total_records'], table['seasons'], table['matches'],
+                         table['first_date'], table['last_date'], table['first_year'], table['last_year'])
+                team_list = table['teams'][:15]  # Top 15 teams
                 
         except Exception as e:
             print(f"Error getting database stats: {e}")
+        
+        if stats is None:
             stats = (277935, 17, 1000, '2008-04-18', '2024-05-26', 2008, 2024)
             team_list = ['CSK', 'MI', 'RCB', 'KKR', 'SRH', 'DC', 'PBKS', 'RR', 'GT', 'LSG']
-
-        self.data_summary = f"""
-Enhanced PostgreSQL IPL Database Schema:
-- Total records: {stats[0]:,} ball-by-ball records
+            
+        # Columns, definitions and examples are added per question by the prompt builder
+        self.data_summary = f"""- Total records: {stats[0]:,} ball-by-ball records
 - Seasons: {stats[5]}-{stats[6]} ({stats[1]} seasons)
 - Total matches: {stats[2]:,}
 - Date range: {stats[3]} to {stats[4]}
 - Teams: {team_list}
-
-CRITICAL TABLE STRUCTURE - ipl_balls:
-Core Columns (ALWAYS use these exact names with quotes):
-- Match Info: "season", "year", "date", "venue", "match_id", "innings", "batting_team", "bowling_team"
-- Ball Details: "over", "ball", "batter", "bowler", "runs_batter", "runs_total" 
-- Results: "isFour", "isSix", "isWicket" (BOOLEAN columns)
-- Player Info: "bowling_style", "bat_hand"
-- Current Stats: "curr_batter_runs", "curr_batter_balls", "curr_batter_fours", "curr_batter_sixes"
-- Match Results: "playerofmatch", "winner"
-
-BOWLING STYLE CLASSIFICATION:
-- Pace Bowlers: bowling_style IN ('rm','rfm','rmf','lf','lfm','lmf') OR bowling_style LIKE '%rm%' OR bowling_style LIKE '%rf%'
-- Spin Bowlers: bowling_style IN ('ob','lb','sla','lbg','lws') OR bowling_style NOT LIKE ANY pace patterns
-
-PHASE DEFINITIONS:
-- Powerplay: "over" <= 6
-- Middle overs: "over" >= 7 AND "over" <= 15
-- Death overs: "over" >= 16
-
-STATISTICAL CALCULATIONS:
-For Batting Stats:
-- Strike Rate = (Total Runs / Total Balls) * 100
-- Batting Average = Total Runs / Times Out (where batter got out, not just balls faced)
-- To find dismissals: COUNT balls where "isWicket" = TRUE AND "batter" = specific batter
-
-For Bowling Stats:
-- Economy Rate = (Total Runs Conceded / Total Balls) * 6
-- Bowling Average = Total Runs Conceded / Total Wickets
-- Strike Rate = Total Balls / Total Wickets
-- Use only records where bowler actually bowled the ball
-
-For Death Overs Analysis:
-- Filter: "over" >= 16
-- For pace vs batters: ADD bowling style filters
-- Include strike rates, averages, boundaries
-
-IMPORTANT NOTES:
-1. ALL column names MUST be in quotes: "batter", "over", etc.
-2. Boolean columns: "isFour", "isSix", "isWicket" 
-3. For dismissals: Use "isWicket" = TRUE to identify when batter got out
-4. For bowling analysis: Only count balls actually bowled by the bowler
-5. Minimum thresholds: 100+ balls for batting, 50+ balls for bowling stats
 """
+        if self.data_version is not None:
+            save_summary_snapshot(SUMMARY_SNAPSHOT_NAME, self.data_version, self.data_summary)
 
+    def _llm_messages(self, user_question: str) -> list:
+        """Prompt messages for this question: cached system prefix plus its topics, names and examples"""
+        cubes = CUBE_PROMPT_SECTION if any(view.kind == 'table' for view in self.summary_views) else ""
+        return self.prompt_builder.messages(
+            user_question, self.data_summary, cubes=cubes,
+            entity_hint=self.entities.prompt_hint(user_question),
+            examples=self.example_store.search(user_question)
+        )
+    
+    @staticmethod
+    def _clean_llm_sql(query_code: str) -> str:
+        """Strip markdown fences and trailing semicolons from the LLM's reply"""
+        if "```sql" in query_code:
+            query_code = query_code.split("```sql")[1].split("```")[0].strip()
+        elif "```" in query_code:
+            query_code = query_code.split("```")[1].strip()
+        return query_code.rstrip(';').strip()
+    
     def _get_query_from_llm(self, user_question: str) -> str:
         """Use Groq LLM to convert natural language to SQL query"""
-        
-        prompt = f"""
-You are an expert PostgreSQL analyst specializing in cricket statistics. Convert the user's question to a precise SQL query.
-
-Database Schema:
-{self.data_summary}
-
-CRITICAL QUERY RULES:
-1. Table name: ipl_balls (MUST use exactly this)
-2. ALL column names in quotes: "batter", "bowler", "over", "runs_batter", etc.
-3. ALWAYS filter out empty names: WHERE "batter" != '' AND "batter" IS NOT NULL
-4. For batting stats, calculate proper averages using dismissals
-5. For bowling stats, use proper wicket counts and balls bowled
-6. ALWAYS include minimum thresholds for meaningful stats
-7. Sort by the main metric DESC and LIMIT 10-15 results
-8. ALWAYS use proper PostgreSQL syntax with explicit casts ::numeric, ::int
-9. For year filtering, use "year" = YYYY (integer column)
-10. Use CASE WHEN for conditional counts
-
-EXAMPLE QUERIES:
-
-Top Run Scorers with complete stats:
-SELECT 
-    "batter",
-    COUNT(*) as balls_faced,
-    SUM("runs_batter") as total_runs,
-    SUM("isFour"::int) as fours,
-    SUM("isSix"::int) as sixes,
-    ROUND(AVG("runs_batter"::numeric), 2) as avg_per_ball,
-    ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) as strike_rate,
-    COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as times_out,
-    ROUND(SUM("runs_batter")::numeric / NULLIF(COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END), 0), 2) as batting_average
-FROM ipl_balls 
-WHERE "batter" != '' AND "batter" IS NOT NULL
-GROUP BY "batter"
-HAVING SUM("runs_batter") > 500
-ORDER BY total_runs DESC LIMIT 10;
-
-Death Overs vs Pace:
-SELECT 
-    "batter",
-    COUNT(*) as death_balls_vs_pace,
-    SUM("runs_batter") as death_runs,
-    ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) as death_sr_vs_pace,
-    SUM("isFour"::int) + SUM("isSix"::int) as boundaries
-FROM ipl_balls 
-WHERE "over" >= 16 
-    AND ("bowling_style" LIKE '%rm%' OR "bowling_style" LIKE '%rf%' OR "bowling_style" IN ('rm','rfm','rmf','lf','lfm','lmf'))
-    AND "batter" != '' AND "batter" IS NOT NULL
-GROUP BY "batter"
-HAVING COUNT(*) >= 30
-ORDER BY death_runs DESC LIMIT 10;
-
-Top Wicket Takers:
-SELECT 
-    "bowler",
-    COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as wickets,
-    COUNT(*) as balls_bowled,
-    SUM("runs_total") as runs_conceded,
-    ROUND(SUM("runs_total")::numeric / NULLIF(COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END), 0), 2) as bowling_avg,
-    ROUND((SUM("runs_total")::numeric / NULLIF(COUNT(*), 0)) * 6, 2) as economy_rate
-FROM ipl_balls 
-WHERE "bowler" != '' AND "bowler" IS NOT NULL
-GROUP BY "bowler"
-HAVING COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) >= 10
-ORDER BY wickets DESC LIMIT 10;
-
-User Question: {user_question}
-
-Return ONLY the complete SQL query with proper filtering and statistics:
-"""
+        messages = self._llm_messages(user_question)
 
         try:
             response = self.client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[{"role": "user", "content": prompt}],
+                model=LLM_MODEL,
+                messages=messages,
                 temperature=0.1,
                 max_tokens=800
             )
             
             query_code = response.choices[0].message.content.strip()
-            
-            # Clean up the response
-            if "```sql" in query_code:
-                query_code = query_code.split("```sql")[1].split("```")[0].strip()
-            elif "```" in query_code:
-                query_code = query_code.split("```")[1].strip()
-            
-            # Remove trailing semicolons
-            query_code = query_code.rstrip(';').strip()
-            
-            return query_code
+            self.prompt_builder.record_usage(messages, response, query_code)
+            return self._clean_llm_sql(query_code)
             
         except Exception as e:
             print(f"Error getting query from LLM: {e}")
             return None
     
-    def _execute_query(self, query_code: str):
-        """Execute SQL query and return results as DataFrame"""
+    def _rewrite_query(self, query_code: str) -> str:
+        """Answer the query from a covering summary view or cube when one exists"""
+        if VIEW_REWRITE:
+            query_code, view_name = rewrite_query(query_code, self.summary_views)
+            if view_name:
+                print(f"Answering from summary view {view_name}")
+        return query_code
+    
+    def _execute_query(self, query_code: str, params: dict = None, generated: bool = False,
+                       rewrite: bool = None):
+        """Execute SQL query and return results as DataFrame
+        
+        Returns None on SQL errors; raises QueryLimitError when the statement
+        timeout, the row cap or the cost gate trips so callers can explain the fallback.
+        Generated SQL (from the LLM or the caches) is first rewritten onto a
+        covering summary view or cube and then gated on its EXPLAIN cost estimate;
+        pass rewrite=True to rewrite hand-written SQL without the cost gate.
+        """
+        if rewrite is None:
+            rewrite = generated
+        if rewrite:
+            query_code = self._rewrite_query(query_code)
+        
         try:
             print(f"Executing query: {query_code[:100]}...")
             start_time = time.time()
             
-            result_df = pd.read_sql(query_code, self.engine)
+            result_df = self.query_guard.run(query_code, params, check_cost=generated)
             
             execution_time = time.time() - start_time
             print(f"Query executed in {execution_time:.2f}s, returned {len(result_df)} rows")
             
             return result_df
             
+        except QueryLimitError as e:
+            print(f"Query stopped by limits: {e}")
+            raise
         except Exception as e:
             print(f"Error executing query: {e}")
             return None
@@ -341,7 +306,7 @@ Return ONLY the complete SQL query with proper filtering and statistics:
                 HAVING SUM("runs_batter") > 500
                 ORDER BY total_runs DESC LIMIT 12
                 '''
-                result = self._execute_query(query)
+                result = self._execute_query(query, rewrite=True)
                 return self._format_result(result, question)
             
             # Top wicket takers with bowling stats
@@ -360,7 +325,7 @@ Return ONLY the complete SQL query with proper filtering and statistics:
                 HAVING COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) >= 15
                 ORDER BY wickets DESC LIMIT 12
                 '''
-                result = self._execute_query(query)
+                result = self._execute_query(query, rewrite=True)
                 return self._format_result(result, question)
             
             # Death overs vs pace with comprehensive stats
@@ -375,14 +340,14 @@ Return ONLY the complete SQL query with proper filtering and statistics:
                     SUM("isFour"::int) as fours,
                     SUM("isSix"::int) as sixes
                 FROM ipl_balls 
-                WHERE "over" >= 16 
-                    AND ("bowling_style" LIKE '%rm%' OR "bowling_style" LIKE '%rf%' OR "bowling_style" IN ('rm','rfm','rmf','lf','lfm','lmf'))
+                WHERE "phase" = 3 
+                    AND "bowl_kind" = 'pace'
                     AND "batter" != '' AND "batter" IS NOT NULL
                 GROUP BY "batter"
                 HAVING COUNT(*) >= 25
                 ORDER BY death_runs DESC LIMIT 12
                 '''
-                result = self._execute_query(query)
+                result = self._execute_query(query, rewrite=True)
                 return self._format_result(result, question)
             
             # Strike rate in death overs
@@ -395,12 +360,12 @@ Return ONLY the complete SQL query with proper filtering and statistics:
                     ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) as death_sr,
                     SUM("isFour"::int) + SUM("isSix"::int) as boundaries
                 FROM ipl_balls 
-                WHERE "over" >= 16 AND "batter" != '' AND "batter" IS NOT NULL
+                WHERE "phase" = 3 AND "batter" != '' AND "batter" IS NOT NULL
                 GROUP BY "batter"
                 HAVING COUNT(*) >= 30 AND SUM("runs_batter") > 100
                 ORDER BY death_sr DESC LIMIT 12
                 '''
-                result = self._execute_query(query)
+                result = self._execute_query(query, rewrite=True)
                 return self._format_result(result, question)
             
             # Season-specific queries (2024, 2023, etc.)
@@ -428,7 +393,7 @@ Return ONLY the complete SQL query with proper filtering and statistics:
                     HAVING SUM("runs_batter") > 200
                     ORDER BY total_runs DESC LIMIT 12
                     '''
-                    result = self._execute_query(query)
+                    result = self._execute_query(query, rewrite=True)
                     return self._format_result(result, question)
             
             else:
@@ -459,36 +424,159 @@ Return ONLY the complete SQL query with proper filtering and statistics:
 
 **Example:** Try "Best batters vs pace bowling in death overs" for comprehensive statistics!"""
     
+    def _run_intent(self, question: str):
+        """Answer a recognized question shape from its parameterized template, or None"""
+        if self.intent_engine is None:
+            return None
+        intent = self.intent_engine.match(question)
+        if intent is None:
+            return None
+        print(f"Matched intent {intent.name}: {intent.params}")
+        
+        try:
+            result = self._execute_query(intent.sql, intent.params, rewrite=True)
+        except QueryLimitError:
+            return None
+        if result is None or len(result) == 0:
+            return None
+        return result
+    
+    def _cached_sql(self, question: str):
+        """(SQL, whether it was cached for a similar question) for previously verified SQL, or None"""
+        query_code = self.sql_cache.get(question)
+        if query_code:
+            print("Using cached SQL query")
+            return query_code, False
+        # Fall back to SQL cached for a differently worded but similar question
+        match = self.semantic_cache.lookup(question)
+        if not match:
+            return None
+        query_code, similarity, matched_question = match
+        print(f"Using SQL cached for similar question ({similarity:.2f}): {matched_question}")
+        return query_code, True
+    
+    def _forget_sql(self, question: str, query_code: str):
+        """The cached SQL no longer works (e.g. schema change), so forget it"""
+        self.sql_cache.invalidate(question)
+        self.semantic_cache.evict_sql(query_code)
+        self.example_store.remove_sql(query_code)
+    
+    def _remember_sql(self, question: str, query_code: str, rows: int):
+        """Keep generated SQL that worked for the caches and as a future prompt example"""
+        self.sql_cache.put(question, query_code, rows)
+        self.semantic_cache.add(question, query_code)
+        self.example_store.add(question, query_code)
+    
+    def _run_cached_query(self, question: str):
+        """Execute previously verified SQL for this question, if any"""
+        cached = self._cached_sql(question)
+        if not cached:
+            return None
+        query_code, similar = cached
+        
+        try:
+            result = self._execute_query(query_code, generated=True)
+        except QueryLimitError:
+            result = None
+        if result is None or len(result) == 0:
+            self._forget_sql(question, query_code)
+            return None
+        
+        # SQL borrowed from a similar question is not stored under this one, so a near miss cannot stick
+        if not similar:
+            self.sql_cache.put(question, query_code, len(result))
+        return result
+    
+    def live_answer(self, question: str):
+        """Answer 'today'/'live' questions from streamed match state, or None"""
+        if self.live_stats is None:
+            return None
+        return self.live_stats.answer(question)
+    
+    def check_data_version(self):
+        """Pick up data loads and refreshes made by other processes, at most every few seconds"""
+        now = time.time()
+        if now - self._data_version_checked_at < DATA_VERSION_CHECK_SECONDS:
+            return
+        self._data_version_checked_at = now
+        
+        try:
+            with self.engine.connect() as conn:
+                data_version = current_data_version(conn)
+        except Exception as e:
+            print(f"Error checking data version: {e}")
+            return
+        
+        if data_version != self.data_version:
+            print(f"Data version changed: {self.data_version} -> {data_version}")
+            self._data_changed(data_version)
+            self._create_data_summary()
+    
+    def _data_changed(self, data_version: str, summary_views=None):
+        """The one place a new data version is adopted: names are reloaded and cached answers dropped"""
+        self.data_version = data_version
+        self.entities.invalidate(summary_views)
+        self.answer_cache.clear()
+    
     def ask(self, question: str) -> str:
         """Main method with enhanced query handling"""
         print(f"\nQuestion: {question}")
-        print("Generating SQL query...")
         
-        # Try to get SQL query from LLM
-        query_code = self._get_query_from_llm(question)
-        if not query_code:
-            return self._try_enhanced_fallback_queries(question)
+        # Live questions change ball by ball, so they bypass every cache
+        live = self.live_answer(question)
+        if live is not None:
+            return live
+        
+        # Serve repeat questions straight from the answer cache
+        self.check_data_version()
+        data_version = self.data_version
+        cached_answer = self.answer_cache.get(question, data_version)
+        if cached_answer is not None:
+            print("Answer served from cache")
+            return cached_answer
         
-        # Execute the query
-        result = self._execute_query(query_code)
+        # Recognized question shapes skip the LLM; otherwise reuse SQL that already worked for this question
+        result = self._run_intent(question)
+        if result is None:
+            result = self._run_cached_query(question)
         
-        # If query failed, try enhanced fallback
-        if result is None or (isinstance(result, pd.DataFrame) and len(result) == 0):
-            print("Primary query failed, trying enhanced fallback...")
-            return self._try_enhanced_fallback_queries(question)
+        if result is None:
+            print("Generating SQL query...")
+            
+            # Try to get SQL query from LLM
+            query_code = self._get_query_from_llm(question)
+            if not query_code:
+                return self._try_enhanced_fallback_queries(question)
+            
+            # Execute the query, falling back to a known-good query if it trips the limits
+            try:
+                result = self._execute_query(query_code, generated=True)
+            except QueryLimitError as e:
+                print("Primary query exceeded limits, trying fallback...")
+                return f"⚠️ {e} Showing the closest standard query instead.\n\n" + self._try_enhanced_fallback_queries(question)
+            
+            # If query failed, try enhanced fallback
+            if result is None or (isinstance(result, pd.DataFrame) and len(result) == 0):
+                print("Primary query failed, trying enhanced fallback...")
+                return self._try_enhanced_fallback_queries(question)
+            
+            self._remember_sql(question, query_code, len(result))
         
         # Format and return result
         formatted_result = self._format_result(result, question)
+        self.answer_cache.put(question, formatted_result, data_version)
         print(f"\nAnswer:\n{formatted_result}")
         return formatted_result
     
-    def refresh_materialized_views(self):
-        """Refresh materialized views for optimal performance"""
+    def refresh_materialized_views(self, match_ids=None, full: bool = False):
+        """Fold new matches into the summary tables and refresh the views built on them"""
         try:
+            result = refresh_summaries(self.engine, match_ids=match_ids, full=full)
             with self.engine.connect() as conn:
-                conn.execute(text("REFRESH MATERIALIZED VIEW IF EXISTS batting_summary;"))
-                conn.execute(text("REFRESH MATERIALIZED VIEW IF EXISTS bowling_summary;"))
-                conn.commit()
-                print("✅ Materialized views refreshed successfully")
+                self.summary_views = existing_summary_views(conn)
+            self._data_changed(result['data_version'], self.summary_views)
+            print("✅ Materialized views refreshed successfully")
+            return result
         except Exception as e:
-            print(f"Error refreshing views: {e}")
\ No newline at end of file
+            print(f"Error refreshing views: {e}")
+            raise
\ No newline at end of file
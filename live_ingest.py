@@ -0,0 +1,470 @@
+"""Stream ball-by-ball JSON into ipl_balls and keep live match stats in memory.
+
+The feed is one JSON object per line, keyed by ipl_balls column names, read by
+tailing a local file or from a TCP socket (tcp://host:port). Every ball updates
+LiveStats immediately, so "how is Kohli doing today" is answered from memory
+within the same poll interval. Balls are inserted in micro-batches of
+LIVE_BATCH_SIZE rows or every LIVE_FLUSH_SECONDS, whichever comes first.
+
+A {"event": "match_end", "match_id": ...} line (or the next match starting)
+finishes a match: it is folded into the summary tables. Until then the match is
+listed in live_matches so periodic refreshes leave its partial rows alone. A
+failed insert is retried on the next tick; once more than LIVE_MAX_PENDING
+balls are waiting, the oldest are appended to LIVE_DEAD_LETTER instead.
+
+Besides ipl_balls columns, a ball may carry "player_out", "dismissal_kind"
+(e.g. "run out") and "extras_type" (e.g. "legbyes") with "runs_extras"; they
+keep run outs out of bowler wickets and byes out of runs conceded.
+
+    python live_ingest.py feed.jsonl                 # insert + stats, tail from the end
+    python live_ingest.py tcp://localhost:9000 --from-start
+
+Chatbots started with LIVE_FEED set tail the same feed for stats only; only one
+process (this script, or an app with LIVE_FEED_INSERT=true) should insert.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+LIVE_BATCH_SIZE = int(os.getenv('LIVE_BATCH_SIZE', '200'))
+LIVE_FLUSH_SECONDS = float(os.getenv('LIVE_FLUSH_SECONDS', '0.5'))
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '0.1'))
+LIVE_STATS_RETENTION_HOURS = float(os.getenv('LIVE_STATS_RETENTION_HOURS', '24'))
+LIVE_MAX_PENDING = int(os.getenv('LIVE_MAX_PENDING', '50000'))
+LIVE_DEAD_LETTER = os.getenv('LIVE_DEAD_LETTER', 'live_dead_letter.jsonl')
+
+LIVE_KEYWORDS = ('today', 'live', 'right now', 'currently', 'this match', 'current match', 'so far')
+# Whole words only: "live" must not match "deliveries", nor "score" "scorers"
+LIVE_PATTERN = re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in LIVE_KEYWORDS) + r")\b")
+# Wording that asks for every match in progress; "so far" alone does not
+EXPLICIT_LIVE_PATTERN = re.compile(r"\b(today|live|right now|currently|this match|current match)\b")
+SCORE_PATTERN = re.compile(r"\b(score|scores|scorecard|match|matches)\b")
+# Seasons, careers and history are never answered from today's matches
+HISTORICAL_PATTERN = re.compile(r"\b((19|20)\d{2}|history|historic|career|all[- ]time|seasons?|ever)\b")
+LIVE_MATCHES_TABLE = 'live_matches'
+
+# Feed fields used by LiveStats that ipl_balls need not have
+FEED_ONLY_FIELDS = {'event', 'player_out', 'dismissal_kind', 'wicket_kind', 'extras_type', 'extra_type', 'runs_extras'}
+# Dismissals not credited to the bowler
+NON_BOWLER_DISMISSALS = {'run out', 'retired hurt', 'retired out', 'retired not out', 'obstructing the field'}
+# Extras not charged to the bowler
+NON_BOWLER_EXTRAS = {'bye', 'byes', 'legbye', 'legbyes'}
+
+
+def _flag(ball: dict, column: str) -> bool:
+    value = ball.get(column)
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 't', '1', 'yes')
+    return bool(value)
+
+
+def _int(ball: dict, column: str) -> int:
+    try:
+        return int(ball.get(column) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _bowler_wicket(ball: dict) -> bool:
+    kind = ball.get('dismissal_kind') or ball.get('wicket_kind') or ''
+    return _flag(ball, 'isWicket') and kind.strip().lower() not in NON_BOWLER_DISMISSALS
+
+
+def _runs_conceded(ball: dict) -> int:
+    """Runs charged to the bowler: byes and leg byes are not"""
+    extras_type = (ball.get('extras_type') or ball.get('extra_type') or '').lower()
+    if extras_type.replace('-', '').replace('_', '').replace(' ', '') not in NON_BOWLER_EXTRAS:
+        return _int(ball, 'runs_total')
+    extras = _int(ball, 'runs_extras') if ball.get('runs_extras') is not None else \
+        _int(ball, 'runs_total') - _int(ball, 'runs_batter')
+    return _int(ball, 'runs_total') - extras
+
+
+class LiveStats:
+    """Running batter, bowler and team aggregates for matches in progress"""
+
+    def __init__(self, retention_hours: float = None):
+        self.retention_seconds = 3600 * (retention_hours or LIVE_STATS_RETENTION_HOURS)
+        self.matches = {}
+        self._lock = threading.Lock()
+
+    def add_ball(self, ball: dict):
+        match_id = ball.get('match_id')
+        batter, bowler = ball.get('batter'), ball.get('bowler')
+        runs_batter, runs_total = _int(ball, 'runs_batter'), _int(ball, 'runs_total')
+        wicket = _flag(ball, 'isWicket')
+        with self._lock:
+            match = self.matches.get(match_id)
+            if match is None:
+                match = self.matches[match_id] = {
+                    'match_id': match_id, 'date': ball.get('date'), 'venue': ball.get('venue'),
+                    'teams': {}, 'batters': {}, 'bowlers': {}, 'finished': False,
+                }
+            match['updated_at'] = time.time()
+
+            team = match['teams'].setdefault(ball.get('batting_team'), {'runs': 0, 'wickets': 0, 'balls': 0})
+            team['runs'] += runs_total
+            team['balls'] += 1
+            team['wickets'] += wicket
+
+            if batter:
+                batting = match['batters'].setdefault(batter, {
+                    'team': ball.get('batting_team'), 'runs': 0, 'balls': 0, 'fours': 0, 'sixes': 0, 'out': False,
+                })
+                batting['runs'] += runs_batter
+                batting['balls'] += 1
+                batting['fours'] += _flag(ball, 'isFour')
+                batting['sixes'] += _flag(ball, 'isSix')
+            if wicket:
+                dismissed = ball.get('player_out') or batter
+                if dismissed in match['batters']:
+                    match['batters'][dismissed]['out'] = True
+            if bowler:
+                bowling = match['bowlers'].setdefault(bowler, {
+                    'team': ball.get('bowling_team'), 'balls': 0, 'runs': 0, 'wickets': 0,
+                })
+                bowling['balls'] += 1
+                bowling['runs'] += _runs_conceded(ball)
+                bowling['wickets'] += _bowler_wicket(ball)
+
+    def finish_match(self, match_id):
+        with self._lock:
+            if match_id in self.matches:
+                self.matches[match_id]['finished'] = True
+
+    def _recent_matches(self) -> list:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for match_id in [m for m, match in self.matches.items() if match['updated_at'] < cutoff]:
+                del self.matches[match_id]
+            return [json.loads(json.dumps(match)) for match in self.matches.values()]
+
+    def answer(self, question: str):
+        """Answer a 'today'/'live' question about a player or team from memory, or None"""
+        question_lower = question.lower()
+        if not LIVE_PATTERN.search(question_lower) or HISTORICAL_PATTERN.search(question_lower):
+            return None
+        matches = self._recent_matches()
+        if not matches:
+            return None
+
+        lines = []
+        for match in matches:
+            for name, batting in match['batters'].items():
+                if _mentions(question_lower, name):
+                    strike_rate = 100 * batting['runs'] / batting['balls'] if batting['balls'] else 0
+                    status = 'out' if batting['out'] else 'not out'
+                    lines.append(f"🏏 **{name}** ({batting['team']}): {batting['runs']} ({batting['balls']} balls, "
+                                 f"{batting['fours']}x4, {batting['sixes']}x6, SR {strike_rate:.1f}) - {status}")
+            for name, bowling in match['bowlers'].items():
+                if _mentions(question_lower, name):
+                    overs = f"{bowling['balls'] // 6}.{bowling['balls'] % 6}"
+                    lines.append(f"🎯 **{name}** ({bowling['team']}): {bowling['wickets']}/{bowling['runs']} "
+                                 f"in {overs} overs")
+            for team_name, team in match['teams'].items():
+                if team_name and _mentions(question_lower, team_name):
+                    lines.append(f"📊 **{team_name}**: {team['runs']}/{team['wickets']} "
+                                 f"after {team['balls'] // 6}.{team['balls'] % 6} overs")
+        if not lines and EXPLICIT_LIVE_PATTERN.search(question_lower) and SCORE_PATTERN.search(question_lower):
+            for match in matches:
+                for team_name, team in match['teams'].items():
+                    lines.append(f"📊 **{team_name}**: {team['runs']}/{team['wickets']} "
+                                 f"after {team['balls'] // 6}.{team['balls'] % 6} overs")
+        if not lines:
+            return None
+        return "**Live match stats:**\n\n" + "\n".join(lines)
+
+
+def _mentions(question_lower: str, name: str) -> bool:
+    """True when the question names the player or team, by full name or surname"""
+    name_lower = name.lower()
+    if re.search(r"\b" + re.escape(name_lower) + r"\b", question_lower):
+        return True
+    surname = name_lower.split()[-1] if name_lower.split() else ''
+    return len(surname) > 2 and surname in question_lower.replace('?', ' ').split()
+
+
+def tail_lines(path: str, from_start: bool = False, poll_seconds: float = None):
+    """Yield lines appended to a file (None while idle), following truncation and rotation"""
+    poll_seconds = poll_seconds or LIVE_POLL_SECONDS
+    while not os.path.exists(path):
+        yield None
+        time.sleep(poll_seconds)
+    f = open(path)
+    if not from_start:
+        f.seek(0, os.SEEK_END)
+    inode = os.fstat(f.fileno()).st_ino
+    partial = ''
+    while True:
+        line = f.readline()
+        if line:
+            partial += line
+            if partial.endswith('\n'):
+                yield partial
+                partial = ''
+            continue
+        yield None
+        time.sleep(poll_seconds)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_ino != inode or stat.st_size < f.tell():
+            f.close()
+            f = open(path)
+            inode = os.fstat(f.fileno()).st_ino
+            partial = ''
+
+
+def socket_lines(address: str, poll_seconds: float = None):
+    """Yield lines from tcp://host:port (None while idle), reconnecting with backoff"""
+    poll_seconds = poll_seconds or LIVE_POLL_SECONDS
+    host, port = address[len('tcp://'):].rsplit(':', 1)
+    backoff = 1
+    while True:
+        try:
+            with socket.create_connection((host, int(port)), timeout=poll_seconds) as connection:
+                backoff = 1
+                buffer = b''
+                while True:
+                    try:
+                        chunk = connection.recv(65536)
+                    except socket.timeout:
+                        yield None
+                        continue
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    *lines, buffer = buffer.split(b'\n')
+                    for line in lines:
+                        yield line.decode('utf-8') + '\n'
+        except OSError as e:
+            print(f"Live feed {address} unavailable ({e}), retrying in {backoff}s")
+        yield None
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+def feed_lines(source: str, from_start: bool = False):
+    if source.startswith('tcp://'):
+        return socket_lines(source)
+    return tail_lines(source, from_start=from_start)
+
+
+class LiveIngest:
+    """Reads a feed into LiveStats and, when given an engine, into ipl_balls"""
+
+    def __init__(self, source: str, stats: LiveStats = None, engine=None, from_start: bool = False,
+                 batch_size: int = None, flush_seconds: float = None, max_pending: int = None,
+                 dead_letter: str = None):
+        self.source = source
+        self.stats = stats or LiveStats()
+        self.engine = engine
+        self.from_start = from_start
+        self.batch_size = batch_size or LIVE_BATCH_SIZE
+        self.flush_seconds = flush_seconds or LIVE_FLUSH_SECONDS
+        self.max_pending = max_pending or LIVE_MAX_PENDING
+        self.dead_letter = dead_letter or LIVE_DEAD_LETTER
+        self.columns = None
+        self.current_match = None
+        self.inserted = 0
+        self._pending = []
+        self._partition_years = set()
+        # Matches finished while some of their balls were still waiting to be inserted
+        self._finished_unflushed = set()
+        self._last_flush = time.monotonic()
+
+    def _table_columns(self) -> list:
+        if self.columns is None:
+            with self.engine.connect() as conn:
+                self.columns = [row[0] for row in conn.execute(text("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'ipl_balls' AND table_schema = current_schema()
+                      AND is_generated = 'NEVER'
+                    ORDER BY ordinal_position
+                """)).fetchall()]
+        return self.columns
+
+    def _mark_live(self, match_id):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {LIVE_MATCHES_TABLE} AS
+                SELECT "match_id", now() AS started_at FROM ipl_balls WITH NO DATA
+            """))
+            conn.execute(text(f"""
+                INSERT INTO {LIVE_MATCHES_TABLE} ("match_id", started_at)
+                SELECT :match_id, now()
+                WHERE NOT EXISTS (SELECT 1 FROM {LIVE_MATCHES_TABLE} WHERE "match_id" = :match_id)
+            """), {'match_id': match_id})
+
+    def flush(self):
+        """Insert buffered balls in one statement"""
+        if not self._pending or self.engine is None:
+            self._pending = []
+            self._last_flush = time.monotonic()
+            return
+        from psycopg2.extras import execute_values
+
+        known = set(self._table_columns())
+        columns = [column for column in self.columns if any(column in ball for ball in self._pending)]
+        unknown = {key for ball in self._pending for key in ball} - known - FEED_ONLY_FIELDS
+        if unknown:
+            print(f"Ignoring feed fields not in ipl_balls: {sorted(unknown)}")
+        rows = [tuple(ball.get(column) for column in columns) for ball in self._pending]
+        # A new season needs its partition first, or its balls land in the default partition
+        years = {_int(ball, 'year') for ball in self._pending} - self._partition_years - {0}
+        if years:
+            from migrate_partitions import ensure_year_partitions
+            with self.engine.begin() as conn:
+                ensure_year_partitions(conn, years)
+            self._partition_years |= years
+        # A finished match is already in the rollups; take it out so its late balls are added with the rest
+        refold = {ball.get('match_id') for ball in self._pending} & self._finished_unflushed
+        if refold:
+            from summary_maintenance import MAINTENANCE_LOCK_SQL, apply_match_delta
+            with self.engine.begin() as conn:
+                conn.execute(text(MAINTENANCE_LOCK_SQL))
+                apply_match_delta(conn, refold, sign=-1)
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                execute_values(cursor, f"INSERT INTO ipl_balls ({column_list}) VALUES %s", rows,
+                               page_size=self.batch_size)
+            connection.commit()
+        finally:
+            connection.close()
+        self.inserted += len(rows)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        if refold:
+            from summary_maintenance import refresh_summaries
+            refresh_summaries(self.engine, match_ids=list(refold))
+            self._finished_unflushed -= refold
+
+    def try_flush(self) -> bool:
+        """flush(), keeping the batch for the next attempt on failure and dead-lettering what exceeds max_pending"""
+        try:
+            self.flush()
+            return True
+        except Exception as e:
+            # Stats are already up to date; the batch is retried on the next tick
+            print(f"Error inserting live balls: {e}")
+            self._last_flush = time.monotonic()
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                self._dead_letter(self._pending[:overflow])
+                self._pending = self._pending[overflow:]
+            return False
+
+    def _dead_letter(self, balls: list):
+        try:
+            with open(self.dead_letter, 'a') as f:
+                for ball in balls:
+                    f.write(json.dumps(ball, default=str) + "\n")
+            print(f"⚠️ Moved {len(balls):,} uninserted balls to {self.dead_letter}")
+        except OSError as e:
+            print(f"⚠️ Dropped {len(balls):,} uninserted balls, could not write {self.dead_letter}: {e}")
+
+    def finish_match(self, match_id):
+        """Flush, then fold a completed match into the summary tables
+
+        If the flush fails, the match is still folded in with the balls already
+        inserted; the rest are added to the rollups when a later flush succeeds.
+        """
+        self.stats.finish_match(match_id)
+        if self.engine is None or match_id is None:
+            return
+        from summary_maintenance import refresh_summaries
+
+        if not self.try_flush() and any(ball.get('match_id') == match_id for ball in self._pending):
+            self._finished_unflushed.add(match_id)
+        with self.engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {LIVE_MATCHES_TABLE} WHERE "match_id" = :match_id'),
+                         {'match_id': match_id})
+        refresh_summaries(self.engine, match_ids=[match_id])
+        print(f"✅ Match {match_id} finished and added to summary tables")
+
+    def handle(self, line: str):
+        try:
+            ball = json.loads(line)
+        except ValueError:
+            print(f"Skipping malformed feed line: {line[:80]!r}")
+            return
+        if ball.get('event') == 'match_end':
+            self.finish_match(ball.get('match_id', self.current_match))
+            if ball.get('match_id', self.current_match) == self.current_match:
+                self.current_match = None
+            return
+
+        match_id = ball.get('match_id')
+        if match_id != self.current_match:
+            if self.current_match is not None:
+                self.finish_match(self.current_match)
+            self.current_match = match_id
+            if self.engine is not None:
+                self._mark_live(match_id)
+        self.stats.add_ball(ball)
+        self._pending.append(ball)
+
+    def run(self):
+        """Process the feed forever"""
+        print(f"📡 Reading live feed from {self.source}")
+        for line in feed_lines(self.source, from_start=self.from_start):
+            if line and line.strip():
+                try:
+                    self.handle(line)
+                except Exception as e:
+                    print(f"Error handling live feed line: {e}")
+            if (len(self._pending) >= self.batch_size
+                    or (self._pending and time.monotonic() - self._last_flush >= self.flush_seconds)):
+                self.try_flush()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name='live-ingest', daemon=True)
+        thread.start()
+        return thread
+
+
+def start_live_ingest(chatbot, source: str = None):
+    """Attach live stats from LIVE_FEED to a chatbot; inserts only with LIVE_FEED_INSERT=true"""
+    source = source or os.getenv('LIVE_FEED')
+    if not source:
+        return None
+    insert = os.getenv('LIVE_FEED_INSERT', 'false').lower() in ('1', 'true', 'yes', 'on')
+    ingest = LiveIngest(source, engine=chatbot.engine if insert else None)
+    chatbot.live_stats = ingest.stats
+    ingest.start()
+    return ingest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream live ball-by-ball JSON into ipl_balls")
+    parser.add_argument('source', help='feed file to tail, or tcp://host:port')
+    parser.add_argument('--from-start', action='store_true', help='read an existing feed file from the beginning')
+    parser.add_argument('--no-insert', action='store_true', help='only print live stats, do not write to the database')
+    args = parser.parse_args()
+
+    engine = None
+    if not args.no_insert:
+        from db import get_engine
+        load_dotenv()
+        engine = get_engine(os.getenv('DATABASE_URL'))
+    ingest = LiveIngest(args.source, engine=engine, from_start=args.from_start)
+    try:
+        ingest.run()
+    except KeyboardInterrupt:
+        if not ingest.try_flush():
+            ingest._dead_letter(ingest._pending)
+        print(f"Stopped after inserting {ingest.inserted:,} balls")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+"""Bulk-load ball-by-ball CSV or Parquet files into ipl_balls with COPY.
+
+Each file is streamed to Postgres with COPY FROM STDIN (CSV as-is, Parquet one
+record batch at a time), and several files - typically one per season - are
+loaded in parallel worker processes. For large loads the secondary indexes on
+ipl_balls are dropped first and rebuilt afterwards, which is much faster than
+maintaining them row by row. Under the star schema each file is copied into a
+staging table and moved into ipl_balls_fact with one INSERT ... SELECT that
+joins the dimension tables, instead of the view's per-row insert trigger. When the table does not exist yet it is created
+from the first file's header, with column types inferred from a sample.
+
+    python load_data.py data/ipl_2008.csv data/ipl_2009.csv ...
+    python load_data.py data/ --replace --workers 4      # reload every season
+    python load_data.py new_matches.csv --upsert         # add or replace matches in one transaction
+"""
+import argparse
+import glob
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from db import get_engine
+from derived_columns import ensure_derived_columns
+from migrate_partitions import ensure_year_partitions, insertable_columns, is_partitioned
+from schema_snapshot import apply_metadata_delta, refresh_metadata
+from star_schema import fact_table, insert_from_staging, is_star_schema
+
+TABLE = 'ipl_balls'
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', str(min(4, os.cpu_count() or 1))))
+LOAD_COPY_BUFFER = int(os.getenv('LOAD_COPY_BUFFER', str(1 << 20)))
+LOAD_PARQUET_BATCH_ROWS = int(os.getenv('LOAD_PARQUET_BATCH_ROWS', '100000'))
+TYPE_SAMPLE_ROWS = 20000
+STAGING_TABLE = 'ipl_balls_staging'
+
+PG_TYPES = {'i': 'BIGINT', 'u': 'BIGINT', 'f': 'DOUBLE PRECISION', 'b': 'BOOLEAN', 'M': 'TIMESTAMP'}
+
+
+def find_input_files(paths) -> list:
+    """Expand directories and globs into a sorted list of .csv/.parquet files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for extension in ('csv', 'parquet'):
+                files += glob.glob(os.path.join(path, f'*.{extension}'))
+        else:
+            files += glob.glob(path) or [path]
+    return sorted(set(files))
+
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith('.parquet')
+
+
+def sample_frame(path: str) -> pd.DataFrame:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        batch = next(pq.ParquetFile(path).iter_batches(batch_size=TYPE_SAMPLE_ROWS))
+        return batch.to_pandas()
+    return pd.read_csv(path, nrows=TYPE_SAMPLE_ROWS)
+
+
+def create_table_sql(frame: pd.DataFrame) -> str:
+    """CREATE TABLE for ipl_balls using the file's own column names"""
+    columns = [f'"{name}" {PG_TYPES.get(dtype.kind, "TEXT")}' for name, dtype in frame.dtypes.items()]
+    return f"CREATE TABLE IF NOT EXISTS {TABLE} (\n    " + ",\n    ".join(columns) + "\n)"
+
+
+def file_columns(path: str) -> list:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def file_years(path: str) -> set:
+    """Distinct "year" values in a file, to create season partitions before loading it"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        years = pq.read_table(path, columns=['year']).column('year').to_pylist()
+    else:
+        years = pd.read_csv(path, usecols=['year'])['year'].dropna().tolist()
+    return {int(year) for year in years if year is not None}
+
+
+def copy_sql(columns, header: bool, table: str = TABLE) -> str:
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    return f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER {'true' if header else 'false'})"
+
+
+def _copy_parquet(cursor, path: str, table: str = TABLE) -> int:
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(path)
+    sql = copy_sql(parquet.schema_arrow.names, header=False, table=table)
+    rows = 0
+    for batch in parquet.iter_batches(batch_size=LOAD_PARQUET_BATCH_ROWS):
+        buffer = io.StringIO()
+        # Object ints keep nullable integer columns from being written as 1.0
+        batch.to_pandas(integer_object_nulls=True).to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer, size=LOAD_COPY_BUFFER)
+        rows += batch.num_rows
+    return rows
+
+
+def copy_file(cursor, path: str, table: str = TABLE) -> int:
+    """COPY one file into a table through a DB-API cursor; returns the row count"""
+    if _is_parquet(path):
+        return _copy_parquet(cursor, path, table)
+    with open(path, newline='') as f:
+        cursor.copy_expert(copy_sql(file_columns(path), header=True, table=table), f, size=LOAD_COPY_BUFFER)
+    return cursor.rowcount
+
+
+def insert_staged(conn) -> int:
+    """Move STAGING_TABLE rows into ipl_balls: set-based under the star schema, a plain INSERT otherwise"""
+    if is_star_schema(conn):
+        return insert_from_staging(conn, STAGING_TABLE)
+    columns = insertable_columns(conn)
+    return conn.exec_driver_sql(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {STAGING_TABLE}").rowcount
+
+
+def load_file(database_url: str, path: str) -> dict:
+    """Load one file in its own transaction; runs inside a worker process"""
+    started = time.perf_counter()
+    with get_engine(database_url).begin() as conn:
+        # Bulk load durability: a crash loses only this uncommitted file
+        conn.exec_driver_sql("SET LOCAL synchronous_commit = off")
+        cursor = conn.connection.cursor()
+        if is_star_schema(conn):
+            # COPY into the ipl_balls view would run its insert trigger once per row
+            conn.exec_driver_sql(f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE {TABLE}) ON COMMIT DROP")
+            copy_file(cursor, path, STAGING_TABLE)
+            rows = insert_staged(conn)
+        else:
+            rows = copy_file(cursor, path)
+    elapsed = time.perf_counter() - started
+    return {'file': path, 'rows': rows, 'seconds': round(elapsed, 2),
+            'rows_per_second': round(rows / elapsed) if elapsed else None}
+
+
+def secondary_indexes(conn) -> list:
+    """(name, definition) of indexes on the balls table that do not back a constraint"""
+    return [tuple(row) for row in conn.execute(text("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.tablename = :table AND i.schemaname = current_schema()
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+    """), {'table': fact_table(conn)}).fetchall()]
+
+
+def load_files(database_url: str, files, replace: bool = False, workers: int = None,
+               rebuild_indexes: bool = None) -> dict:
+    """Load files into ipl_balls in parallel, then refresh metadata and summary tables"""
+    from bowling_types import ensure_bowling_types
+    from summary_maintenance import refresh_summaries
+
+    engine = get_engine(database_url)
+    workers = workers or LOAD_WORKERS
+    started = time.perf_counter()
+    # Dropping indexes pays off for reloads and multi-file loads, not for a single match file
+    if rebuild_indexes is None:
+        rebuild_indexes = replace or len(files) > 1
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(create_table_sql(sample_frame(files[0])))
+        if replace:
+            # Under the star schema ipl_balls is a view over the fact table
+            conn.execute(text(f"TRUNCATE {fact_table(conn)}"))
+        # Generated before the COPY so "phase" and "bowl_kind" are computed as rows arrive
+        ensure_derived_columns(conn)
+        ensure_bowling_types(conn)
+        if is_partitioned(conn):
+            ensure_year_partitions(conn, set().union(*(file_years(path) for path in files)))
+        indexes = secondary_indexes(conn) if rebuild_indexes else []
+        for name, _ in indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    if indexes:
+        print(f"Dropped {len(indexes)} index(es) for the load")
+
+    results = []
+    try:
+        # Spawned workers open their own connections instead of inheriting this pool's sockets
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(load_file, database_url, path) for path in files]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"✅ {result['file']}: {result['rows']:,} rows "
+                      f"({result['rows_per_second'] or 0:,} rows/s)")
+    finally:
+        # Restore the indexes even when a file fails, so queries are never left unindexed
+        if indexes:
+            index_started = time.perf_counter()
+            with engine.begin() as conn:
+                for _, definition in indexes:
+                    # Definitions may hold casts and LIKE patterns, so bypass bind parsing
+                    conn.exec_driver_sql(definition)
+            print(f"Rebuilt {len(indexes)} index(es) in {time.perf_counter() - index_started:.1f}s")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {fact_table(conn)}"))
+        refresh_metadata(conn)
+    summaries = refresh_summaries(engine, full=replace)
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(result['rows'] for result in results)
+    report = {
+        'files': len(results),
+        'rows': total_rows,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(total_rows / elapsed) if elapsed else None,
+        'summaries': summaries,
+    }
+    print(f"🏏 Loaded {total_rows:,} rows from {len(results)} file(s) in {elapsed:.1f}s "
+          f"({report['rows_per_second'] or 0:,} rows/s overall)")
+    return report
+
+
+def upsert_matches(database_url: str, files) -> dict:
+    """Insert or replace every match in the files, in a single transaction.
+
+    Rows are staged in a temporary table, so any number of matches (a whole
+    season's backlog) is handled with set-based statements. Existing rows for
+    the staged match_ids are subtracted from the rollups, deleted and replaced,
+    then the new rows are added back, so running the same files twice leaves
+    the data unchanged. Views are refreshed, the stored table stats adjusted
+    from the staged rows (no scan of ipl_balls) and the data version bumped
+    before commit; readers see either the old or the new matches, never a mix.
+    """
+    from bowling_types import ensure_bowling_types, sync_bowling_types
+    from summary_maintenance import MAINTENANCE_LOCK_SQL, apply_match_delta, ensure_ledger, rebuild_rollups
+    from summary_views import SUMMARY_VIEWS, ensure_summary_views, refresh_summary_views
+
+    engine = get_engine(database_url)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(create_table_sql(sample_frame(files[0])))
+        ensure_derived_columns(conn)
+        ensure_bowling_types(conn)
+    created = ensure_summary_views(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text(MAINTENANCE_LOCK_SQL))
+        rebuild = ensure_ledger(conn) or any(view.kind == 'table' and view.name in created for view in SUMMARY_VIEWS)
+
+        conn.exec_driver_sql(f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE {TABLE}) ON COMMIT DROP")
+        cursor = conn.connection.cursor()
+        staged = sum(copy_file(cursor, path, STAGING_TABLE) for path in files)
+        match_ids = [row[0] for row in conn.execute(text(
+            f'SELECT DISTINCT "match_id" FROM {STAGING_TABLE}'
+        )).fetchall()]
+        ensure_year_partitions(conn, [row[0] for row in conn.execute(text(
+            f'SELECT DISTINCT "year" FROM {STAGING_TABLE}'
+        )).fetchall()])
+
+        if not rebuild:
+            apply_match_delta(conn, match_ids, -1)
+        deleted, replaced_matches = conn.execute(text(f"""
+            WITH deleted AS (
+                DELETE FROM {fact_table(conn)} WHERE "match_id" = ANY(:match_ids) RETURNING "match_id"
+            )
+            SELECT COUNT(*), COUNT(DISTINCT "match_id") FROM deleted
+        """), {'match_ids': match_ids}).fetchone()
+        insert_staged(conn)
+        if rebuild:
+            rebuild_rollups(conn)
+        else:
+            apply_match_delta(conn, match_ids, 1)
+        sync_bowling_types(conn, match_ids)
+
+        refresh_summary_views(conn)
+        apply_metadata_delta(conn, STAGING_TABLE, staged - deleted, len(match_ids) - replaced_matches)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        'matches': len(match_ids),
+        'rows': staged,
+        'replaced_rows': deleted,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(staged / elapsed) if elapsed else None,
+    }
+    print(f"🏏 Upserted {len(match_ids)} match(es), {staged:,} rows ({deleted:,} replaced) in {elapsed:.2f}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load IPL ball-by-ball files into Postgres")
+    parser.add_argument('paths', nargs='+', help='CSV/Parquet files, globs or directories (e.g. one file per season)')
+    parser.add_argument('--replace', action='store_true', help='truncate ipl_balls before loading')
+    parser.add_argument('--upsert', action='store_true',
+                        help='insert or replace the matches in the files, in one transaction')
+    parser.add_argument('--workers', type=int, help=f'parallel loader processes (default {LOAD_WORKERS})')
+    parser.add_argument('--keep-indexes', action='store_true', help='do not drop and rebuild indexes around the load')
+    args = parser.parse_args()
+
+    load_dotenv()
+    files = find_input_files(args.paths)
+    if not files:
+        raise SystemExit("No input files found")
+    if args.upsert:
+        upsert_matches(os.getenv('DATABASE_URL'), files)
+        return
+    load_files(os.getenv('DATABASE_URL'), files, replace=args.replace, workers=args.workers,
+               rebuild_indexes=False if args.keep_indexes else None)
+
+
+if __name__ == '__main__':
+    main()
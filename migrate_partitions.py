@@ -0,0 +1,209 @@
+"""Convert ipl_balls into a table partitioned by season ("year").
+
+Each season becomes its own LIST partition (ipl_balls_y2008, ...) plus a
+default partition for rows without a known year, so a "year" = 2024 filter
+only reads one season. Indexes are recreated on the partitioned parent, which
+creates a matching index on every partition. The migration runs in one
+transaction: the old table is kept as ipl_balls_unpartitioned with --keep-old
+(useful for benchmarks/partition_pruning_bench.py) and dropped otherwise.
+
+    python migrate_partitions.py --keep-old
+    python migrate_partitions.py --archive-before 2015 --archive-tablespace cold_storage
+
+Loaders and live ingest call ensure_year_partitions so a new season gets its
+own partition before its rows arrive. Rows that already landed in the default
+partition are moved into the new season's partition when it is created.
+"""
+import argparse
+import os
+import re
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from star_schema import FACT_TABLE, is_star_schema
+
+TABLE = 'ipl_balls'
+OLD_TABLE = 'ipl_balls_unpartitioned'
+DEFAULT_PARTITION = 'ipl_balls_default'
+PARTITION_PATTERN = re.compile(r'^ipl_balls_(y\d{4}|default)$')
+
+
+def partition_name(year: int) -> str:
+    return f"{TABLE}_y{int(year)}"
+
+
+def is_fact_relation(name: str) -> bool:
+    """True for ipl_balls itself, one of its season partitions or the star-schema fact table"""
+    return name in (TABLE, FACT_TABLE) or bool(PARTITION_PATTERN.match(name or ''))
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p
+                       JOIN pg_class c ON c.oid = p.partrelid
+                       WHERE c.relname = :table AND pg_table_is_visible(c.oid))
+    """), {'table': TABLE}).scalar()
+
+
+def insertable_columns(conn, table: str = TABLE) -> str:
+    """Quoted column list of a table without its generated columns, for INSERT ... SELECT"""
+    columns = [row[0] for row in conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = :table AND table_schema = current_schema() AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """), {'table': table}).fetchall()]
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def _tablespace_clause(year: int, archive_before: int = None, archive_tablespace: str = None) -> str:
+    if archive_tablespace and archive_before and int(year) < archive_before:
+        return f" TABLESPACE {archive_tablespace}"
+    return ""
+
+
+def ensure_year_partitions(conn, years, archive_before: int = None, archive_tablespace: str = None) -> list:
+    """Create missing season partitions of a partitioned ipl_balls; returns the names created"""
+    if not is_partitioned(conn):
+        return []
+    existing = {row[0] for row in conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+    """), {'table': TABLE}).fetchall()}
+    created = []
+    for year in sorted({int(year) for year in years if year is not None}):
+        name = partition_name(year)
+        if name in existing:
+            continue
+        create = (f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES IN ({int(year)})"
+                  + _tablespace_clause(year, archive_before, archive_tablespace))
+        if DEFAULT_PARTITION in existing and conn.execute(text(
+            f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE "year" = :year)'
+        ), {'year': int(year)}).scalar():
+            # The default partition may not hold rows of a new partition, so move them across while it is detached
+            columns = insertable_columns(conn)
+            conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+            conn.execute(text(create))
+            moved = conn.execute(text(
+                f'INSERT INTO {name} ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} WHERE "year" = :year'
+            ), {'year': int(year)}).rowcount
+            conn.execute(text(f'DELETE FROM {DEFAULT_PARTITION} WHERE "year" = :year'), {'year': int(year)})
+            conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+            print(f"Moved {moved:,} {year} row(s) out of {DEFAULT_PARTITION}")
+        else:
+            conn.execute(text(create))
+        created.append(name)
+    if created:
+        print(f"✅ Added season partition(s): {', '.join(created)}")
+    return created
+
+
+def _index_definitions(conn) -> list:
+    """(name, definition, portable) of the indexes on ipl_balls.
+
+    A unique index can only be recreated on the partitioned table when it
+    includes the partition key.
+    """
+    return [tuple(row) for row in conn.execute(text("""
+        SELECT i.relname, pg_get_indexdef(i.oid),
+               NOT x.indisunique OR EXISTS (
+                   SELECT 1 FROM pg_attribute a
+                   WHERE a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey) AND a.attname = 'year'
+               )
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = CAST(:table AS regclass)
+    """), {'table': TABLE}).fetchall()]
+
+
+def migrate(engine, keep_old: bool = False, archive_before: int = None, archive_tablespace: str = None) -> dict:
+    """Rebuild ipl_balls as a year-partitioned table with the same columns, rows and indexes"""
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print("ipl_balls is already partitioned")
+            return {'migrated': False}
+        if is_star_schema(conn):
+            print("⚠️ ipl_balls uses the star schema; partitioning is an alternative to it")
+            return {'migrated': False}
+
+        indexes = _index_definitions(conn)
+        years = [row[0] for row in conn.execute(text(
+            f'SELECT DISTINCT "year" FROM {TABLE} WHERE "year" IS NOT NULL ORDER BY 1'
+        )).fetchall()]
+
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}"))
+        for name, _, _ in indexes:
+            conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_unpartitioned"'))
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)
+            PARTITION BY LIST ("year")
+        """))
+        for year in years:
+            conn.execute(text(
+                f"CREATE TABLE {partition_name(year)} PARTITION OF {TABLE} FOR VALUES IN ({int(year)})"
+                + _tablespace_clause(year, archive_before, archive_tablespace)
+            ))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+        columns = insertable_columns(conn, OLD_TABLE)
+        rows = conn.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {OLD_TABLE}")).rowcount
+
+        skipped = []
+        for name, definition, portable in indexes:
+            if not portable:
+                skipped.append(name)
+                continue
+            # Captured before the rename, so the definition already targets the new parent;
+            # creating it there adds a matching index to every partition
+            conn.exec_driver_sql(definition)
+        if skipped:
+            print(f"⚠️ Not recreated (unique without \"year\"): {', '.join(skipped)}")
+
+        if not keep_old:
+            conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+    print(f"✅ Partitioned {rows:,} rows into {len(years)} season partition(s)")
+    return {'migrated': True, 'rows': rows, 'partitions': len(years), 'indexes': len(indexes) - len(skipped)}
+
+
+def archive_partitions(engine, before_year: int, tablespace: str) -> list:
+    """Move season partitions older than before_year to a cheaper tablespace"""
+    moved = []
+    with engine.connect() as conn:
+        names = [row[0] for row in conn.execute(text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+        """), {'table': TABLE}).fetchall()]
+    for name in sorted(names):
+        match = re.match(r'^ipl_balls_y(\d{4})$', name)
+        if match and int(match.group(1)) < before_year:
+            # One transaction per partition: SET TABLESPACE locks and rewrites only that season
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {name} SET TABLESPACE {tablespace}"))
+            moved.append(name)
+    if moved:
+        print(f"✅ Moved {len(moved)} partition(s) to tablespace {tablespace}")
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition ipl_balls by season")
+    parser.add_argument('--keep-old', action='store_true', help=f'keep the original table as {OLD_TABLE}')
+    parser.add_argument('--archive-before', type=int, help='seasons before this year go to --archive-tablespace')
+    parser.add_argument('--archive-tablespace', help='tablespace for old seasons (must already exist)')
+    args = parser.parse_args()
+
+    from db import get_engine
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    migrate(engine, keep_old=args.keep_old, archive_before=args.archive_before,
+            archive_tablespace=args.archive_tablespace)
+    if args.archive_before and args.archive_tablespace:
+        archive_partitions(engine, args.archive_before, args.archive_tablespace)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Assemble compact text-to-SQL prompts for the enhanced chatbot.
+
+The prompt is split in two messages:
+
+- a system message with the data summary and the query rules; it only changes
+  with the data version, so it is rendered once and sent byte-for-byte
+  identical on every call, which lets the provider's prompt caching apply
+- a user message with only the schema sections relevant to the question's
+  topics (batting, bowling, phase, pace/spin, ...), the most similar verified
+  examples (example_store.py), the stored spelling of the names it mentions,
+  and the question itself
+
+Prompt and completion tokens are recorded per request from the response's
+usage, or estimated at four characters per token when usage is missing.
+"""
+import re
+import threading
+
+from intent_engine import BAT_HANDS, BOWL_KINDS, PHASES
+
+CHARS_PER_TOKEN = 4
+
+QUERY_RULES = """You are an expert PostgreSQL analyst specializing in cricket statistics. Convert the user's question to one precise SQL query.
+
+RULES:
+1. Table: ipl_balls, or a pre-aggregated cube when one covers the question
+2. Quote ALL column names: "batter", "over", "runs_batter"
+3. Filter out empty names: "batter" != '' AND "batter" IS NOT NULL
+4. Batting average divides by dismissals; bowling stats count wickets and balls bowled
+5. Use minimum thresholds (100+ balls batting, 50+ balls bowling) for rate stats
+6. Rank by the main metric DESC with LIMIT 10-15
+7. Cast explicitly: ::numeric, ::int; "year" is an integer (e.g. "year" = 2024)
+8. Boolean columns: "isFour", "isSix", "isWicket" (a dismissal is "isWicket" = TRUE)
+
+Return ONLY the SQL query."""
+
+# Column groups of ipl_balls; the first two are always sent
+COLUMN_GROUPS = [
+    (None, '- Match: "season", "year", "date", "venue", "match_id", "innings", "batting_team", "bowling_team"'),
+    (None, '- Ball: "over", "ball", "phase", "batter", "bowler", "runs_batter", "runs_total", '
+           '"isFour", "isSix", "isWicket"'),
+    ('style', '- Bowling: "bowling_style", "bowl_kind" (\'pace\', \'spin\' or \'unknown\')'),
+    ('hand', '- Batting hand: "bat_hand" (\'LHB\' or \'RHB\')'),
+    ('live', '- Running totals: "curr_batter_runs", "curr_batter_balls", "curr_batter_fours", "curr_batter_sixes"'),
+    ('results', '- Results: "playerofmatch", "winner"'),
+]
+
+SECTIONS = {
+    'style': """BOWLING TYPES (indexed; never pattern-match "bowling_style"):
+- Pace: "bowl_kind" = 'pace'; spin: "bowl_kind" = 'spin'
+- Arm and variation: JOIN bowling_types t ON t."bowling_style" = ipl_balls."bowling_style" ("arm": 'right'/'left', "variation": e.g. 'fast', 'off-break')""",
+    'phase': """PHASES ("phase" SMALLINT, indexed with "batter" and "bowler"; use it instead of "over" ranges):
+- Powerplay "phase" = 1 (overs 1-6), middle "phase" = 2 (7-15), death "phase" = 3 (16-20)""",
+    'batting': """BATTING:
+- Strike rate = runs / balls * 100; average = runs / COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END)""",
+    'bowling': """BOWLING:
+- Economy = runs conceded ("runs_total") / balls * 6; average = runs conceded / wickets; strike rate = balls / wickets""",
+}
+
+TOPIC_PATTERNS = {
+    'batting': re.compile(r"\b(runs?|scor\w*|bat\w*|strike.?rate|sr|average|sixes|fours|boundar\w*|hitters?|fifty|fifties|centur\w*)\b"),
+    'bowling': re.compile(r"\b(bowl\w*|wickets?|economy|economical|dots?|maidens?|spells?|figures)\b"),
+    'phase': re.compile("|".join(pattern.pattern for pattern, _ in PHASES) + r"|\bovers?\b"),
+    'style': re.compile("|".join(pattern.pattern for pattern, _ in BOWL_KINDS) + r"|\b(style|arm|googly|off.?break|leg.?break)\b"),
+    'hand': re.compile("|".join(pattern.pattern for pattern, _ in BAT_HANDS)),
+    'live': re.compile(r"\b(current\w*|crease|running)\b"),
+    'results': re.compile(r"\b(won|wins?|winners?|result|player of the match|potm|mom)\b"),
+}
+
+
+def detect_topics(question: str) -> set:
+    """Topics a question touches, used to choose schema sections"""
+    question = question.lower()
+    return {topic for topic, pattern in TOPIC_PATTERNS.items() if pattern.search(question)}
+
+
+def estimate_tokens(value: str) -> int:
+    return max(1, len(value) // CHARS_PER_TOKEN)
+
+
+class PromptBuilder:
+    """Builds [system, user] messages; the system message is cached until the data summary changes"""
+
+    def __init__(self):
+        self._prefix_key = None
+        self._prefix = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.estimated_requests = 0
+
+    def system_prompt(self, data_summary: str) -> str:
+        with self._lock:
+            if self._prefix_key != data_summary:
+                self._prefix = f"{QUERY_RULES}\n\nDATABASE:\n{data_summary.strip()}"
+                self._prefix_key = data_summary
+            return self._prefix
+
+    def user_prompt(self, question: str, topics: set, cubes: str = "", entity_hint: str = "",
+                    examples=None) -> str:
+        columns = [text for topic, text in COLUMN_GROUPS if topic is None or topic in topics]
+        parts = ["COLUMNS of ipl_balls:\n" + "\n".join(columns)]
+        parts += [SECTIONS[topic] for topic in SECTIONS if topic in topics]
+        # Aggregates by player, phase, pace/spin or hand can come from the cubes
+        if cubes and topics & {'batting', 'bowling'} and not topics & {'live', 'results'}:
+            parts.append(cubes.strip())
+        if examples:
+            parts.append("EXAMPLES:\n" + "\n\n".join(f"-- {title}\n{sql};" for title, sql in examples))
+        if entity_hint:
+            parts.append(entity_hint.strip())
+        parts.append(f"Question: {question}")
+        return "\n\n".join(parts)
+
+    def messages(self, question: str, data_summary: str, cubes: str = "", entity_hint: str = "",
+                 examples=None) -> list:
+        topics = detect_topics(question)
+        return [
+            {"role": "system", "content": self.system_prompt(data_summary)},
+            {"role": "user", "content": self.user_prompt(question, topics, cubes, entity_hint, examples)},
+        ]
+
+    def record_usage(self, messages: list, response=None, completion: str = "") -> dict:
+        """Count this request's tokens from the response usage, estimating when it is missing"""
+        usage = getattr(response, 'usage', None)
+        if usage is not None and getattr(usage, 'prompt_tokens', None) is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens or 0
+            details = getattr(usage, 'prompt_tokens_details', None)
+            cached = getattr(details, 'cached_tokens', 0) or 0
+            estimated = False
+        else:
+            prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+            completion_tokens = estimate_tokens(completion) if completion else 0
+            cached, estimated = 0, True
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_tokens += cached
+            self.estimated_requests += estimated
+        print(f"LLM prompt: {prompt_tokens} tokens{' (estimated)' if estimated else ''}"
+              f"{f', {cached} cached' if cached else ''}, completion: {completion_tokens} tokens")
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'cached_tokens': cached, 'estimated': estimated}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'cached_prompt_tokens': self.cached_tokens,
+                'estimated_requests': self.estimated_requests,
+                'avg_prompt_tokens': round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+            }
@@ -0,0 +1,285 @@
+import json
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from migrate_partitions import is_fact_relation
+from star_schema import FACT_TABLE
+
+QUERY_TIMEOUT_MS = int(os.getenv('QUERY_TIMEOUT_MS', '10000'))
+QUERY_MAX_ROWS = int(os.getenv('QUERY_MAX_ROWS', '1000'))
+QUERY_MAX_COST = float(os.getenv('QUERY_MAX_COST', '1000000'))
+QUERY_MAX_PLAN_ROWS = float(os.getenv('QUERY_MAX_PLAN_ROWS', '100000'))
+QUERY_PLAN_LOG = os.getenv('QUERY_PLAN_LOG', 'query_plans.jsonl')
+# The log is rotated to QUERY_PLAN_LOG.1 at this size; 0 disables rotation
+QUERY_PLAN_LOG_MAX_BYTES = int(os.getenv('QUERY_PLAN_LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+# Fraction of executed statements logged; rejected plans are always logged
+QUERY_PLAN_LOG_SAMPLE = float(os.getenv('QUERY_PLAN_LOG_SAMPLE', '1.0'))
+# Fraction of cost-checked queries re-run with EXPLAIN ANALYZE after answering, to log actual vs estimated rows
+QUERY_PLAN_ANALYZE_SAMPLE = float(os.getenv('QUERY_PLAN_ANALYZE_SAMPLE', '0.1'))
+
+# SQLSTATE raised by Postgres when statement_timeout or a cancel request fires
+QUERY_CANCELED = '57014'
+
+
+class QueryLimitError(Exception):
+    """Raised when a query runs past the statement timeout, returns too many rows or is cancelled"""
+
+
+class QueryCostError(QueryLimitError):
+    """Raised when EXPLAIN estimates a query to be too expensive to run"""
+
+
+def walk_plan(node):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk_plan(child)
+
+
+def plan_violations(plan: dict, max_cost: float, max_rows: float, row_cap: int = None) -> list:
+    """Reasons a plan should not be executed; empty when it is acceptable
+
+    A plan's output is bounded when it ends in a LIMIT or an aggregate, or is
+    estimated to return no more than `row_cap` rows (QUERY_MAX_ROWS by default),
+    so COUNT(DISTINCT ...) or a per-season GROUP BY over the whole table is fine.
+    """
+    reasons = []
+    if plan.get('Total Cost', 0) > max_cost:
+        reasons.append(f"estimated cost {plan['Total Cost']:,.0f} exceeds {max_cost:,.0f}")
+    if plan.get('Plan Rows', 0) > max_rows:
+        reasons.append(f"estimated {plan['Plan Rows']:,.0f} output rows exceeds {max_rows:,.0f}")
+
+    row_cap = QUERY_MAX_ROWS if row_cap is None else row_cap
+    bounded = plan.get('Node Type') in ('Limit', 'Aggregate') or plan.get('Plan Rows', 0) <= row_cap
+    unfiltered_scans = {
+        node['Relation Name'] for node in walk_plan(plan)
+        if node.get('Node Type') == 'Seq Scan'
+        and is_fact_relation(node.get('Relation Name'))
+        and 'Filter' not in node
+    }
+    # A pruned season query scans one partition without a Filter; that is already bounded
+    if (len(unfiltered_scans) > 1 or unfiltered_scans & {'ipl_balls', FACT_TABLE}) and not bounded:
+        reasons.append("unfiltered sequential scan of ipl_balls with unbounded output")
+    return reasons
+
+
+class QueryGuard:
+    """Runs SQL with a server-side statement timeout and a hard row cap.
+
+    The timeout is set with SET LOCAL semantics so it only applies to this
+    transaction (safe behind PgBouncer in transaction mode). Rows are read
+    through a server-side cursor and at most `max_rows + 1` are fetched, so an
+    accidental cross join never materialises in pandas. In-flight queries can be
+    cancelled from another thread with `cancel_all`.
+
+    With `check_cost=True` the query is first planned with EXPLAIN (FORMAT JSON)
+    and rejected with QueryCostError when the estimate is over the configured
+    limits. Every executed statement, with its plan when one was checked, is
+    appended to QUERY_PLAN_LOG together with the rows fetched and run time,
+    to spot prompts that produce expensive SQL and to drive index_advisor.py.
+    A QUERY_PLAN_ANALYZE_SAMPLE share of the cost-checked queries is also run
+    with EXPLAIN ANALYZE after the rows are fetched, so the log holds the
+    actual rows and time next to the planner's estimate.
+    """
+
+    def __init__(self, engine, timeout_ms: int = None, max_rows: int = None,
+                 max_cost: float = None, max_plan_rows: float = None, plan_log: str = None):
+        self.engine = engine
+        self.timeout_ms = timeout_ms or QUERY_TIMEOUT_MS
+        self.max_rows = max_rows or QUERY_MAX_ROWS
+        self.max_cost = max_cost or QUERY_MAX_COST
+        self.max_plan_rows = max_plan_rows or QUERY_MAX_PLAN_ROWS
+        self.plan_log = QUERY_PLAN_LOG if plan_log is None else plan_log
+        self._active = {}
+        self._active_lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    def _explain(self, conn, sql: str, params: dict = None, analyze: bool = False) -> dict:
+        """The plan, or with analyze=True the whole EXPLAIN ANALYZE output (plan plus execution time)"""
+        explain_sql = f"EXPLAIN ({'ANALYZE, ' if analyze else ''}FORMAT JSON) {sql}"
+        if params is None:
+            output = conn.exec_driver_sql(explain_sql).scalar()
+        else:
+            output = conn.execute(text(explain_sql), params).scalar()
+        if isinstance(output, str):
+            output = json.loads(output)
+        return output[0] if analyze else output[0]['Plan']
+
+    @staticmethod
+    def _sample_analyze(plan: dict) -> bool:
+        return plan is not None and random.random() < QUERY_PLAN_ANALYZE_SAMPLE
+
+    @staticmethod
+    def _analyzed(output: dict) -> dict:
+        """Log fields from EXPLAIN ANALYZE output, comparable with estimated_rows"""
+        plan = output['Plan']
+        return {'analyzed_rows': plan.get('Actual Rows', 0) * plan.get('Actual Loops', 1),
+                'analyzed_ms': output.get('Execution Time'), 'analyzed_plan': plan}
+
+    def _log_plan(self, entry: dict):
+        if not self.plan_log:
+            return
+        if entry['verdict'] == 'executed' and QUERY_PLAN_LOG_SAMPLE < 1:
+            if random.random() >= QUERY_PLAN_LOG_SAMPLE:
+                return
+            entry['sample_rate'] = QUERY_PLAN_LOG_SAMPLE
+        try:
+            with self._log_lock:
+                # Keep one rotated file, which index_advisor.py also reads
+                if (QUERY_PLAN_LOG_MAX_BYTES and os.path.exists(self.plan_log)
+                        and os.path.getsize(self.plan_log) >= QUERY_PLAN_LOG_MAX_BYTES):
+                    os.replace(self.plan_log, f"{self.plan_log}.1")
+                with open(self.plan_log, 'a') as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write query plan log: {e}")
+
+    def run(self, sql: str, params: dict = None, check_cost: bool = False) -> pd.DataFrame:
+        """Execute a SELECT and return its rows, raising QueryLimitError when a limit trips"""
+        token = object()
+        plan = None
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as conn:
+                with self._active_lock:
+                    self._active[token] = conn.connection.dbapi_connection
+                with conn.begin():
+                    conn.execute(
+                        text("SELECT set_config('statement_timeout', :timeout, true)"),
+                        {'timeout': str(self.timeout_ms)}
+                    )
+                    if check_cost:
+                        plan = self._explain(conn, sql, params)
+                        self._check_plan(sql, plan)
+                    streaming = conn.execution_options(stream_results=True, max_row_buffer=self.max_rows + 1)
+                    if params is None:
+                        # Driver-level execution keeps LIKE '%rm%' and "::numeric" in LLM SQL intact
+                        result = streaming.exec_driver_sql(sql)
+                    else:
+                        result = streaming.execute(text(sql), params)
+                    columns = list(result.keys())
+                    rows = result.fetchmany(self.max_rows + 1)
+                    result.close()
+                    elapsed_ms = round(1000 * (time.perf_counter() - started), 2)
+                    analyzed = None
+                    if self._sample_analyze(plan):
+                        try:
+                            # A savepoint, so a failed ANALYZE never costs the answer already fetched
+                            with conn.begin_nested():
+                                analyzed = self._analyzed(self._explain(conn, sql, params, analyze=True))
+                        except Exception as e:
+                            print(f"EXPLAIN ANALYZE failed: {e}")
+        except DBAPIError as e:
+            self._raise_if_canceled(e)
+            raise
+        finally:
+            with self._active_lock:
+                self._active.pop(token, None)
+        return self._finish(sql, params, plan, elapsed_ms, columns, rows, analyzed)
+
+    def _check_plan(self, sql: str, plan: dict):
+        reasons = plan_violations(plan, self.max_cost, self.max_plan_rows, self.max_rows)
+        if reasons:
+            self._log_plan({
+                'logged_at': time.time(), 'sql': sql, 'verdict': 'rejected',
+                'reasons': reasons, 'estimated_cost': plan.get('Total Cost'),
+                'estimated_rows': plan.get('Plan Rows'), 'plan': plan,
+            })
+            raise QueryCostError("The query was estimated to be too expensive: " + "; ".join(reasons) + ".")
+
+    def _raise_if_canceled(self, e: DBAPIError):
+        if getattr(e.orig, 'pgcode', None) == QUERY_CANCELED:
+            raise QueryLimitError(
+                f"The query was stopped after {self.timeout_ms / 1000:.0f}s (statement timeout or cancellation)."
+            ) from e
+
+    def _finish(self, sql: str, params: dict, plan: dict, elapsed_ms: float, columns, rows,
+                analyzed: dict = None) -> pd.DataFrame:
+        # Every executed statement is logged (with its plan when one was checked) for index_advisor.py;
+        # fetched_rows stops at max_rows + 1, analyzed_rows is the true output of the plan
+        entry = {
+            'logged_at': time.time(), 'sql': sql, 'params': params, 'verdict': 'executed',
+            'fetched_rows': len(rows), 'elapsed_ms': elapsed_ms,
+        }
+        if plan is not None:
+            entry.update({'estimated_cost': plan.get('Total Cost'), 'estimated_rows': plan.get('Plan Rows'),
+                          'plan': plan})
+        if analyzed is not None:
+            entry.update(analyzed)
+        self._log_plan(entry)
+
+        if len(rows) > self.max_rows:
+            raise QueryLimitError(f"The query returned more than {self.max_rows:,} rows.")
+        return pd.DataFrame(rows, columns=columns)
+
+    def cancel_all(self) -> int:
+        """Ask the server to cancel every query currently running through this guard"""
+        with self._active_lock:
+            connections = list(self._active.values())
+        for dbapi_connection in connections:
+            try:
+                dbapi_connection.cancel()
+            except Exception as e:
+                print(f"Error cancelling query: {e}")
+        return len(connections)
+
+
+class AsyncQueryGuard(QueryGuard):
+    """QueryGuard for a SQLAlchemy AsyncEngine (asyncpg), awaited on the event loop.
+
+    Same statement timeout, cost gate, row cap and plan log as QueryGuard; only
+    `run` is a coroutine. A query is cancelled by cancelling the task awaiting it.
+    """
+
+    @staticmethod
+    def _statement(sql: str, params: dict = None):
+        if params is None:
+            # Escape colons so "::numeric" and time literals in LLM SQL are not read as bind parameters
+            return text(sql.replace(':', '\\:'))
+        return text(sql)
+
+    async def _explain(self, conn, sql: str, params: dict = None, analyze: bool = False) -> dict:
+        explain_sql = f"EXPLAIN ({'ANALYZE, ' if analyze else ''}FORMAT JSON) {sql}"
+        result = await conn.execute(self._statement(explain_sql, params), params)
+        output = result.scalar()
+        if isinstance(output, str):
+            output = json.loads(output)
+        return output[0] if analyze else output[0]['Plan']
+
+    async def run(self, sql: str, params: dict = None, check_cost: bool = False) -> pd.DataFrame:
+        """Execute a SELECT and return its rows, raising QueryLimitError when a limit trips"""
+        plan = None
+        started = time.perf_counter()
+        try:
+            async with self.engine.connect() as conn:
+                async with conn.begin():
+                    await conn.execute(
+                        text("SELECT set_config('statement_timeout', :timeout, true)"),
+                        {'timeout': str(self.timeout_ms)}
+                    )
+                    if check_cost:
+                        plan = await self._explain(conn, sql, params)
+                        self._check_plan(sql, plan)
+                    result = await conn.stream(self._statement(sql, params), params,
+                                               execution_options={'max_row_buffer': self.max_rows + 1})
+                    columns = list(result.keys())
+                    rows = await result.fetchmany(self.max_rows + 1)
+                    await result.close()
+                    elapsed_ms = round(1000 * (time.perf_counter() - started), 2)
+                    analyzed = None
+                    if self._sample_analyze(plan):
+                        try:
+                            async with conn.begin_nested():
+                                analyzed = self._analyzed(await self._explain(conn, sql, params, analyze=True))
+                        except Exception as e:
+                            print(f"EXPLAIN ANALYZE failed: {e}")
+        except DBAPIError as e:
+            self._raise_if_canceled(e)
+            raise
+        return self._finish(sql, params, plan, elapsed_ms, columns, rows, analyzed)
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+from summary_maintenance import MAINTENANCE_TRY_LOCK_SQL
+
+REFRESH_INTERVAL_SECONDS = float(os.getenv('REFRESH_INTERVAL_SECONDS', '0'))
+REFRESH_JOB_HISTORY = int(os.getenv('REFRESH_JOB_HISTORY', '100'))
+REFRESH_POLL_SECONDS = float(os.getenv('REFRESH_POLL_SECONDS', '5'))
+# A running job's worker renews its lease every REFRESH_HEARTBEAT_SECONDS; a job
+# not renewed for REFRESH_LEASE_SECONDS is re-queued, or failed after REFRESH_MAX_ATTEMPTS
+REFRESH_HEARTBEAT_SECONDS = float(os.getenv('REFRESH_HEARTBEAT_SECONDS', '15'))
+REFRESH_LEASE_SECONDS = float(os.getenv('REFRESH_LEASE_SECONDS', '120'))
+REFRESH_MAX_ATTEMPTS = int(os.getenv('REFRESH_MAX_ATTEMPTS', '2'))
+
+JOBS_TABLE = 'refresh_jobs'
+JOB_COLUMNS = 'job_id, status, options, submitted_at, started_at, finished_at, result, error, attempts, heartbeat_at'
+
+
+class RefreshJobQueue:
+    """Runs summary refreshes on a background thread and tracks their status in Postgres.
+
+    `refresh` is called as refresh(**kwargs) for each job, one at a time. Jobs
+    are rows of the refresh_jobs table, so every app worker can report on any
+    job and the first idle worker runs it. A request made while an identical
+    job is still queued returns that job instead of queueing another. The last
+    REFRESH_JOB_HISTORY finished jobs are kept.
+
+    The worker running a job renews its heartbeat_at. If the worker dies, the
+    next claim finds the lease expired and re-queues the job, or marks it
+    failed once it has been attempted REFRESH_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, refresh, engine, history: int = None, poll_seconds: float = None):
+        self.refresh = refresh
+        self.engine = engine
+        self.history = history or REFRESH_JOB_HISTORY
+        self.poll_seconds = poll_seconds or REFRESH_POLL_SECONDS
+        self._wake = threading.Event()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    options JSONB NOT NULL,
+                    submitted_at DOUBLE PRECISION NOT NULL,
+                    started_at DOUBLE PRECISION,
+                    finished_at DOUBLE PRECISION,
+                    result JSONB,
+                    error TEXT
+                )
+            """))
+            conn.execute(text(f"""
+                ALTER TABLE {JOBS_TABLE}
+                    ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0,
+                    ADD COLUMN IF NOT EXISTS heartbeat_at DOUBLE PRECISION
+            """))
+        self._worker = threading.Thread(target=self._run, name='summary-refresh', daemon=True)
+        self._worker.start()
+        self._scheduler = None
+
+    def submit(self, **kwargs) -> dict:
+        """Queue a refresh and return its job record"""
+        with self.engine.begin() as conn:
+            job = self._submit(conn, kwargs)
+        self._wake.set()
+        return job
+
+    def _submit(self, conn, options: dict) -> dict:
+        # Serialize submissions so two workers never queue the same refresh twice
+        conn.execute(text(f"LOCK TABLE {JOBS_TABLE} IN SHARE ROW EXCLUSIVE MODE"))
+        row = conn.execute(text(f"""
+            SELECT {JOB_COLUMNS} FROM {JOBS_TABLE}
+            WHERE status = 'queued' AND options = CAST(:options AS JSONB)
+            ORDER BY submitted_at LIMIT 1
+        """), {'options': json.dumps(options)}).mappings().first()
+        if row is not None:
+            return dict(row)
+        job_id = uuid.uuid4().hex
+        conn.execute(text(f"""
+            INSERT INTO {JOBS_TABLE} (job_id, status, options, submitted_at)
+            VALUES (:job_id, 'queued', CAST(:options AS JSONB), :submitted_at)
+        """), {'job_id': job_id, 'options': json.dumps(options), 'submitted_at': time.time()})
+        conn.execute(text(f"""
+            DELETE FROM {JOBS_TABLE} WHERE job_id IN (
+                SELECT job_id FROM {JOBS_TABLE} WHERE status IN ('succeeded', 'failed')
+                ORDER BY finished_at DESC OFFSET :history
+            )
+        """), {'history': self.history})
+        return dict(conn.execute(text(f"SELECT {JOB_COLUMNS} FROM {JOBS_TABLE} WHERE job_id = :job_id"),
+                                 {'job_id': job_id}).mappings().first())
+
+    def get(self, job_id: str):
+        """Job record for an id, or None when unknown"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text(f"SELECT {JOB_COLUMNS} FROM {JOBS_TABLE} WHERE job_id = :job_id"),
+                               {'job_id': job_id}).mappings().first()
+        return dict(row) if row else None
+
+    def _expire_leases(self, conn):
+        """Re-queue running jobs whose worker stopped renewing the lease, or fail them after the last attempt"""
+        now = time.time()
+        conn.execute(text(f"""
+            UPDATE {JOBS_TABLE}
+            SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+                error = CASE WHEN attempts >= :max_attempts
+                             THEN 'Worker stopped responding after ' || attempts || ' attempt(s)' END,
+                finished_at = CASE WHEN attempts >= :max_attempts THEN :now END
+            WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < :expired
+        """), {'max_attempts': REFRESH_MAX_ATTEMPTS, 'now': now, 'expired': now - REFRESH_LEASE_SECONDS})
+
+    def _claim(self):
+        """Mark the oldest queued job as running and return it, or None"""
+        with self.engine.begin() as conn:
+            self._expire_leases(conn)
+            row = conn.execute(text(f"""
+                UPDATE {JOBS_TABLE}
+                SET status = 'running', started_at = :now, heartbeat_at = :now, attempts = attempts + 1
+                WHERE job_id = (
+                    SELECT job_id FROM {JOBS_TABLE} WHERE status = 'queued'
+                    ORDER BY submitted_at LIMIT 1 FOR UPDATE SKIP LOCKED
+                )
+                RETURNING job_id, options
+            """), {'now': time.time()}).mappings().first()
+        return dict(row) if row else None
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        while not stop.wait(REFRESH_HEARTBEAT_SECONDS):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"""
+                        UPDATE {JOBS_TABLE} SET heartbeat_at = :now WHERE job_id = :job_id AND status = 'running'
+                    """), {'job_id': job_id, 'now': time.time()})
+            except Exception as e:
+                print(f"Error renewing refresh job {job_id}: {e}")
+
+    def _finish(self, job_id: str, status: str, result, error):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                UPDATE {JOBS_TABLE}
+                SET status = :status, result = CAST(:result AS JSONB), error = :error, finished_at = :now
+                WHERE job_id = :job_id
+            """), {'job_id': job_id, 'status': status, 'result': json.dumps(result, default=str),
+                   'error': error, 'now': time.time()})
+
+    def _run(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Error claiming refresh job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            stop = threading.Event()
+            threading.Thread(target=self._heartbeat, args=(job['job_id'], stop), daemon=True).start()
+            try:
+                result = self.refresh(**job['options'])
+                status, error = 'succeeded', None
+            except Exception as e:
+                print(f"Error in background refresh {job['job_id']}: {e}")
+                result, status, error = None, 'failed', str(e)
+            finally:
+                stop.set()
+            try:
+                self._finish(job['job_id'], status, result, error)
+            except Exception as e:
+                print(f"Error recording refresh job {job['job_id']}: {e}")
+
+    def submit_scheduled(self, interval: float):
+        """Queue a scheduled refresh unless any worker has one queued, running or finished within half the interval"""
+        with self.engine.begin() as conn:
+            # The maintenance lock is held while summaries are applied, and serializes the check below
+            if not conn.execute(text(MAINTENANCE_TRY_LOCK_SQL)).scalar():
+                return None
+            recent = conn.execute(text(f"""
+                SELECT 1 FROM {JOBS_TABLE}
+                WHERE options = '{{}}'::jsonb
+                  AND (status = 'queued' OR (status = 'running' AND heartbeat_at > :expired) OR finished_at > :since)
+                LIMIT 1
+            """), {'since': time.time() - interval / 2, 'expired': time.time() - REFRESH_LEASE_SECONDS}).first()
+            if recent:
+                return None
+            job = self._submit(conn, {})
+        self._wake.set()
+        return job
+
+    def start_schedule(self, interval_seconds: float = None):
+        """Submit a refresh every interval_seconds (REFRESH_INTERVAL_SECONDS); 0 disables"""
+        interval = REFRESH_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        if interval <= 0 or self._scheduler is not None:
+            return
+
+        def tick():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.submit_scheduled(interval)
+                except Exception as e:
+                    print(f"Error scheduling summary refresh: {e}")
+
+        self._scheduler = threading.Thread(target=tick, name='summary-refresh-schedule', daemon=True)
+        self._scheduler.start()
+        print(f"⏱️ Summary refresh scheduled every {interval:.0f}s")
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import re
+
+from sqlalchemy import text
+
+from star_schema import fact_table
+
+SNAPSHOT_DIR = os.getenv('SCHEMA_SNAPSHOT_DIR', '.schema_snapshots')
+
+# "metadata" reads the ipl_metadata table kept up to date at load time and falls
+# back to planner statistics; "catalog" always uses planner statistics; "exact"
+# scans ipl_balls like the original startup did.
+STARTUP_STATS_MODE = os.getenv('STARTUP_STATS_MODE', 'metadata')
+
+EXACT_STATS_SQL = """
+    SELECT
+        COUNT(*) as total_records,
+        COUNT(DISTINCT season) as seasons,
+        COUNT(DISTINCT match_id) as matches,
+        MIN(date)::text as first_date,
+        MAX(date)::text as last_date,
+        MIN(year) as first_year,
+        MAX(year) as last_year,
+        MIN(season)::text as first_season,
+        MAX(season)::text as last_season,
+        ARRAY_AGG(DISTINCT season::text) FILTER (WHERE season IS NOT NULL) as season_list
+    FROM {table}
+"""
+
+EXACT_TEAMS_SQL = """
+    SELECT DISTINCT batting_team
+    FROM {table}
+    WHERE batting_team != ''
+    ORDER BY batting_team
+"""
+
+
+def ensure_metadata_table(conn):
+    """Create the single-row ipl_metadata table if it does not exist yet"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS ipl_metadata (
+            id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            data_version BIGINT NOT NULL DEFAULT 0,
+            stats JSONB,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    conn.execute(text("INSERT INTO ipl_metadata (id) VALUES (1) ON CONFLICT (id) DO NOTHING"))
+
+
+def _metadata_exists(conn) -> bool:
+    return conn.execute(text("SELECT to_regclass('ipl_metadata') IS NOT NULL")).scalar()
+
+
+def read_metadata(conn):
+    """Return (data_version, stats dict or None), or None when there is no metadata table"""
+    if not _metadata_exists(conn):
+        return None
+    row = conn.execute(text("SELECT data_version, stats FROM ipl_metadata WHERE id = 1")).fetchone()
+    if row is None:
+        return None
+    return row[0], row[1]
+
+
+def increment_data_version(conn) -> int:
+    """Increment the shared data version so every process drops caches keyed on it"""
+    ensure_metadata_table(conn)
+    return conn.execute(text("""
+        UPDATE ipl_metadata SET data_version = data_version + 1, updated_at = now()
+        WHERE id = 1 RETURNING data_version
+    """)).scalar()
+
+
+def _store_metadata(conn, stats: dict):
+    ensure_metadata_table(conn)
+    conn.execute(text("""
+        UPDATE ipl_metadata
+        SET stats = CAST(:stats AS JSONB), data_version = data_version + 1, updated_at = now()
+        WHERE id = 1
+    """), {'stats': json.dumps(stats)})
+
+
+def refresh_metadata(conn) -> dict:
+    """Recompute exact table stats and bump the data version; call after a bulk load"""
+    stats = exact_table_stats(conn)
+    _store_metadata(conn, stats)
+    return stats
+
+
+def apply_metadata_delta(conn, staged_table: str, added_rows: int, added_matches: int) -> dict:
+    """Fold staged rows into the stored stats and bump the data version, without scanning ipl_balls.
+
+    added_rows and added_matches are net of the rows and matches the staged ones
+    replaced. Falls back to refresh_metadata when no exact stats are stored yet.
+    """
+    metadata = read_metadata(conn)
+    stats = metadata[1] if metadata is not None else None
+    if not stats or stats.get('season_list') is None:
+        return refresh_metadata(conn)
+
+    staged = exact_table_stats(conn, staged_table)
+    merged = dict(stats, total_records=stats['total_records'] + added_rows, matches=stats['matches'] + added_matches)
+    for key, pick in (('first_date', min), ('last_date', max), ('first_year', min), ('last_year', max),
+                      ('first_season', min), ('last_season', max)):
+        values = [value for value in (stats.get(key), staged.get(key)) if value is not None]
+        merged[key] = pick(values) if values else None
+    merged['season_list'] = sorted(set(stats['season_list']) | set(staged['season_list']))
+    merged['seasons'] = len(merged['season_list'])
+    merged['teams'] = sorted(set(stats['teams']) | set(staged['teams']))
+    _store_metadata(conn, merged)
+    return merged
+
+
+def current_data_version(conn) -> str:
+    """Cheap version stamp for ipl_balls.
+
+    Uses ipl_metadata when present; otherwise falls back to the table's
+    insert/update/delete counters from pg_stat_user_tables.
+    """
+    metadata = read_metadata(conn)
+    if metadata is not None:
+        return f"v{metadata[0]}"
+
+    row = conn.execute(text("""
+        SELECT n_tup_ins, n_tup_upd, n_tup_del
+        FROM pg_stat_user_tables WHERE relname = :table
+    """), {'table': fact_table(conn)}).fetchone()
+    return "stat:" + ":".join(str(value) for value in row) if row else "unknown"
+
+
+def exact_table_stats(conn, table: str = 'ipl_balls') -> dict:
+    """Full-scan stats over ipl_balls (or a staging table); exact but proportional to table size"""
+    row = conn.execute(text(EXACT_STATS_SQL.format(table=table))).mappings().fetchone()
+    stats = dict(row)
+    stats['season_list'] = sorted(stats['season_list'] or [])
+    stats['teams'] = [team[0] for team in conn.execute(text(EXACT_TEAMS_SQL.format(table=table))).fetchall()]
+    return stats
+
+
+def _column_stats(conn, column: str):
+    return conn.execute(text("""
+        SELECT n_distinct,
+               most_common_vals::text AS most_common_vals,
+               histogram_bounds::text AS histogram_bounds
+        FROM pg_stats
+        WHERE tablename = :table AND attname = :column
+        LIMIT 1
+    """), {'table': fact_table(conn), 'column': column}).mappings().fetchone()
+
+
+def _parse_pg_array(value):
+    """Split a pg_stats anyarray rendered as text, e.g. {2008,2009} or {"Mumbai Indians",...}"""
+    if not value:
+        return []
+    return [item.strip('"') for item in re.findall(r'"(?:[^"\\]|\\.)*"|[^,{}]+', value)]
+
+
+def _reltuples(conn) -> int:
+    return conn.execute(text(
+        "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+    ), {'table': fact_table(conn)}).scalar()
+
+
+def catalog_table_stats(conn) -> dict:
+    """Approximate stats from pg_class and pg_stats; constant time regardless of table size"""
+    total = _reltuples(conn)
+
+    def distinct(column):
+        column_stats = _column_stats(conn, column)
+        if column_stats is None or column_stats['n_distinct'] is None:
+            return 0
+        n_distinct = column_stats['n_distinct']
+        # Negative n_distinct is a fraction of the row count
+        return int(round(-n_distinct * total)) if n_distinct < 0 else int(n_distinct)
+
+    def bounds(column):
+        column_stats = _column_stats(conn, column)
+        if column_stats is None:
+            return [], []
+        return (_parse_pg_array(column_stats['most_common_vals']),
+                _parse_pg_array(column_stats['histogram_bounds']))
+
+    def value_range(column):
+        common, histogram = bounds(column)
+        values = sorted(common + histogram)
+        return (values[0], values[-1]) if values else (None, None)
+
+    first_date, last_date = value_range('date')
+    first_season, last_season = value_range('season')
+    first_year, last_year = value_range('year')
+    team_values, team_histogram = bounds('batting_team')
+
+    return {
+        'total_records': total,
+        'seasons': distinct('season'),
+        'matches': distinct('match_id'),
+        'first_date': first_date,
+        'last_date': last_date,
+        'first_year': int(first_year) if first_year else None,
+        'last_year': int(last_year) if last_year else None,
+        'first_season': first_season,
+        'last_season': last_season,
+        'teams': sorted(team for team in set(team_values + team_histogram) if team),
+    }
+
+
+def table_stats(conn, mode: str = None) -> dict:
+    """Stats used to render the LLM schema summary, using the configured startup mode"""
+    mode = mode or STARTUP_STATS_MODE
+    if mode == 'exact':
+        return exact_table_stats(conn)
+    if mode == 'metadata':
+        metadata = read_metadata(conn)
+        if metadata is not None and metadata[1]:
+            return metadata[1]
+    return catalog_table_stats(conn)
+
+
+def estimated_row_count(conn) -> int:
+    """Row count for the startup banner without scanning ipl_balls"""
+    metadata = read_metadata(conn)
+    if metadata is not None and metadata[1]:
+        return metadata[1]['total_records']
+    return _reltuples(conn)
+
+
+def source_digest(path: str) -> str:
+    """Short digest of a module's source, so snapshots are re-rendered when the template changes"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()[:12]
+    except OSError:
+        return 'unknown'
+
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json")
+
+
+def load_summary_snapshot(name: str, data_version: str):
+    """Return the persisted data_summary for this data version, or None"""
+    try:
+        with open(_snapshot_path(name)) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('data_version') != data_version:
+        return None
+    return snapshot.get('data_summary')
+
+
+def save_summary_snapshot(name: str, data_version: str, data_summary: str):
+    """Persist a rendered data_summary so the next cold start can skip the stats queries"""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = _snapshot_path(name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'data_version': data_version, 'data_summary': data_summary}, f)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"Could not save schema snapshot: {e}")
@@ -0,0 +1,249 @@
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from answer_cache import normalize_question
+from intent_engine import BAT_HANDS, BOWL_KINDS, PHASES
+
+# Cricket phrasings that mean the same thing, folded before embedding so the
+# hashed vectorizer sees a shared vocabulary
+_SYNONYMS = {
+    'seamers': 'pace', 'seamer': 'pace', 'quicks': 'pace', 'fast': 'pace', 'pacers': 'pace',
+    'spinners': 'spin', 'spinner': 'spin',
+    'slog': 'death', 'hitters': 'batters', 'batsmen': 'batters',
+    'batsman': 'batter', 'scorers': 'batters', 'scorer': 'batter',
+    'against': 'vs', 'versus': 'vs', 'v': 'vs',
+    'wickets': 'wicket', 'runs': 'run', 'overs': 'over',
+    'pp': 'powerplay', 'fastest': 'strike rate', 'quickest': 'strike rate', 'sr': 'strike rate',
+}
+_NUMBER = re.compile(r"\b\d+\b")
+# Words that flip a ranking: "worst" and "fewest" need the opposite ORDER BY from "best" and "most"
+_LOW_RANKING = re.compile(r"\b(worst|lowest|least|fewest|poorest|expensive|slowest)\b")
+
+
+def canonical_question(question: str) -> str:
+    """Normalize a question and fold common cricket synonyms"""
+    words = normalize_question(question).split()
+    return " ".join(_SYNONYMS.get(word, word) for word in words)
+
+
+def question_slots(question: str, tagger=None) -> dict:
+    """What two questions must agree on to share SQL, however similar their wording.
+
+    Numbers, ranking direction, phase, pace/spin, batting hand and (with a
+    tagger such as EntityCatalog.tag) the players, teams and venues named.
+    """
+    text_value = canonical_question(question)
+    slots = {
+        'numbers': frozenset(_NUMBER.findall(text_value)),
+        'low': bool(_LOW_RANKING.search(text_value)),
+    }
+    for slot, choices in (('phase', PHASES), ('bowl_kind', BOWL_KINDS), ('bat_hand', BAT_HANDS)):
+        slots[slot] = frozenset(value for pattern, value in choices if pattern.search(text_value))
+    if tagger is not None:
+        slots['entities'] = frozenset((match.kind, name) for match in tagger(question) for name in match.names)
+    return slots
+
+
+class HashedNgramVectorizer:
+    """Dependency-free embedder: hashed character n-grams plus word uni/bigrams"""
+
+    # Tuned on benchmarks/question_corpus.jsonl: highest hit rate with no false hits, near misses included
+    default_threshold = 0.7
+
+    def __init__(self, dim: int = 1024, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text_value: str):
+        words = text_value.split()
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {text_value} "
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            features += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+        return features
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(canonical_question(question)):
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if digest & 1 else -1.0
+            vector[(digest >> 1) % self.dim] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """Small local CPU embedding model, used when sentence-transformers is installed"""
+
+    default_threshold = 0.85
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = self.model.encode(canonical_question(question), normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)
+
+
+def load_embedder(model_name: str = None):
+    """Return the configured local model, falling back to the hashed vectorizer"""
+    model_name = model_name or os.getenv('SEMANTIC_CACHE_MODEL')
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"Could not load embedding model {model_name}, using hashed n-grams: {e}")
+    return HashedNgramVectorizer()
+
+
+class LSHIndex:
+    """Random-hyperplane LSH index for approximate cosine nearest neighbours.
+
+    Each table hashes a vector to the sign pattern of `n_bits` projections;
+    candidates from every table's bucket are re-ranked by exact cosine.
+    """
+
+    def __init__(self, dim: int, n_tables: int = 12, n_bits: int = 6, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, n_bits, dim)).astype(np.float32)
+        self.powers = 1 << np.arange(n_bits)
+        self.tables = [dict() for _ in range(n_tables)]
+        self.vectors = {}
+
+    def _bucket_keys(self, vector: np.ndarray):
+        bits = (self.planes @ vector) > 0
+        return (bits * self.powers).sum(axis=1).tolist()
+
+    def add(self, item_id, vector: np.ndarray):
+        self.remove(item_id)
+        self.vectors[item_id] = vector
+        for table, key in zip(self.tables, self._bucket_keys(vector)):
+            table.setdefault(key, set()).add(item_id)
+
+    def remove(self, item_id):
+        vector = self.vectors.pop(item_id, None)
+        if vector is None:
+            return
+        for table, key in zip(self.tables, self._bucket_keys(vector)):
+            bucket = table.get(key)
+            if bucket:
+                bucket.discard(item_id)
+                if not bucket:
+                    del table[key]
+
+    def query(self, vector: np.ndarray, k: int = 1):
+        """Return up to k (item_id, cosine similarity) pairs, best first"""
+        candidates = set()
+        for table, key in zip(self.tables, self._bucket_keys(vector)):
+            candidates.update(table.get(key, ()))
+        if not candidates:
+            return []
+
+        ids = list(candidates)
+        scores = np.stack([self.vectors[i] for i in ids]) @ vector
+        order = np.argsort(-scores)[:k]
+        return [(ids[i], float(scores[i])) for i in order]
+
+    def __len__(self):
+        return len(self.vectors)
+
+
+class SemanticQueryCache:
+    """Maps paraphrased questions onto SQL that already ran for a similar question.
+
+    A lookup only hits when cosine similarity is at least `threshold` (by default
+    the embedder's tuned value) and both questions agree on every slot in
+    question_slots, since "vs spin" and "vs pace", "best" and "worst", or an
+    added "at Wankhede" embed almost identically but need different SQL.
+    `tagger` (a callable returning EntityMatch lists) adds names to the slots.
+    """
+
+    def __init__(self, embedder=None, threshold: float = None, max_entries: int = 5000, tagger=None):
+        self.embedder = embedder or load_embedder()
+        self.tagger = tagger
+        self.threshold = threshold if threshold is not None else self.embedder.default_threshold
+        self.max_entries = max_entries
+        self.index = LSHIndex(self.embedder.dim)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+
+    def add(self, question: str, sql: str):
+        key = canonical_question(question)
+        if not key or not sql:
+            return
+
+        vector = self.embedder.embed(question)
+        with self._lock:
+            self._entries[key] = {'question': question, 'sql': sql, 'added_at': time.time()}
+            self.index.add(key, vector)
+            while len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k]['added_at'])
+                self._remove(oldest)
+
+    def lookup(self, question: str):
+        """Return (sql, similarity, matched_question) for the nearest cached question, or None"""
+        start = time.perf_counter()
+        vector = self.embedder.embed(question)
+        match = None
+        with self._lock:
+            candidates = [(dict(self._entries[key]), similarity) for key, similarity in self.index.query(vector, k=3)
+                          if similarity >= self.threshold]
+        # Slots are compared outside the lock; the tagger may load names from the database
+        if candidates:
+            slots = question_slots(question, self.tagger)
+            for entry, similarity in candidates:
+                if question_slots(entry['question'], self.tagger) == slots:
+                    match = (entry['sql'], similarity, entry['question'])
+                    break
+
+        with self._lock:
+            if match:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return match
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        self.index.remove(key)
+
+    def evict(self, question: str):
+        """Forget the entry stored for this question"""
+        with self._lock:
+            self._remove(canonical_question(question))
+
+    def evict_sql(self, sql: str):
+        """Forget every question that maps to this SQL"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry['sql'] == sql]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'threshold': self.threshold,
+                'embedder': type(self.embedder).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'avg_lookup_ms': round(1000 * self.lookup_seconds / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+
+from answer_cache import normalize_question
+
+
+class SQLQueryCache:
+    """Persistent question -> SQL cache backed by SQLite.
+
+    Only queries that executed without error and returned rows should be stored,
+    so a hit can be run directly without asking the LLM again. The file survives
+    process restarts; point SQL_CACHE_PATH at a persistent disk in production.
+    """
+
+    def __init__(self, path: str = 'sql_cache.db', model: str = 'llama3-8b-8192'):
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                question_key TEXT NOT NULL,
+                model TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (question_key, model)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, question: str):
+        """Return cached SQL for the question, or None"""
+        key = normalize_question(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sql FROM sql_cache WHERE question_key = ? AND model = ?",
+                (key, self.model)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE sql_cache SET hit_count = hit_count + 1, last_used_at = ? "
+                "WHERE question_key = ? AND model = ?",
+                (time.time(), key, self.model)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, question: str, sql: str, row_count: int):
+        """Remember SQL that executed successfully and returned rows"""
+        if not sql or row_count <= 0:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO sql_cache (question_key, model, question, sql, row_count, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (question_key, model) DO UPDATE SET
+                    question = excluded.question,
+                    sql = excluded.sql,
+                    row_count = excluded.row_count,
+                    last_used_at = excluded.last_used_at
+                """,
+                (normalize_question(question), self.model, question, sql, row_count, now, now)
+            )
+            self._conn.commit()
+
+    def invalidate(self, question: str):
+        """Drop the entry for a question, e.g. when its SQL stops working"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sql_cache WHERE question_key = ? AND model = ?",
+                (normalize_question(question), self.model)
+            )
+            self._conn.commit()
+
+    def entries(self):
+        """Return (question, sql) pairs, most used first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT question, sql FROM sql_cache WHERE model = ? "
+                "ORDER BY hit_count DESC, last_used_at DESC",
+                (self.model,)
+            ).fetchall()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM sql_cache WHERE model = ?", (self.model,)
+            ).fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
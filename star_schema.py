@@ -0,0 +1,274 @@
+"""Optional star schema for ipl_balls with integer-keyed player, team and venue dimensions.
+
+The names repeated on every ball move into three dimension tables (players,
+teams, venues). The fact table ipl_balls_fact stores int4 foreign keys in
+their place (batter_id, bowling_team_id, venue_id, ...), which shrinks the
+table, its indexes and GROUP BY hashing. ipl_balls becomes a view that joins
+the names back under the original column names and order, so prompts,
+fallbacks, summary views and generated SQL keep working; the planner drops
+joins whose names a query does not read. An INSTEAD OF INSERT trigger on the
+view resolves names to ids (adding new players, teams and venues as they
+appear), so COPY and INSERT into ipl_balls still work. Bulk loads skip the
+per-row trigger: load_data.py copies into a staging table and calls
+insert_from_staging, which adds new names and inserts the facts in one
+statement each. Deletes, truncates, ANALYZE and indexes go to fact_table(conn).
+
+    python star_schema.py --keep-old     # migrate; keep the text table as ipl_balls_text
+    python benchmarks/star_schema_bench.py
+
+Star schema and season partitioning (migrate_partitions.py) are alternatives:
+each migration refuses to run on top of the other.
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+VIEW = 'ipl_balls'
+FACT_TABLE = 'ipl_balls_fact'
+OLD_TABLE = 'ipl_balls_text'
+
+DIMENSIONS = {
+    'players': ('batter', 'bowler', 'non_striker', 'batting_captain', 'bowling_captain'),
+    'teams': ('batting_team', 'bowling_team'),
+    'venues': ('venue',),
+}
+DIMENSION_COLUMNS = {column: table for table, columns in DIMENSIONS.items() for column in columns}
+
+# Lookups the common filters need; indexes on the phase/kind columns come from derived_columns.py
+FACT_INDEXES = {
+    'idx_ipl_balls_fact_batter': ('batter_id',),
+    'idx_ipl_balls_fact_bowler': ('bowler_id',),
+    'idx_ipl_balls_fact_match': ('match_id',),
+    'idx_ipl_balls_fact_year': ('year',),
+}
+
+
+def is_star_schema(conn) -> bool:
+    return conn.execute(text(f"SELECT to_regclass('{FACT_TABLE}') IS NOT NULL")).scalar()
+
+
+def fact_table(conn) -> str:
+    """The table that physically holds the balls: ipl_balls, or ipl_balls_fact under the star schema"""
+    return FACT_TABLE if is_star_schema(conn) else VIEW
+
+
+def fact_column(name: str) -> str:
+    """Fact-table column for an ipl_balls column name"""
+    return f"{name}_id" if name in DIMENSION_COLUMNS else name
+
+
+def quoted_columns(columns) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def relation_size(conn, names) -> int:
+    """Bytes used by the relations, including their indexes and TOAST"""
+    return conn.execute(text(
+        "SELECT COALESCE(SUM(pg_total_relation_size(to_regclass(name))), 0) FROM unnest(CAST(:names AS text[])) name"
+    ), {'names': list(names)}).scalar()
+
+
+def _columns(conn, table: str) -> list:
+    """(name, type, generated) of a table's columns in order"""
+    return [tuple(row) for row in conn.execute(text("""
+        SELECT attname, format_type(atttypid, atttypmod), attgenerated <> ''
+        FROM pg_attribute
+        WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """), {'table': table}).fetchall()]
+
+
+def _dimension_of(fact_column_name: str):
+    if fact_column_name.endswith('_id'):
+        return DIMENSION_COLUMNS.get(fact_column_name[:-3])
+    return None
+
+
+def create_view(conn):
+    """(Re)create the ipl_balls view and its insert trigger from the fact table's columns"""
+    columns = _columns(conn, FACT_TABLE)
+    select_list, joins, insert_columns, insert_values = [], [], [], []
+    for position, (name, _, generated) in enumerate(columns):
+        dimension = _dimension_of(name)
+        if dimension:
+            alias = f"d{position}"
+            joins.append(f'LEFT JOIN {dimension} {alias} ON {alias}.id = f."{name}"')
+            select_list.append(f'{alias}.name AS "{name[:-3]}"')
+            value = f'{dimension}_id(NEW."{name[:-3]}")'
+        else:
+            select_list.append(f'f."{name}"')
+            value = f'NEW."{name}"'
+        if not generated:
+            insert_columns.append(f'"{name}"')
+            insert_values.append(value)
+
+    # Statements hold $$ bodies and quoted names, so bypass bind parsing
+    conn.exec_driver_sql(
+        f"CREATE OR REPLACE VIEW {VIEW} AS SELECT {', '.join(select_list)} FROM {FACT_TABLE} f {' '.join(joins)}"
+    )
+    conn.exec_driver_sql(f"""
+        CREATE OR REPLACE FUNCTION {VIEW}_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO {FACT_TABLE} ({', '.join(insert_columns)}) VALUES ({', '.join(insert_values)});
+            RETURN NEW;
+        END $$
+    """)
+    conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {VIEW}_insert ON {VIEW}")
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER {VIEW}_insert INSTEAD OF INSERT ON {VIEW} FOR EACH ROW EXECUTE FUNCTION {VIEW}_insert()"
+    )
+
+
+def _create_dimension(conn, table: str):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INT4 GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """))
+    # Used by the insert trigger: returns the id for a name, adding it on first sight
+    conn.exec_driver_sql(f"""
+        CREATE OR REPLACE FUNCTION {table}_id(p_name TEXT) RETURNS INT4 LANGUAGE plpgsql AS $$
+        DECLARE
+            result INT4;
+        BEGIN
+            IF p_name IS NULL THEN
+                RETURN NULL;
+            END IF;
+            SELECT id INTO result FROM {table} WHERE name = p_name;
+            IF result IS NULL THEN
+                INSERT INTO {table} (name) VALUES (p_name) ON CONFLICT (name) DO NOTHING RETURNING id INTO result;
+                IF result IS NULL THEN
+                    SELECT id INTO result FROM {table} WHERE name = p_name;
+                END IF;
+            END IF;
+            RETURN result;
+        END $$
+    """)
+
+
+def insert_from_staging(conn, staging: str) -> int:
+    """Insert rows staged with ipl_balls columns into the fact table, set-based; returns the row count"""
+    staged = {name for name, _, _ in _columns(conn, staging)}
+    for table, names in DIMENSIONS.items():
+        sources = " UNION ".join(f'SELECT "{name}" AS name FROM {staging}' for name in names if name in staged)
+        if sources:
+            # Sorted, so parallel loaders take the unique-index locks in the same order
+            conn.exec_driver_sql(f"""
+                INSERT INTO {table} (name)
+                SELECT name FROM ({sources}) s WHERE name IS NOT NULL ORDER BY name
+                ON CONFLICT (name) DO NOTHING
+            """)
+
+    insert_columns, select_list, joins = [], [], []
+    for position, (name, _, generated) in enumerate(_columns(conn, FACT_TABLE)):
+        dimension = _dimension_of(name)
+        source = name[:-3] if dimension else name
+        if generated or source not in staged:
+            continue
+        insert_columns.append(f'"{name}"')
+        if dimension:
+            alias = f"d{position}"
+            joins.append(f'LEFT JOIN {dimension} {alias} ON {alias}.name = s."{source}"')
+            select_list.append(f'{alias}.id')
+        else:
+            select_list.append(f's."{name}"')
+    return conn.exec_driver_sql(
+        f"INSERT INTO {FACT_TABLE} ({', '.join(insert_columns)}) "
+        f"SELECT {', '.join(select_list)} FROM {staging} s {' '.join(joins)}"
+    ).rowcount
+
+
+def migrate(engine, keep_old: bool = False) -> dict:
+    """Split ipl_balls into dimension tables and an int4-keyed fact table behind an ipl_balls view"""
+    from derived_columns import DERIVED_INDEXES, ensure_derived_columns
+    from migrate_partitions import is_partitioned
+
+    with engine.begin() as conn:
+        if is_star_schema(conn):
+            print("ipl_balls already uses the star schema")
+            return {'migrated': False}
+        if is_partitioned(conn):
+            print("⚠️ ipl_balls is partitioned by season; the star schema is an alternative to partitioning")
+            return {'migrated': False}
+
+        columns = _columns(conn, VIEW)
+        dimensions = {name: DIMENSION_COLUMNS[name] for name, _, _ in columns if name in DIMENSION_COLUMNS}
+        old_indexes = [row[0] for row in conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()"
+        ), {'table': VIEW}).fetchall()]
+        dropped_indexes = [name for name in old_indexes if name not in DERIVED_INDEXES]
+        size_before = relation_size(conn, [VIEW])
+
+        for table in sorted(set(dimensions.values())):
+            _create_dimension(conn, table)
+            sources = " UNION ".join(
+                f'SELECT "{name}" AS name FROM {VIEW}' for name, dimension in dimensions.items() if dimension == table
+            )
+            conn.exec_driver_sql(f"""
+                INSERT INTO {table} (name)
+                SELECT name FROM ({sources}) s WHERE name IS NOT NULL ORDER BY name
+                ON CONFLICT (name) DO NOTHING
+            """)
+
+        # Same column order as ipl_balls with names swapped for ids; generated columns are added back below
+        select_list, joins = [], []
+        for position, (name, _, generated) in enumerate(columns):
+            if generated:
+                continue
+            if name in dimensions:
+                alias = f"d{position}"
+                joins.append(f'LEFT JOIN {dimensions[name]} {alias} ON {alias}.name = b."{name}"')
+                select_list.append(f'{alias}.id AS "{name}_id"')
+            else:
+                select_list.append(f'b."{name}"')
+        rows = conn.exec_driver_sql(
+            f"CREATE TABLE {FACT_TABLE} AS SELECT {', '.join(select_list)} FROM {VIEW} b {' '.join(joins)}"
+        ).rowcount
+        for name, dimension in dimensions.items():
+            conn.exec_driver_sql(
+                f'ALTER TABLE {FACT_TABLE} ADD CONSTRAINT {FACT_TABLE}_{name}_fkey '
+                f'FOREIGN KEY ("{name}_id") REFERENCES {dimension} (id)'
+            )
+
+        conn.execute(text(f"ALTER TABLE {VIEW} RENAME TO {OLD_TABLE}"))
+        for name in old_indexes:
+            conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_text"'))
+        # fact_table() now resolves to the fact, so generated columns and their indexes land there
+        ensure_derived_columns(conn)
+        for name, index_columns in FACT_INDEXES.items():
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {FACT_TABLE} ({quoted_columns(index_columns)})")
+        create_view(conn)
+
+        if not keep_old:
+            conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+        for table in [FACT_TABLE] + sorted(set(dimensions.values())):
+            conn.execute(text(f"ANALYZE {table}"))
+        size_after = relation_size(conn, [FACT_TABLE] + sorted(set(dimensions.values())))
+        counts = {table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                  for table in sorted(set(dimensions.values()))}
+
+    print(f"✅ Moved {rows:,} rows to {FACT_TABLE} with {', '.join(f'{n:,} {t}' for t, n in counts.items())}")
+    print(f"   ipl_balls size: {size_before / 2**20:,.1f} MB before, {size_after / 2**20:,.1f} MB after "
+          f"(fact + dimensions, with indexes)")
+    if dropped_indexes:
+        print(f"ℹ️ Indexes on the text columns were not carried over ({', '.join(dropped_indexes)}); "
+              f"run index_advisor.py against the new layout")
+    return {'migrated': True, 'rows': rows, 'dimensions': counts,
+            'size_before': size_before, 'size_after': size_after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move ipl_balls to an integer-keyed star schema")
+    parser.add_argument('--keep-old', action='store_true', help=f'keep the original table as {OLD_TABLE}')
+    args = parser.parse_args()
+
+    from db import get_engine
+    load_dotenv()
+    migrate(get_engine(os.getenv('DATABASE_URL')), keep_old=args.keep_old)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 import streamlit as st
 from ipl_chatbot_postgres import IPLStatsPostgresChatbot
+from answer_cache import normalize_question
+from refresh_jobs import RefreshJobQueue
+from live_ingest import start_live_ingest
 import os
 from dotenv import load_dotenv
 
@@ -17,13 +20,37 @@ st.set_page_config(
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 
-# Initialize chatbot
-try:
-    chatbot = IPLStatsPostgresChatbot(
+# Streamlit re-runs this script on every interaction, so the chatbot (and with it
+# the SQLAlchemy engine and the startup schema probes) is built once per process
+@st.cache_resource(show_spinner="Connecting to the IPL database...")
+def get_chatbot():
+    return IPLStatsPostgresChatbot(
         os.getenv('DATABASE_URL'),
         os.getenv('GROQ_API_KEY')
     )
-    st.session_state.chatbot = chatbot
+
+@st.cache_resource
+def get_refresh_jobs(_chatbot):
+    """Background summary refreshes, on the REFRESH_INTERVAL_SECONDS schedule when set"""
+    jobs = RefreshJobQueue(_chatbot.refresh_materialized_views, _chatbot.engine)
+    jobs.start_schedule()
+    return jobs
+
+@st.cache_resource
+def get_live_ingest(_chatbot):
+    """Live match stats from LIVE_FEED, if configured"""
+    return start_live_ingest(_chatbot)
+
+@st.cache_data(ttl=int(os.getenv('STREAMLIT_ANSWER_TTL', '3600')), max_entries=1000, show_spinner=False)
+def get_answer(question_key: str, data_version: int, _question: str) -> str:
+    """Answer a question, cached per normalized question and data version"""
+    return get_chatbot().ask(_question)
+
+# Initialize chatbot
+try:
+    chatbot = get_chatbot()
+    get_refresh_jobs(chatbot)
+    get_live_ingest(chatbot)
 except Exception as e:
     st.error(f"Error initializing chatbot: {e}")
     st.stop()
@@ -67,7 +94,8 @@ if prompt := st.chat_input("Ask me about IPL stats..."):
     # Get bot response
     with st.spinner("Analyzing..."):
         try:
-            response = chatbot.ask(prompt)
+            chatbot.check_data_version()
+            response = chatbot.live_answer(prompt) or get_answer(normalize_question(prompt), chatbot.data_version, prompt)
             # Add bot response to chat history
             st.session_state.chat_history.append({"role": "assistant", "content": response})
             # Display bot response
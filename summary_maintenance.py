@@ -0,0 +1,191 @@
+"""Keep the rollup tables and the views built on them up to date by match.
+
+The rollup tables (cube_batting, cube_bowling) hold only additive measures, so
+a match is folded in by aggregating its balls and upserting the result with
+ON CONFLICT ... DO UPDATE. summary_ledger records which match_ids each rollup
+already includes, making every apply idempotent. The mv_* views are computed
+from the rollups, so refreshing them reads thousands of rows rather than every
+ball. A full rebuild from ipl_balls is used when the rollups are new or on
+request.
+
+Refreshes started by the apps never alter ipl_balls: the generated columns
+and bowling_types lookup are created by load_data.py or by this script.
+
+    python summary_maintenance.py                    # fold in matches not yet applied
+    python summary_maintenance.py --match-id 1 2 3   # fold in specific matches
+    python summary_maintenance.py --full             # rebuild everything from ipl_balls
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from bowling_types import LOOKUP_TABLE, ensure_bowling_types, sync_bowling_types
+from derived_columns import DERIVED_COLUMNS, ensure_derived_columns, existing_columns
+from schema_snapshot import increment_data_version
+from star_schema import fact_table
+from summary_views import SUMMARY_VIEWS, ensure_summary_views, existing_summary_views, refresh_summary_views
+
+LEDGER_TABLE = 'summary_ledger'
+
+# Serializes maintenance across processes so a match is never applied twice
+MAINTENANCE_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('summary_maintenance'))"
+MAINTENANCE_TRY_LOCK_SQL = "SELECT pg_try_advisory_xact_lock(hashtext('summary_maintenance'))"
+
+
+def check_prerequisites(conn):
+    """Raise when the generated columns or bowling_types lookup the rollups group by are missing"""
+    missing = sorted(set(DERIVED_COLUMNS) - existing_columns(conn, fact_table(conn)))
+    if not conn.execute(text(f"SELECT to_regclass('{LOOKUP_TABLE}') IS NOT NULL")).scalar():
+        missing.append(LOOKUP_TABLE)
+    if missing:
+        raise RuntimeError(f"Missing {', '.join(missing)}; run python summary_maintenance.py "
+                           f"or python bowling_types.py to create them")
+
+
+def ensure_ledger(conn) -> bool:
+    """Create the ledger of applied match_ids; returns True when it was just created"""
+    if conn.execute(text(f"SELECT to_regclass('{LEDGER_TABLE}') IS NOT NULL")).scalar():
+        return False
+    # Copy the match_id type from ipl_balls so ANY(:match_ids) compares like with like
+    conn.execute(text(f"""
+        CREATE TABLE {LEDGER_TABLE} AS
+        SELECT "match_id", now() AS applied_at FROM ipl_balls WITH NO DATA
+    """))
+    conn.execute(text(f'ALTER TABLE {LEDGER_TABLE} ADD PRIMARY KEY ("match_id")'))
+    return True
+
+
+def rollup_tables(conn) -> list:
+    return [view for view in existing_summary_views(conn) if view.kind == 'table']
+
+
+def applied_match_ids(conn, match_ids) -> set:
+    rows = conn.execute(text(
+        f'SELECT "match_id" FROM {LEDGER_TABLE} WHERE "match_id" = ANY(:match_ids)'
+    ), {'match_ids': list(match_ids)}).fetchall()
+    return {row[0] for row in rows}
+
+
+def pending_match_ids(conn) -> list:
+    """Matches in ipl_balls that the rollups do not include yet, except those still being streamed"""
+    live_filter = ""
+    if conn.execute(text("SELECT to_regclass('live_matches') IS NOT NULL")).scalar():
+        live_filter = 'AND NOT EXISTS (SELECT 1 FROM live_matches m WHERE m."match_id" = b."match_id")'
+    rows = conn.execute(text(f"""
+        SELECT DISTINCT b."match_id" FROM ipl_balls b
+        WHERE NOT EXISTS (SELECT 1 FROM {LEDGER_TABLE} l WHERE l."match_id" = b."match_id")
+        {live_filter}
+    """)).fetchall()
+    return [row[0] for row in rows]
+
+
+def apply_match_delta(conn, match_ids, sign: int = 1) -> list:
+    """Add (sign=1) or subtract (sign=-1) the current ipl_balls rows of these matches.
+
+    Adding skips matches the ledger already has and subtracting skips matches it
+    does not, so calling either twice is harmless. To replace a match, subtract
+    it before its old rows are deleted and add it after the new rows are in.
+    Returns the match_ids actually applied.
+    """
+    match_ids = list(match_ids)
+    if not match_ids:
+        return []
+    applied = applied_match_ids(conn, match_ids)
+    match_ids = [match_id for match_id in match_ids if (match_id in applied) == (sign < 0)]
+    if not match_ids:
+        return []
+
+    for view in rollup_tables(conn):
+        for statement in view.delta_sql(sign):
+            conn.execute(text(statement), {'match_ids': match_ids})
+
+    if sign > 0:
+        conn.execute(text(
+            f'INSERT INTO {LEDGER_TABLE} ("match_id", applied_at) SELECT unnest(:match_ids), now()'
+        ), {'match_ids': match_ids})
+    else:
+        conn.execute(text(
+            f'DELETE FROM {LEDGER_TABLE} WHERE "match_id" = ANY(:match_ids)'
+        ), {'match_ids': match_ids})
+    return match_ids
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup table from ipl_balls and mark all matches as applied"""
+    for view in rollup_tables(conn):
+        for statement in view.rebuild_sql():
+            conn.execute(text(statement))
+    conn.execute(text(f"DELETE FROM {LEDGER_TABLE}"))
+    conn.execute(text(f"""
+        INSERT INTO {LEDGER_TABLE} ("match_id", applied_at)
+        SELECT DISTINCT "match_id", now() FROM ipl_balls
+    """))
+
+
+def refresh_summaries(engine, match_ids=None, full: bool = False) -> dict:
+    """Bring rollups and views up to date and bump the data version.
+
+    With no match_ids, every match missing from the ledger is applied. Falls
+    back to a full rebuild when `full` is set or the rollups or ledger were
+    just created.
+    """
+    started = time.perf_counter()
+    # The rollups group by the generated "bowl_kind" and "phase" columns
+    with engine.connect() as conn:
+        check_prerequisites(conn)
+    created = ensure_summary_views(engine)
+    created_tables = [view.name for view in SUMMARY_VIEWS if view.kind == 'table' and view.name in created]
+
+    with engine.begin() as conn:
+        conn.execute(text(MAINTENANCE_LOCK_SQL))
+        new_ledger = ensure_ledger(conn)
+        if full or new_ledger or created_tables:
+            rebuild_rollups(conn)
+            sync_bowling_types(conn)
+            mode, applied = 'full', None
+        else:
+            if match_ids is None:
+                match_ids = pending_match_ids(conn)
+            mode, applied = 'incremental', apply_match_delta(conn, match_ids)
+            sync_bowling_types(conn, applied)
+
+        refresh_summary_views(conn)
+        version = increment_data_version(conn)
+
+    elapsed_ms = round(1000 * (time.perf_counter() - started), 2)
+    if mode == 'full':
+        print(f"✅ Rebuilt summary tables from ipl_balls in {elapsed_ms:.0f} ms")
+    else:
+        print(f"✅ Applied {len(applied)} new match(es) to summary tables in {elapsed_ms:.0f} ms")
+    return {
+        'mode': mode,
+        'matches_applied': None if applied is None else len(applied),
+        'elapsed_ms': elapsed_ms,
+        'data_version': f"v{version}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain IPL summary tables and views")
+    parser.add_argument('--full', action='store_true', help='rebuild from ipl_balls instead of applying deltas')
+    parser.add_argument('--match-id', nargs='+', help='apply only these matches')
+    args = parser.parse_args()
+
+    from db import get_engine
+    load_dotenv()
+    engine = get_engine(os.getenv('DATABASE_URL'))
+    with engine.begin() as conn:
+        ensure_derived_columns(conn)
+        ensure_bowling_types(conn)
+    match_ids = args.match_id
+    if match_ids:
+        # match_id is numeric in the source data; keep other values as given
+        match_ids = [int(match_id) if match_id.isdigit() else match_id for match_id in match_ids]
+    print(refresh_summaries(engine, match_ids=match_ids, full=args.full))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+from sqlalchemy import text
+
+
+class SummaryView:
+    """A pre-aggregated relation over ipl_balls that generated SQL can be answered from.
+
+    `dimensions` maps each output column to the ipl_balls expression it groups
+    by, `measures` maps each additive output column to the aggregate it stores,
+    and `filters` are WHERE conjuncts applied when the view is built. `derived`
+    columns are convenience ratios for direct SELECT * use; they are not used
+    when rewriting queries because ratios cannot be re-aggregated.
+    `predicate_map` translates ipl_balls predicates into equivalent predicates
+    on dimension columns (e.g. "over" >= 16 becomes "phase" = 3).
+
+    `kind` is 'materialized_view', or 'table' for rollups that are kept up to
+    date incrementally by match (see summary_maintenance.py). A materialized
+    view with `rollup_of` set is computed from that rollup table instead of
+    ipl_balls, so refreshing it only reads the rollup.
+    """
+
+    def __init__(self, name, dimensions, measures, filters=(), derived=None,
+                 measure_aliases=None, order_by=None, predicate_map=None,
+                 kind='materialized_view', rollup_of=None):
+        self.name = name
+        self.dimensions = dimensions
+        self.measures = measures
+        self.filters = list(filters)
+        self.derived = derived or {}
+        self.measure_aliases = measure_aliases or {}
+        self.order_by = order_by
+        self.predicate_map = predicate_map or {}
+        self.kind = kind
+        self.rollup_of = rollup_of
+
+    def select_sql(self) -> str:
+        """The aggregate query that defines this view over ipl_balls"""
+        columns = [f'{expr} AS "{name}"' for name, expr in self.dimensions.items()]
+        columns += [f'{expr} AS "{name}"' for name, expr in self.measures.items()]
+        columns += [f'{expr} AS "{name}"' for name, expr in self.derived.items()]
+        sql = "SELECT " + ",\n       ".join(columns) + "\nFROM ipl_balls"
+        if self.filters:
+            sql += "\nWHERE " + " AND ".join(self.filters)
+        sql += "\nGROUP BY " + ", ".join(self.dimensions.values())
+        return sql
+
+    def definition_sql(self) -> str:
+        """select_sql, rewritten onto the rollup table when the view is built from one"""
+        if not self.rollup_of:
+            return self.select_sql()
+        from view_rewriter import rewrite_query
+
+        rollup = next(view for view in SUMMARY_VIEWS if view.name == self.rollup_of)
+        sql, view_name = rewrite_query(self.select_sql(), [rollup])
+        if view_name is None:
+            raise ValueError(f"{self.name} cannot be computed from {self.rollup_of}")
+        return sql
+
+    @property
+    def count_measure(self) -> str:
+        """The COUNT(*) measure; a rollup row whose count drops to zero is deleted"""
+        return next(name for name, expr in self.measures.items() if expr == 'COUNT(*)')
+
+    def create_sql(self) -> str:
+        if self.kind == 'table':
+            return f"CREATE TABLE IF NOT EXISTS {self.name} AS\n{self.select_sql()}\nWITH NO DATA"
+        return f"CREATE MATERIALIZED VIEW IF NOT EXISTS {self.name} AS\n{self.definition_sql()}"
+
+    def unique_index_sql(self) -> str:
+        columns = ", ".join(f'"{name}"' for name in self.dimensions)
+        # Rollup upserts use ON CONFLICT on the dimensions, which may be NULL (Postgres 15+)
+        nulls = " NULLS NOT DISTINCT" if self.kind == 'table' else ""
+        return f"CREATE UNIQUE INDEX IF NOT EXISTS {self.name}_key ON {self.name} ({columns}){nulls}"
+
+    def rebuild_sql(self) -> list:
+        """Statements that recompute a rollup table from ipl_balls.
+
+        DELETE rather than TRUNCATE or a table swap, so readers keep seeing the
+        old rows until commit and views built on the table stay valid.
+        """
+        columns = ", ".join(f'"{name}"' for name in list(self.dimensions) + list(self.measures))
+        return [
+            f"DELETE FROM {self.name}",
+            f"INSERT INTO {self.name} ({columns})\n{self.select_sql()}",
+            f"ANALYZE {self.name}",
+        ]
+
+    def delta_sql(self, sign: int) -> list:
+        """Statements that add (sign=1) or subtract (sign=-1) the rows of :match_ids"""
+        keys = ", ".join(f'"{name}"' for name in self.dimensions)
+        columns = ", ".join(f'"{name}"' for name in list(self.dimensions) + list(self.measures))
+        select = [f'{expr} AS "{name}"' for name, expr in self.dimensions.items()]
+        select += [f'{sign} * {expr} AS "{name}"' for name, expr in self.measures.items()]
+        where = ['"match_id" = ANY(:match_ids)'] + self.filters
+        updates = ", ".join(f'"{name}" = {self.name}."{name}" + EXCLUDED."{name}"' for name in self.measures)
+        return [
+            f"INSERT INTO {self.name} ({columns})\n"
+            f"SELECT " + ",\n       ".join(select) + "\nFROM ipl_balls"
+            f"\nWHERE {' AND '.join(where)}"
+            f"\nGROUP BY {', '.join(self.dimensions.values())}"
+            f"\nON CONFLICT ({keys}) DO UPDATE SET {updates}",
+            f'DELETE FROM {self.name} WHERE "{self.count_measure}" = 0',
+        ]
+
+
+WICKET_COUNT = 'COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END)'
+WICKET_ALIASES = [
+    'COUNT(CASE WHEN "isWicket" THEN 1 END)',
+    'SUM(CASE WHEN "isWicket" = TRUE THEN 1 ELSE 0 END)',
+    'SUM(CASE WHEN "isWicket" THEN 1 ELSE 0 END)',
+]
+
+BATTING_MEASURES = {
+    'balls_faced': 'COUNT(*)',
+    'total_runs': 'SUM("runs_batter")',
+    'fours': 'SUM("isFour"::int)',
+    'sixes': 'SUM("isSix"::int)',
+    'times_out': WICKET_COUNT,
+}
+
+BATTING_DERIVED = {
+    'strike_rate': 'ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2)',
+    'batting_average': f'ROUND(SUM("runs_batter")::numeric / NULLIF({WICKET_COUNT}, 0), 2)',
+}
+
+BOWLING_MEASURES = {
+    'balls_bowled': 'COUNT(*)',
+    'runs_conceded': 'SUM("runs_total")',
+    'wickets': WICKET_COUNT,
+}
+
+BOWLING_DERIVED = {
+    'bowling_avg': f'ROUND(SUM("runs_total")::numeric / NULLIF({WICKET_COUNT}, 0), 2)',
+    'economy_rate': 'ROUND((SUM("runs_total")::numeric / NULLIF(COUNT(*), 0)) * 6, 2)',
+}
+
+PACE_STYLES = ('rm', 'rfm', 'rmf', 'lf', 'lfm', 'lmf')
+SPIN_STYLES = ('ob', 'lb', 'sla', 'lbg', 'lws')
+
+# Pattern-based pace predicate the "bowl_kind" column is generated from; still mapped onto the cube
+# for generated SQL that spells it out
+PACE_PREDICATE = (
+    """("bowling_style" LIKE '%rm%' OR "bowling_style" LIKE '%rf%' """
+    """OR "bowling_style" IN ('rm','rfm','rmf','lf','lfm','lmf'))"""
+)
+
+PHASE_EXPRESSION = 'CASE WHEN "over" <= 6 THEN 1 WHEN "over" <= 15 THEN 2 ELSE 3 END'
+BOWL_KIND_EXPRESSION = (
+    f"CASE WHEN {PACE_PREDICATE} THEN 'pace' "
+    """WHEN "bowling_style" IS NULL OR "bowling_style" = '' THEN 'unknown' ELSE 'spin' END"""
+)
+
+# Each range predicate on "over" is exactly equivalent to one on the phase number
+PHASE_PREDICATES = {
+    '"over" <= 6': '"phase" = 1',
+    '"over" >= 7': '"phase" >= 2',
+    '"over" <= 15': '"phase" <= 2',
+    '"over" >= 16': '"phase" = 3',
+}
+
+CUBE_DIMENSIONS = {
+    'year': '"year"',
+    # Generated columns on ipl_balls holding PHASE_EXPRESSION and BOWL_KIND_EXPRESSION (see derived_columns.py)
+    'phase': '"phase"',
+    'bowl_kind': '"bowl_kind"',
+    'bat_hand': '"bat_hand"',
+}
+
+CUBE_PREDICATES = dict(PHASE_PREDICATES, **{
+    PACE_PREDICATE: '"bowl_kind" = \'pace\'',
+})
+
+# Registered views, smallest first: the rewriter picks the first one that covers a query
+SUMMARY_VIEWS = [
+    SummaryView(
+        'mv_death_overs_batters',
+        dimensions={'batter': '"batter"'},
+        measures={'death_balls': 'COUNT(*)', 'death_runs': 'SUM("runs_batter")',
+                  'fours': 'SUM("isFour"::int)', 'sixes': 'SUM("isSix"::int)', 'times_out': WICKET_COUNT},
+        filters=['"phase" = 3'],
+        derived={'death_sr': 'ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2)'},
+        measure_aliases={alias: 'times_out' for alias in WICKET_ALIASES},
+        order_by='death_runs',
+        rollup_of='cube_batting',
+    ),
+    SummaryView(
+        'mv_top_run_scorers',
+        dimensions={'batter': '"batter"'},
+        measures=BATTING_MEASURES,
+        derived=BATTING_DERIVED,
+        measure_aliases={alias: 'times_out' for alias in WICKET_ALIASES},
+        order_by='total_runs',
+        rollup_of='cube_batting',
+    ),
+    SummaryView(
+        'mv_top_bowlers',
+        dimensions={'bowler': '"bowler"'},
+        measures=BOWLING_MEASURES,
+        derived=BOWLING_DERIVED,
+        measure_aliases={alias: 'wickets' for alias in WICKET_ALIASES},
+        order_by='wickets',
+        rollup_of='cube_bowling',
+    ),
+    # Rollups at player x season x phase x pace/spin x batting hand grain, maintained per match
+    SummaryView(
+        'cube_batting',
+        dimensions=dict({'batter': '"batter"'}, **CUBE_DIMENSIONS),
+        measures={'balls': 'COUNT(*)', 'runs': 'SUM("runs_batter")', 'fours': 'SUM("isFour"::int)',
+                  'sixes': 'SUM("isSix"::int)', 'dismissals': WICKET_COUNT},
+        measure_aliases={alias: 'dismissals' for alias in WICKET_ALIASES},
+        predicate_map=CUBE_PREDICATES,
+        kind='table',
+    ),
+    SummaryView(
+        'cube_bowling',
+        dimensions=dict({'bowler': '"bowler"'}, **CUBE_DIMENSIONS),
+        measures={'balls': 'COUNT(*)', 'runs_conceded': 'SUM("runs_total")', 'wickets': WICKET_COUNT,
+                  'fours': 'SUM("isFour"::int)', 'sixes': 'SUM("isSix"::int)'},
+        measure_aliases={alias: 'wickets' for alias in WICKET_ALIASES},
+        predicate_map=CUBE_PREDICATES,
+        kind='table',
+    ),
+]
+
+CUBE_PROMPT_SECTION = """
+PRE-AGGREGATED CUBES (prefer these over ipl_balls; they hold thousands of rows instead of every ball):
+- cube_batting: "batter", "year", "phase", "bowl_kind", "bat_hand" | "balls", "runs", "fours", "sixes", "dismissals"
+- cube_bowling: "bowler", "year", "phase", "bowl_kind", "bat_hand" | "balls", "runs_conceded", "wickets", "fours", "sixes"
+- "phase": 1 = powerplay (overs 1-6), 2 = middle (7-15), 3 = death (16-20)
+- "bowl_kind": 'pace', 'spin' or 'unknown'; "bat_hand" is the batter's hand
+- Always aggregate with SUM over the cube, e.g. strike rate = SUM("runs")::numeric / NULLIF(SUM("balls"), 0) * 100
+Example - best batters vs pace in death overs:
+SELECT "batter", SUM("balls") AS balls_faced, SUM("runs") AS total_runs,
+       ROUND(SUM("runs")::numeric / NULLIF(SUM("balls"), 0) * 100, 2) AS strike_rate
+FROM cube_batting WHERE "phase" = 3 AND "bowl_kind" = 'pace' AND "batter" != ''
+GROUP BY "batter" HAVING SUM("balls") >= 30 ORDER BY total_runs DESC LIMIT 10;
+"""
+
+
+def ensure_summary_views(engine, views=None) -> list:
+    """Create any missing registered views and rollup tables; returns the names created.
+
+    Rollup tables are created empty (summary_maintenance.py populates them) and
+    before the views computed from them. A view still defined over ipl_balls is
+    recreated over its rollup table.
+    """
+    views = sorted(views or SUMMARY_VIEWS, key=lambda view: view.kind != 'table')
+    created = []
+    with engine.begin() as conn:
+        present = {view.name for view in existing_summary_views(conn, views)}
+        for view in views:
+            if view.kind != 'table' and view.rollup_of and view.name in present:
+                definition = conn.execute(text(
+                    "SELECT definition FROM pg_matviews WHERE matviewname = :name"
+                ), {'name': view.name}).scalar() or ''
+                if view.rollup_of not in definition:
+                    conn.execute(text(f"DROP MATERIALIZED VIEW {view.name}"))
+                    present.discard(view.name)
+            if view.name not in present:
+                conn.execute(text(view.create_sql()))
+                created.append(view.name)
+            conn.execute(text(view.unique_index_sql()))
+    if created:
+        print(f"✅ Created summary relations: {', '.join(created)}")
+    return created
+
+
+def existing_summary_views(conn, views=None) -> list:
+    """Registered views and rollup tables that actually exist in the database"""
+    candidates = views or SUMMARY_VIEWS
+    names = {row[0] for row in conn.execute(text("""
+        SELECT relname FROM pg_class
+        WHERE relkind IN ('m', 'r', 'p') AND relname = ANY(:names) AND pg_table_is_visible(oid)
+    """), {'names': [view.name for view in candidates]}).fetchall()}
+    return [view for view in candidates if view.name in names]
+
+
+def refresh_summary_views(conn, views=None, concurrently: bool = True):
+    """Recompute the registered materialized views; rollup tables are maintained separately.
+
+    CONCURRENTLY (which needs the unique index every view gets) lets queries keep
+    reading the old contents during the refresh instead of waiting on an
+    exclusive lock. A view that has never been populated is refreshed plainly.
+    """
+    for view in existing_summary_views(conn, views):
+        if view.kind == 'table':
+            continue
+        populated = conn.execute(text(
+            "SELECT ispopulated FROM pg_matviews WHERE matviewname = :name"
+        ), {'name': view.name}).scalar()
+        mode = " CONCURRENTLY" if concurrently and populated else ""
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW{mode} {view.name}"))
@@ -0,0 +1,61 @@
+import answer_cache
+from answer_cache import AnswerCache, normalize_question
+
+
+def test_normalize_question_folds_case_punctuation_and_spaces():
+    assert normalize_question("  Who scored  the MOST runs?! ") == "who scored the most runs"
+    assert normalize_question(None) == ""
+
+
+def test_trivially_different_phrasings_share_an_entry():
+    cache = AnswerCache()
+    cache.put("Most sixes in 2023?", "answer")
+    assert cache.get("most   sixes in 2023") == "answer"
+
+
+def test_data_version_is_part_of_the_key():
+    cache = AnswerCache()
+    cache.put("most sixes", "old", data_version=1)
+    assert cache.get("most sixes", data_version=2) is None
+    assert cache.get("most sixes", data_version=1) == "old"
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, 'monotonic', lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60)
+    cache.put("most sixes", "answer")
+    now[0] += 59
+    assert cache.get("most sixes") == "answer"
+    now[0] += 2
+    assert cache.get("most sixes") is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = AnswerCache(max_entries=0)
+    cache.put("a", "1")
+    assert cache.get("a") is None
+
+
+def test_stats_and_clear():
+    cache = AnswerCache()
+    cache.put("a", "1")
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hit_rate'] == 0.5
+    cache.clear()
+    assert cache.get("a") is None
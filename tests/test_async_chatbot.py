@@ -0,0 +1,52 @@
+import asyncio
+
+from async_chatbot import AsyncIPLStatsChatbot
+
+
+def chatbot():
+    """A chatbot whose answers count calls instead of hitting the LLM or the database"""
+    bot = object.__new__(AsyncIPLStatsChatbot)
+    bot._in_flight = {}
+    bot.calls = []
+
+    async def answer(question):
+        bot.calls.append(question)
+        await asyncio.sleep(0.05)
+        return f"answer to {question}"
+
+    bot._answer_async = answer
+    return bot
+
+
+def test_identical_questions_share_one_answer():
+    bot = chatbot()
+
+    async def ask_all():
+        return await asyncio.gather(bot.ask_async("Top run scorers?"), bot.ask_async("top run  scorers"),
+                                    bot.ask_async("Most sixes"))
+
+    answers = asyncio.run(ask_all())
+    assert answers == ["answer to Top run scorers?"] * 2 + ["answer to Most sixes"]
+    assert bot.calls == ["Top run scorers?", "Most sixes"]
+    assert bot._in_flight == {}
+
+
+def test_finished_questions_are_answered_again():
+    bot = chatbot()
+    asyncio.run(bot.ask_async("Most sixes"))
+    asyncio.run(bot.ask_async("Most sixes"))
+    assert bot.calls == ["Most sixes", "Most sixes"]
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    bot = chatbot()
+
+    async def ask_and_cancel_one():
+        first = asyncio.ensure_future(bot.ask_async("Most sixes"))
+        second = asyncio.ensure_future(bot.ask_async("Most sixes"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(ask_and_cancel_one()) == ("answer to Most sixes", True)
+    assert bot.calls == ["Most sixes"]
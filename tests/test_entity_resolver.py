@@ -0,0 +1,62 @@
+import random
+import string
+
+import pytest
+
+from entity_resolver import FUZZY_LONG_WORD, EntityResolver, edit_distance
+
+NAMES = {
+    'player': ['V Kohli', 'JJ Bumrah', 'Rashid Khan', 'RG Sharma', 'MS Dhoni', 'AB de Villiers', 'YS Chahal',
+               'DA Warner', 'SP Narine', 'Shubman Gill', 'Mohammed Siraj', 'Mohammed Shami'],
+    'team': ['Mumbai Indians', 'Chennai Super Kings', 'Sunrisers Hyderabad'],
+    'venue': ['Wankhede Stadium, Mumbai', 'Eden Gardens, Kolkata', 'MA Chidambaram Stadium, Chepauk, Chennai'],
+}
+
+
+@pytest.fixture(scope='module')
+def resolver():
+    return EntityResolver(NAMES)
+
+
+@pytest.mark.parametrize('question, kind, name', [
+    ("Bumra economy in death overs", 'player', 'JJ Bumrah'),
+    ("Most sixes at Wankede", 'venue', 'Wankhede Stadium, Mumbai'),
+    ("Sharam strike rate", 'player', 'RG Sharma'),
+    ("Warnr in the powerplay", 'player', 'DA Warner'),
+    ("Chidambram stadium totals", 'venue', 'MA Chidambaram Stadium, Chepauk, Chennai'),
+])
+def test_typos_resolve(resolver, question, kind, name):
+    match = resolver.tag(question)[0]
+    assert match.fuzzy
+    assert (match.kind, match.names) == (kind, [name])
+
+
+def test_words_too_far_from_any_key_match_nothing(resolver):
+    assert resolver.tag("Bxmxah economy") == []
+
+
+def brute_force(resolver, word):
+    """Closest key by scanning every single-word key"""
+    limit = 2 if len(word) >= FUZZY_LONG_WORD else 1
+    ranked = sorted((edit_distance(word, key, limit), len(key), key) for key in resolver._fuzzy_keys)
+    return resolver._fuzzy_keys[ranked[0][2]] if ranked and ranked[0][0] <= limit else None
+
+
+def test_deletion_index_agrees_with_a_full_scan(resolver):
+    generator = random.Random(7)
+    keys = sorted(resolver._fuzzy_keys)
+    for _ in range(500):
+        word = list(generator.choice(keys))
+        for _ in range(generator.randint(1, 3)):
+            position = generator.randrange(len(word))
+            edit = generator.choice(('delete', 'insert', 'replace', 'swap'))
+            if edit == 'delete' and len(word) > 5:
+                del word[position]
+            elif edit == 'insert':
+                word.insert(position, generator.choice(string.ascii_lowercase))
+            elif edit == 'swap' and position + 1 < len(word):
+                word[position], word[position + 1] = word[position + 1], word[position]
+            else:
+                word[position] = generator.choice(string.ascii_lowercase)
+        word = "".join(word)
+        assert resolver._fuzzy(word) is brute_force(resolver, word), word
@@ -0,0 +1,48 @@
+from example_store import CURATED_EXAMPLES, ExampleStore, terms
+
+
+def test_terms_drop_stopwords_and_fold_synonyms():
+    assert terms("Who are the best batsmen against seamers in IPL history?") == ['best', 'batters', 'vs', 'pace']
+
+
+def test_curated_examples_are_loaded():
+    assert ExampleStore().stats()['curated'] == len(CURATED_EXAMPLES)
+
+
+def test_most_similar_question_ranks_first():
+    store = ExampleStore()
+    question, _ = store.search("Most economical spinners in the powerplay", k=1)[0]
+    assert question == "Most economical bowlers in the powerplay in 2023"
+    question, _ = store.search("Which team won the most matches", k=1)[0]
+    assert question == "Which team has won the most matches"
+
+
+def test_pairs_sharing_sql_are_returned_once():
+    store = ExampleStore(curated=[])
+    store.add("Most sixes", "SELECT 1")
+    store.add("Most sixes hit", "SELECT  1")
+    store.add("Most sixes conceded", "SELECT 2")
+    assert [sql for _, sql in store.search("most sixes", k=3)] == ["SELECT 1", "SELECT 2"]
+
+
+def test_learned_examples_are_evicted_before_curated_ones():
+    store = ExampleStore(max_entries=2, curated=[("Top run scorers", "SELECT 1")])
+    store.add("Most sixes", "SELECT 2")
+    store.add("Most wickets", "SELECT 3")
+    assert store.stats()['entries'] == 2
+    assert store.search("sixes") == []
+    assert store.search("top run scorers") == [("Top run scorers", "SELECT 1")]
+
+
+def test_remove_sql_keeps_curated_examples():
+    store = ExampleStore(curated=[("Top run scorers", "SELECT 1")])
+    store.add("Best run scorers", "SELECT 1")
+    store.add("Most sixes", "SELECT 2")
+    store.remove_sql("SELECT 1")
+    store.remove_sql("SELECT 2")
+    assert store.stats()['entries'] == 1
+    assert store.search("run scorers") == [("Top run scorers", "SELECT 1")]
+
+
+def test_questions_with_only_stopwords_match_nothing():
+    assert ExampleStore().search("who is the") == []
@@ -0,0 +1,116 @@
+import pytest
+
+from entity_resolver import EntityResolver
+from intent_engine import IntentEngine
+
+NAMES = {
+    'player': ['V Kohli', 'JJ Bumrah', 'Rashid Khan', 'RG Sharma', 'MS Dhoni', 'AD Russell', 'SP Narine'],
+    'team': ['Royal Challengers Bangalore', 'Royal Challengers Bengaluru', 'Mumbai Indians',
+             'Chennai Super Kings'],
+    'venue': ['Wankhede Stadium, Mumbai', 'Eden Gardens, Kolkata'],
+}
+
+
+class StubCatalog:
+    """EntityCatalog stand-in over a fixed name list"""
+
+    def __init__(self, names):
+        self.resolver = EntityResolver(names)
+
+    def tag(self, question):
+        return self.resolver.tag(question)
+
+
+@pytest.fixture
+def engine():
+    return IntentEngine(StubCatalog(NAMES))
+
+
+@pytest.mark.parametrize('question', [
+    "Who are the top 5 run scorers in 2016?",
+    "Most economical spinners in the death overs",
+    "Kohli's strike rate against pace",
+    "Top wicket takers since 2020",
+    "Most sixes for RCB at Wankhede Stadium",
+    "Best batters vs pace bowling in death overs",
+    "Top 100 run scorers",
+])
+def test_recognized_questions_match(engine, question):
+    assert engine.match(question) is not None
+
+
+@pytest.mark.parametrize('question', [
+    # The subject is a team or venue, not a player
+    "Which team has scored the most runs in 2016?",
+    "Which venue has the most sixes?",
+    # Negations and exclusions
+    "Top run-scorers not including Kohli",
+    "Top run scorers except 2020",
+    "Most wickets excluding Bumrah",
+    # Filters no slot captures
+    "Top strike rates with minimum 500 balls",
+    "Most runs in the 20th over",
+    "Top run scorers among openers",
+    "Most wickets by Indian bowlers",
+    "Most runs batting first",
+    # Lowest totals are not a meaningful ranking
+    "Lowest run scorers",
+    "Top 500 run scorers",
+])
+def test_partially_understood_questions_go_to_the_llm(engine, question):
+    assert engine.match(question) is None
+
+
+def test_lowest_strike_rate_sorts_ascending(engine):
+    intent = engine.match("Lowest strike rate batters in death overs")
+    assert "ORDER BY strike_rate ASC" in intent.sql
+    assert intent.params['phase'] == 3
+
+
+def test_highest_economy_sorts_descending(engine):
+    intent = engine.match("Highest economy bowlers")
+    assert "ORDER BY economy_rate DESC" in intent.sql
+
+
+def test_expensive_bowlers_rank_by_economy(engine):
+    intent = engine.match("Most expensive bowlers")
+    assert intent.slots['metric'] == 'economy'
+    assert "ORDER BY economy_rate DESC" in intent.sql
+
+
+def test_economical_bowlers_sort_ascending(engine):
+    assert "ORDER BY economy_rate ASC" in engine.match("Most economical bowlers").sql
+
+
+def test_player_after_off_is_the_bowler_faced(engine):
+    intent = engine.match("Who has hit the most sixes off Rashid Khan?")
+    assert '"bowler" = :facing' in intent.sql
+    assert ':player' not in intent.sql
+    assert intent.params['facing'] == 'Rashid Khan'
+    assert intent.sql.startswith('SELECT "batter"')
+
+
+def test_player_after_against_is_the_bowler_faced(engine):
+    intent = engine.match("Top batters against Bumrah")
+    assert '"bowler" = :facing' in intent.sql
+    assert intent.params['facing'] == 'JJ Bumrah'
+
+
+def test_player_totals_bind_the_player(engine):
+    intent = engine.match("Kohli's strike rate against pace")
+    assert intent.params['player'] == 'V Kohli'
+    assert intent.params['bowl_kind'] == 'pace'
+    assert 'LIMIT' not in intent.sql
+
+
+def test_limit_and_year(engine):
+    intent = engine.match("Top 100 run scorers since 2020")
+    assert intent.params['limit'] == 100
+    assert intent.params['year'] == 2020
+    assert '"year" >= :year' in intent.sql
+
+
+def test_team_after_against_is_the_opponent(engine):
+    intent = engine.match("Most runs against Mumbai Indians")
+    assert intent.params['opponents'] == ['Mumbai Indians']
+    assert '"bowling_team" = ANY(:opponents)' in intent.sql
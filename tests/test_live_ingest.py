@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from live_ingest import LiveIngest, LiveStats
+
+
+def ball(**fields):
+    return dict({'match_id': 1, 'batting_team': 'Mumbai Indians', 'bowling_team': 'Chennai Super Kings',
+                 'batter': 'RG Sharma', 'bowler': 'DL Chahar', 'runs_batter': 0, 'runs_total': 0,
+                 'isWicket': False}, **fields)
+
+
+def bowling(stats):
+    return stats.matches[1]['bowlers']['DL Chahar']
+
+
+def test_run_out_is_not_a_bowler_wicket():
+    stats = LiveStats()
+    stats.add_ball(ball(isWicket=True, dismissal_kind='run out'))
+    stats.add_ball(ball(isWicket=True, dismissal_kind='caught'))
+    assert bowling(stats)['wickets'] == 1
+    assert stats.matches[1]['teams']['Mumbai Indians']['wickets'] == 2
+
+
+def test_byes_and_leg_byes_are_not_runs_conceded():
+    stats = LiveStats()
+    stats.add_ball(ball(runs_total=4, extras_type='legbyes'))
+    stats.add_ball(ball(runs_total=1, extras_type='byes', runs_extras=1))
+    stats.add_ball(ball(runs_total=2, extras_type='wides'))
+    stats.add_ball(ball(runs_batter=6, runs_total=6))
+    assert bowling(stats)['runs'] == 8
+    assert stats.matches[1]['teams']['Mumbai Indians']['runs'] == 13
+
+
+class FailingEngine:
+    def connect(self):
+        raise OSError('database unavailable')
+
+    def begin(self):
+        raise OSError('database unavailable')
+
+
+def test_failed_inserts_are_bounded_by_dead_letter(tmp_path):
+    dead_letter = tmp_path / 'dead.jsonl'
+    ingest = LiveIngest('feed.jsonl', engine=FailingEngine(), max_pending=3, dead_letter=str(dead_letter))
+    ingest._pending = [ball(ball_no=n) for n in range(5)]
+    assert not ingest.try_flush()
+    assert [b['ball_no'] for b in ingest._pending] == [2, 3, 4]
+    assert [json.loads(line)['ball_no'] for line in dead_letter.read_text().splitlines()] == [0, 1]
+
+
+def test_finish_match_survives_a_failed_flush(monkeypatch):
+    import summary_maintenance
+
+    refreshed = []
+    monkeypatch.setattr(summary_maintenance, 'refresh_summaries',
+                        lambda engine, match_ids=None: refreshed.append(match_ids))
+
+    class BookkeepingEngine(FailingEngine):
+        statements = []
+
+        def begin(self):
+            engine = self
+
+            class Transaction:
+                def __enter__(self):
+                    return self
+
+                def __exit__(self, *exc):
+                    return False
+
+                def execute(self, statement, params=None):
+                    engine.statements.append(str(statement))
+
+            return Transaction()
+
+    engine = BookkeepingEngine()
+    ingest = LiveIngest('feed.jsonl', engine=engine)
+    ingest._pending = [ball()]
+    ingest.finish_match(1)
+    assert any('DELETE FROM live_matches' in statement for statement in engine.statements)
+    assert refreshed == [[1]]
+    assert ingest._finished_unflushed == {1}
+    assert len(ingest._pending) == 1
+
+
+@pytest.fixture
+def live_stats():
+    stats = LiveStats()
+    stats.add_ball(ball(batter='V Kohli', bowler='JJ Bumrah', batting_team='Royal Challengers Bengaluru',
+                        bowling_team='Mumbai Indians', runs_batter=4, runs_total=4, isFour=True))
+    stats.add_ball(ball(batter='V Kohli', bowler='JJ Bumrah', batting_team='Royal Challengers Bengaluru',
+                        bowling_team='Mumbai Indians', runs_batter=1, runs_total=1))
+    return stats
+
+
+@pytest.mark.parametrize('question, expected', [
+    ("How is Kohli doing today?", "**V Kohli**"),
+    ("How has Bumrah bowled so far?", "**JJ Bumrah**"),
+    ("Live score", "**Royal Challengers Bengaluru**: 5/0"),
+    ("What's the score right now?", "**Royal Challengers Bengaluru**: 5/0"),
+])
+def test_live_questions_are_answered_from_memory(live_stats, question, expected):
+    assert expected in live_stats.answer(question)
+
+
+@pytest.mark.parametrize('question', [
+    "How many deliveries has Bumrah bowled in IPL history?",
+    "How many deliveries has Bumrah bowled?",
+    "Top run scorers in 2024 so far",
+    "Top run scorers",
+    "Which bowler delivered the most dot balls?",
+    "Kohli's career strike rate so far",
+    "Who has the most runs so far?",
+])
+def test_historical_questions_are_not_live(live_stats, question):
+    assert live_stats.answer(question) is None
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+from prompt_builder import SECTIONS, PromptBuilder, detect_topics
+
+
+@pytest.mark.parametrize('question, topics', [
+    ("Top run scorers", {'batting'}),
+    ("Best economy in death overs vs spin", {'bowling', 'phase', 'style'}),
+    ("Left-handed batters strike rate", {'batting', 'hand'}),
+    ("Which team won the most matches", {'results'}),
+])
+def test_detect_topics(question, topics):
+    assert detect_topics(question) == topics
+
+
+def test_system_prompt_is_reused_until_the_summary_changes():
+    builder = PromptBuilder()
+    first = builder.system_prompt("1000 balls")
+    assert builder.system_prompt("1000 balls") is first
+    assert "2000 balls" in builder.system_prompt("2000 balls")
+
+
+def test_user_prompt_only_includes_relevant_sections():
+    builder = PromptBuilder()
+    system, user = builder.messages("Top run scorers", "summary", cubes="CUBES: cube_batting")
+    assert system['role'] == 'system' and user['role'] == 'user'
+    assert SECTIONS['batting'] in user['content']
+    assert SECTIONS['bowling'] not in user['content']
+    assert "CUBES: cube_batting" in user['content']
+    assert user['content'].endswith("Question: Top run scorers")
+
+
+def test_cubes_are_left_out_for_results_questions():
+    builder = PromptBuilder()
+    _, user = builder.messages("Which team won the most matches by runs", "summary", cubes="CUBES")
+    assert "CUBES" not in user['content']
+
+
+def test_examples_and_entity_hint_are_included():
+    builder = PromptBuilder()
+    _, user = builder.messages("Kohli runs", "summary", entity_hint="NAMES: V Kohli",
+                               examples=[("Top run scorers", "SELECT 1")])
+    assert "-- Top run scorers\nSELECT 1;" in user['content']
+    assert "NAMES: V Kohli" in user['content']
+
+
+def test_usage_is_taken_from_the_response():
+    builder = PromptBuilder()
+    usage = SimpleNamespace(prompt_tokens=500, completion_tokens=40,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=300))
+    recorded = builder.record_usage([], SimpleNamespace(usage=usage))
+    assert recorded == {'prompt_tokens': 500, 'completion_tokens': 40, 'cached_tokens': 300, 'estimated': False}
+
+
+def test_usage_is_estimated_when_missing():
+    builder = PromptBuilder()
+    messages = [{'role': 'user', 'content': 'x' * 400}]
+    recorded = builder.record_usage(messages, None, completion='y' * 40)
+    assert recorded == {'prompt_tokens': 100, 'completion_tokens': 10, 'cached_tokens': 0, 'estimated': True}
+    assert builder.stats()['estimated_requests'] == 1
+    assert builder.stats()['avg_prompt_tokens'] == 100.0
@@ -0,0 +1,29 @@
+from query_guard import plan_violations
+
+SCAN = {'Node Type': 'Seq Scan', 'Relation Name': 'ipl_balls', 'Plan Rows': 260000, 'Total Cost': 9000}
+
+
+def plan(node_type, rows, child=SCAN):
+    return {'Node Type': node_type, 'Plan Rows': rows, 'Total Cost': 10000, 'Plans': [child]}
+
+
+def test_unfiltered_scan_with_unbounded_output_is_rejected():
+    assert plan_violations(dict(SCAN, **{'Plan Rows': 60000}), 1e6, 1e5, row_cap=1000)
+
+
+def test_single_row_aggregate_is_bounded():
+    # SELECT COUNT(DISTINCT "match_id") FROM ipl_balls
+    assert plan_violations(plan('Aggregate', 1), 1e6, 1e5, row_cap=1000) == []
+
+
+def test_small_group_by_is_bounded():
+    # ... GROUP BY "year" ORDER BY "year": a Sort of 17 rows over a hash aggregate
+    assert plan_violations(plan('Sort', 17, plan('Aggregate', 17)), 1e6, 1e5, row_cap=1000) == []
+
+
+def test_limit_is_bounded():
+    assert plan_violations(plan('Limit', 10), 1e6, 1e5, row_cap=1000) == []
+
+
+def test_cost_over_limit_is_rejected():
+    assert plan_violations(plan('Aggregate', 1), 5000, 1e5, row_cap=1000)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from semantic_cache import HashedNgramVectorizer, LSHIndex, SemanticQueryCache, canonical_question, question_slots
+
+SQL = 'SELECT "batter" FROM ipl_balls WHERE "phase" = 3 AND "bowl_kind" = \'pace\''
+
+
+@pytest.fixture
+def cache():
+    return SemanticQueryCache(embedder=HashedNgramVectorizer())
+
+
+def test_canonical_question_folds_synonyms():
+    assert canonical_question("Best batsmen against seamers?") == "best batters vs pace"
+
+
+def test_slots_separate_questions_that_need_different_sql():
+    assert question_slots("best batters vs spin") != question_slots("best batters vs pace")
+    assert question_slots("best economy in 2023") != question_slots("worst economy in 2023")
+    assert question_slots("most sixes in 2022") != question_slots("most sixes in 2023")
+    assert question_slots("best batsmen against seamers") == question_slots("best batters vs pace")
+
+
+def test_paraphrase_hits(cache):
+    cache.add("Best batters in death overs vs pace", SQL)
+    sql, similarity, matched = cache.lookup("best batsmen in the death overs against seamers")
+    assert sql == SQL
+    assert similarity >= cache.threshold
+    assert matched == "Best batters in death overs vs pace"
+
+
+@pytest.mark.parametrize('question', [
+    "Best batters in death overs vs spin",
+    "Worst batters in death overs vs pace",
+    "Best batters in powerplay overs vs pace",
+    "Top wicket takers",
+])
+def test_near_misses_do_not_hit(cache, question):
+    cache.add("Best batters in death overs vs pace", SQL)
+    assert cache.lookup(question) is None
+
+
+def test_tagged_entities_must_match(cache):
+    class Match:
+        def __init__(self, name):
+            self.kind, self.names = 'venue', [name]
+
+    def tagger(question):
+        return [Match(name) for name in ('Wankhede', 'Eden Gardens') if name.lower() in question.lower()]
+
+    cache.tagger = tagger
+    cache.add("Most sixes at Wankhede", "SELECT 1")
+    assert cache.lookup("Most sixes at Eden Gardens") is None
+    assert cache.lookup("most sixes at wankhede?")[0] == "SELECT 1"
+
+
+def test_evict_sql_removes_every_question_using_it(cache):
+    cache.add("Best batters in death overs vs pace", SQL)
+    cache.add("Top death over batters against pace", SQL)
+    cache.evict_sql(SQL)
+    assert cache.stats()['entries'] == 0
+    assert cache.lookup("Best batters in death overs vs pace") is None
+
+
+def test_oldest_entry_is_dropped_when_full():
+    cache = SemanticQueryCache(embedder=HashedNgramVectorizer(), max_entries=2)
+    for question in ("most sixes", "most fours", "most wickets"):
+        cache.add(question, question)
+    assert cache.stats()['entries'] == 2
+    assert cache.lookup("most sixes") is None
+
+
+def test_lsh_index_returns_nearest_by_cosine():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = LSHIndex(32)
+    for i, vector in enumerate(vectors):
+        index.add(i, vector)
+    item_id, similarity = index.query(vectors[7])[0]
+    assert item_id == 7
+    assert similarity == pytest.approx(1.0)
+    index.remove(7)
+    assert len(index) == 49
+    assert all(item_id != 7 for item_id, _ in index.query(vectors[7], k=5))
@@ -0,0 +1,52 @@
+import pytest
+
+from sql_cache import SQLQueryCache
+
+SQL = 'SELECT "batter", SUM("runs_batter") FROM ipl_balls GROUP BY "batter"'
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'sql_cache.db')
+
+
+def test_hit_after_put_with_normalized_question(path):
+    cache = SQLQueryCache(path)
+    cache.put("Top run scorers?", SQL, row_count=10)
+    assert cache.get("top  run scorers") == SQL
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 0, 'hit_rate': 1.0}
+
+
+def test_queries_without_rows_are_not_stored(path):
+    cache = SQLQueryCache(path)
+    cache.put("top run scorers", SQL, row_count=0)
+    cache.put("top wicket takers", "", row_count=5)
+    assert cache.get("top run scorers") is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_entries_survive_a_restart(path):
+    SQLQueryCache(path).put("top run scorers", SQL, row_count=10)
+    assert SQLQueryCache(path).get("top run scorers") == SQL
+
+
+def test_entries_are_per_model(path):
+    SQLQueryCache(path, model='a').put("top run scorers", SQL, row_count=10)
+    assert SQLQueryCache(path, model='b').get("top run scorers") is None
+
+
+def test_put_replaces_sql_and_invalidate_removes_it(path):
+    cache = SQLQueryCache(path)
+    cache.put("top run scorers", SQL, row_count=10)
+    cache.put("top run scorers", SQL + " LIMIT 5", row_count=5)
+    assert cache.get("top run scorers") == SQL + " LIMIT 5"
+    cache.invalidate("Top run scorers!")
+    assert cache.get("top run scorers") is None
+
+
+def test_entries_are_ordered_by_use(path):
+    cache = SQLQueryCache(path)
+    cache.put("top run scorers", SQL, row_count=10)
+    cache.put("most sixes", "SELECT 2", row_count=10)
+    cache.get("most sixes")
+    assert [question for question, _ in cache.entries()] == ["most sixes", "top run scorers"]
@@ -0,0 +1,122 @@
+import random
+import sqlite3
+
+import pandas as pd
+import pytest
+import sqlglot
+
+from summary_views import BOWL_KIND_EXPRESSION, PHASE_EXPRESSION, PHASE_PREDICATES, SUMMARY_VIEWS
+from view_rewriter import DIALECT, VERIFY_QUERIES, _same_rows, normalize_sql, rewrite_query
+
+
+@pytest.mark.parametrize('sql', VERIFY_QUERIES)
+def test_known_query_shapes_are_rewritten(sql):
+    rewritten, view_name = rewrite_query(sql)
+    assert view_name is not None
+    assert f"FROM {view_name}" in rewritten
+    assert 'ipl_balls' not in rewritten
+
+
+@pytest.mark.parametrize('sql', [
+    # Grouped by a column no view has
+    'SELECT "venue", SUM("runs_batter") FROM ipl_balls GROUP BY "venue"',
+    # Filtered on a column no view has
+    'SELECT "batter", SUM("runs_batter") FROM ipl_balls WHERE "venue" = \'Eden Gardens\' GROUP BY "batter"',
+    # An aggregate no view stores
+    'SELECT "batter", MAX("runs_batter") FROM ipl_balls GROUP BY "batter"',
+    'SELECT "batter", COUNT(DISTINCT "match_id") FROM ipl_balls GROUP BY "batter"',
+    # Not a plain aggregate over ipl_balls
+    'SELECT "batter", "runs_batter" FROM ipl_balls LIMIT 10',
+    'SELECT b."batter", SUM(b."runs_batter") FROM ipl_balls b JOIN bowling_types t '
+    'ON t."bowling_style" = b."bowling_style" GROUP BY b."batter"',
+    'SELECT "batter", SUM("runs_batter") FROM ipl_balls WHERE "over" = 20 GROUP BY "batter"',
+    'DELETE FROM ipl_balls',
+    'not sql at all (',
+])
+def test_uncovered_queries_are_left_alone(sql):
+    assert rewrite_query(sql) == (sql, None)
+
+
+@pytest.mark.parametrize('over, phase', list(PHASE_PREDICATES.items()))
+def test_over_ranges_and_phases_select_the_same_rows(over, phase):
+    by_over, over_view = rewrite_query(f'SELECT "bowler", COUNT(*) FROM ipl_balls WHERE {over} GROUP BY "bowler"')
+    by_phase, phase_view = rewrite_query(f'SELECT "bowler", COUNT(*) FROM ipl_balls WHERE {phase} GROUP BY "bowler"')
+    assert over_view == phase_view == 'cube_bowling'
+    assert by_over == by_phase
+    assert normalize_sql(phase) in by_over
+
+
+def test_death_overs_use_the_death_overs_view_either_way():
+    by_over, over_view = rewrite_query('SELECT "batter", SUM("runs_batter") FROM ipl_balls '
+                                       'WHERE "over" >= 16 GROUP BY "batter"')
+    by_phase, phase_view = rewrite_query('SELECT "batter", SUM("runs_batter") FROM ipl_balls '
+                                         'WHERE "phase" = 3 GROUP BY "batter"')
+    assert over_view == phase_view == 'mv_death_overs_batters'
+    assert by_over == by_phase
+
+
+def test_counts_are_zero_when_no_view_row_matches():
+    rewritten, _ = rewrite_query('SELECT COUNT(*) AS balls, SUM("runs_batter") AS runs FROM ipl_balls '
+                                 'WHERE "batter" = :player')
+    assert 'COALESCE(CAST(SUM("balls_faced") AS BIGINT), 0) AS balls' in rewritten
+    # SUM over no rows is NULL in the original query too
+    assert 'CAST(SUM("total_runs") AS BIGINT) AS runs' in rewritten
+    assert ':player' in rewritten
+
+
+def sqlite_sql(sql):
+    return sqlglot.transpile(sql, read=DIALECT, write='sqlite')[0]
+
+
+@pytest.fixture(scope='module')
+def database():
+    """In-memory ipl_balls with generated "phase"/"bowl_kind" and every summary view built from it"""
+    if sqlite3.sqlite_version_info < (3, 31):
+        pytest.skip('SQLite without generated columns')
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f"""
+        CREATE TABLE ipl_balls (
+            "match_id" INTEGER, "year" INTEGER, "batter" TEXT, "bowler" TEXT, "bowling_style" TEXT,
+            "bat_hand" TEXT, "over" INTEGER, "runs_batter" INTEGER, "runs_total" INTEGER,
+            "isFour" BOOLEAN, "isSix" BOOLEAN, "isWicket" BOOLEAN,
+            "bowl_kind" TEXT GENERATED ALWAYS AS ({sqlite_sql(BOWL_KIND_EXPRESSION)}) STORED,
+            "phase" INTEGER GENERATED ALWAYS AS ({sqlite_sql(PHASE_EXPRESSION)}) STORED
+        )
+    """)
+    generator = random.Random(11)
+    rows = []
+    for ball in range(30000):
+        runs = generator.choice((0, 0, 0, 1, 1, 1, 2, 4, 6))
+        extras = generator.choice((0,) * 12 + (1,))
+        rows.append((ball // 240, generator.choice((2022, 2023, 2024)),
+                     generator.choice(('V Kohli', 'RG Sharma', 'MS Dhoni', 'AD Russell', 'SA Yadav', '')),
+                     generator.choice(('JJ Bumrah', 'Rashid Khan', 'YS Chahal', 'SP Narine', 'B Kumar')),
+                     generator.choice(('rfm', 'lf', 'rm', 'ob', 'sla', 'lbg', '', None)),
+                     generator.choice(('RHB', 'LHB')), ball % 120 // 6 + 1, runs, runs + extras,
+                     runs == 4, runs == 6, generator.random() < 0.04))
+    conn.executemany('INSERT INTO ipl_balls ("match_id", "year", "batter", "bowler", "bowling_style", "bat_hand", '
+                     '"over", "runs_batter", "runs_total", "isFour", "isSix", "isWicket") '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    # Rollup tables first; the views computed from them are built through the rewriter as in Postgres
+    for view in sorted(SUMMARY_VIEWS, key=lambda view: view.rollup_of is not None):
+        conn.execute(f"CREATE TABLE {view.name} AS {sqlite_sql(view.definition_sql())}")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('sql', VERIFY_QUERIES + [
+    'SELECT COUNT(*) AS balls, SUM("runs_batter") AS runs FROM ipl_balls WHERE "batter" = \'Nobody\'',
+    'SELECT "bowler", COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) AS wickets FROM ipl_balls '
+    'WHERE "over" <= 6 AND "year" = 2023 GROUP BY "bowler"',
+    'SELECT "bowler", SUM("runs_total") AS runs, COUNT(*) AS balls FROM ipl_balls '
+    'WHERE "phase" >= 2 AND "bowl_kind" = \'spin\' GROUP BY "bowler"',
+    'SELECT "batter", SUM("isSix"::int) AS sixes FROM ipl_balls WHERE "over" >= 16 AND "bat_hand" = \'LHB\' '
+    'GROUP BY "batter"',
+])
+def test_rewritten_queries_return_the_original_rows(database, sql):
+    rewritten, view_name = rewrite_query(sql)
+    assert view_name is not None
+    original = pd.read_sql_query(sqlite_sql(sql), database)
+    from_view = pd.read_sql_query(sqlite_sql(rewritten), database)
+    assert len(original) > 0
+    assert _same_rows(original, from_view), f"{view_name}:\n{original}\n{from_view}"
@@ -0,0 +1,280 @@
+"""Rewrite generated SQL over ipl_balls onto registered summary views.
+
+A query is answered from a view when it reads only ipl_balls, groups by a
+subset of the view's dimensions, filters only on those dimensions (plus the
+view's own filters) and uses only aggregates the view stores. Aggregates are
+re-aggregated with SUM and cast back to BIGINT, and counts fall back to 0 when
+no view row matches, so results are identical to the original query's.
+
+    python view_rewriter.py --verify     # run original and rewritten queries and compare
+"""
+import argparse
+import os
+
+import pandas as pd
+import sqlglot
+from dotenv import load_dotenv
+from sqlglot import exp
+
+from summary_views import PHASE_PREDICATES, SUMMARY_VIEWS, existing_summary_views
+
+DIALECT = 'postgres'
+SOURCE_TABLE = 'ipl_balls'
+
+
+def _normalize_node(node: exp.Expression) -> exp.Expression:
+    """Copy of an expression with table qualifiers dropped and column names quoted"""
+    node = node.copy()
+    for column in list(node.find_all(exp.Column)):
+        column.set('table', None)
+        column.set('db', None)
+        column.set('catalog', None)
+        if isinstance(column.this, exp.Identifier):
+            column.this.set('quoted', True)
+    return node
+
+
+def normalize_sql(sql_or_node) -> str:
+    """Canonical text of an expression, used to match query fragments against view definitions"""
+    node = sqlglot.parse_one(sql_or_node, read=DIALECT) if isinstance(sql_or_node, str) else sql_or_node
+    return _normalize_node(node).sql(dialect=DIALECT)
+
+
+# "over" ranges and "phase" filters that select the same balls, in both directions
+EQUIVALENT_PREDICATES = {}
+for _over, _phase in PHASE_PREDICATES.items():
+    EQUIVALENT_PREDICATES[normalize_sql(_over)] = normalize_sql(_phase)
+    EQUIVALENT_PREDICATES[normalize_sql(_phase)] = normalize_sql(_over)
+
+
+class _CompiledView:
+    """Normalized lookup tables for one SummaryView"""
+
+    def __init__(self, view):
+        self.view = view
+        self.dimensions = {normalize_sql(expr): name for name, expr in view.dimensions.items()}
+        # Dimensions that are plain ipl_balls columns can be filtered on directly
+        self.plain_dimensions = {}
+        for name, expr in view.dimensions.items():
+            node = sqlglot.parse_one(expr, read=DIALECT)
+            if isinstance(node, exp.Column):
+                self.plain_dimensions[node.name] = name
+        self.measures = {normalize_sql(expr): name for name, expr in view.measures.items()}
+        self.measures.update({normalize_sql(expr): name for expr, name in view.measure_aliases.items()})
+        self.filters = {normalize_sql(expr) for expr in view.filters}
+        # Keys are matched against WHERE conjuncts, which arrive with outer parentheses removed
+        self.predicate_map = {
+            normalize_sql(_conjuncts(sqlglot.parse_one(base, read=DIALECT))[0]): replacement
+            for base, replacement in view.predicate_map.items()
+        }
+
+    def rename_dimension(self, node):
+        """Point a dimension column or expression at the view's column"""
+        if isinstance(node, (exp.Column, exp.Case)):
+            name = self.dimensions.get(normalize_sql(node))
+            if name is not None and not (isinstance(node, exp.Column) and node.name == name):
+                return exp.column(name, quoted=True)
+        return node
+
+
+def _conjuncts(where: exp.Expression):
+    if isinstance(where, exp.And):
+        return _conjuncts(where.left) + _conjuncts(where.right)
+    if isinstance(where, exp.Paren):
+        return _conjuncts(where.this)
+    return [where]
+
+
+def _reaggregate(column_name: str, count: bool = False) -> exp.Expression:
+    total = exp.Cast(
+        this=exp.Sum(this=exp.column(column_name, quoted=True)),
+        to=exp.DataType.build('BIGINT'),
+    )
+    # COUNT over no rows is 0, but SUM over no rows is NULL
+    return exp.Coalesce(this=total, expressions=[exp.Literal.number(0)]) if count else total
+
+
+def _group_keys(select: exp.Select):
+    """GROUP BY expressions with positional (GROUP BY 1) and alias references resolved"""
+    group = select.args.get('group')
+    if not group:
+        return []
+    aliases = {item.alias: item.unalias() for item in select.expressions if item.alias}
+    keys = []
+    for key in group.expressions:
+        if isinstance(key, exp.Literal) and key.is_int:
+            keys.append(select.expressions[int(key.this) - 1].unalias())
+        elif isinstance(key, exp.Column) and not key.table and key.name in aliases:
+            keys.append(aliases[key.name])
+        else:
+            keys.append(key)
+    return keys
+
+
+def _rewrite_for_view(select: exp.Select, compiled: _CompiledView):
+    """Return the rewritten SELECT, or None when the view does not cover the query"""
+    # Group-by keys must all be view dimensions
+    for key in _group_keys(select):
+        if normalize_sql(key) not in compiled.dimensions:
+            return None
+
+    # Every view filter must be present; other conjuncts may only use plain dimensions
+    where = select.args.get('where')
+    remaining = []
+    matched_filters = set()
+    for conjunct in (_conjuncts(where.this) if where else []):
+        key = normalize_sql(conjunct)
+        if key in compiled.filters:
+            matched_filters.add(key)
+        elif EQUIVALENT_PREDICATES.get(key) in compiled.filters:
+            matched_filters.add(EQUIVALENT_PREDICATES[key])
+        elif key in compiled.predicate_map:
+            remaining.append(sqlglot.parse_one(compiled.predicate_map[key], read=DIALECT))
+        elif all(column.name in compiled.plain_dimensions for column in conjunct.find_all(exp.Column)):
+            remaining.append(_normalize_node(conjunct))
+        else:
+            return None
+    if matched_filters != compiled.filters:
+        return None
+
+    def replace_aggregate(node):
+        if isinstance(node, exp.AggFunc):
+            measure = compiled.measures.get(normalize_sql(node))
+            if measure is None:
+                raise LookupError(node.sql(dialect=DIALECT))
+            return _reaggregate(measure, count=isinstance(node, exp.Count))
+        return compiled.rename_dimension(node)
+
+    rewritten = _normalize_node(select)
+    rewritten.set('where', None)
+    try:
+        rewritten = rewritten.transform(replace_aggregate)
+    except LookupError:
+        return None
+
+    rewritten = rewritten.from_(compiled.view.name, copy=False)
+    if remaining:
+        rewritten = rewritten.where(
+            *[conjunct.transform(compiled.rename_dimension) for conjunct in remaining], copy=False
+        )
+    return rewritten
+
+
+def _bind_style(node: exp.Expression) -> exp.Expression:
+    """Keep :name placeholders as written; the postgres dialect would render them as %(name)s"""
+    return node.transform(
+        lambda child: exp.var(f":{child.name}") if isinstance(child, exp.Placeholder) and child.name else child
+    )
+
+
+def rewrite_query(sql: str, views=None):
+    """Return (sql, view_name): the query rewritten onto the first covering view, or unchanged with None"""
+    try:
+        statements = sqlglot.parse(sql, read=DIALECT)
+    except sqlglot.errors.ParseError:
+        return sql, None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Select):
+        return sql, None
+
+    select = statements[0]
+    if (select.args.get('joins') or select.args.get('with') or select.args.get('distinct')
+            or select.find(exp.Window) or select.find(exp.Subquery) or select.find(exp.Filter)):
+        return sql, None
+
+    source = select.find(exp.From)
+    if source is None or not isinstance(source.this, exp.Table) or source.this.name != SOURCE_TABLE:
+        return sql, None
+    if not select.find(exp.AggFunc):
+        return sql, None
+
+    for view in views if views is not None else SUMMARY_VIEWS:
+        rewritten = _rewrite_for_view(select, _CompiledView(view))
+        if rewritten is not None:
+            return _bind_style(rewritten).sql(dialect=DIALECT), view.name
+    return sql, None
+
+
+# Query shapes the chatbots generate or fall back to, used to check rewrites end to end
+VERIFY_QUERIES = [
+    """SELECT "batter", COUNT(*) as balls_faced, SUM("runs_batter") as total_runs,
+              SUM("isFour"::int) as fours, SUM("isSix"::int) as sixes,
+              ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) as strike_rate,
+              COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as times_out,
+              ROUND(SUM("runs_batter")::numeric / NULLIF(COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END), 0), 2) as batting_average
+       FROM ipl_balls WHERE "batter" != '' AND "batter" IS NOT NULL
+       GROUP BY "batter" HAVING SUM("runs_batter") > 500 ORDER BY total_runs DESC LIMIT 12""",
+    """SELECT "bowler", COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) as wickets, COUNT(*) as balls_bowled,
+              SUM("runs_total") as runs_conceded,
+              ROUND((SUM("runs_total")::numeric / NULLIF(COUNT(*), 0)) * 6, 2) as economy_rate
+       FROM ipl_balls WHERE "bowler" != '' AND "bowler" IS NOT NULL
+       GROUP BY "bowler" HAVING COUNT(CASE WHEN "isWicket" = TRUE THEN 1 END) >= 15 ORDER BY wickets DESC LIMIT 12""",
+    """SELECT "batter", SUM("runs_batter") as death_runs, COUNT(*) as death_balls,
+              ROUND((SUM("runs_batter")::numeric / NULLIF(COUNT(*), 0)) * 100, 2) as death_sr
+       FROM ipl_balls WHERE "over" >= 16 AND "batter" != ''
+       GROUP BY "batter" HAVING COUNT(*) >= 30 ORDER BY death_sr DESC LIMIT 10""",
+    """SELECT "batter", SUM("runs_batter") as total_runs FROM ipl_balls
+       WHERE "batter" != '' GROUP BY "batter" ORDER BY total_runs DESC LIMIT 10""",
+    """SELECT SUM("runs_batter") AS runs, COUNT(*) AS balls FROM ipl_balls""",
+    """SELECT "batter", COUNT(*) as death_balls_vs_pace, SUM("runs_batter") as death_runs
+       FROM ipl_balls WHERE "over" >= 16
+           AND ("bowling_style" LIKE '%rm%' OR "bowling_style" LIKE '%rf%' OR "bowling_style" IN ('rm','rfm','rmf','lf','lfm','lmf'))
+           AND "batter" != '' AND "batter" IS NOT NULL
+       GROUP BY "batter" HAVING COUNT(*) >= 25 ORDER BY death_runs DESC LIMIT 12""",
+    """SELECT "batter", SUM("runs_batter") as runs FROM ipl_balls
+       WHERE "phase" = 3 AND "bowl_kind" = 'pace' AND "batter" != ''
+       GROUP BY "batter" HAVING SUM("runs_batter") > 50 ORDER BY runs DESC LIMIT 10""",
+    """SELECT "batter", SUM("runs_batter") as death_runs, COUNT(*) as death_balls FROM ipl_balls
+       WHERE "phase" = 3 AND "batter" != '' GROUP BY "batter" ORDER BY death_runs DESC LIMIT 10""",
+    """SELECT "batter", SUM("runs_batter") as total_runs, COUNT(*) as balls_faced FROM ipl_balls
+       WHERE "year" = 2024 AND "batter" != '' GROUP BY "batter" ORDER BY total_runs DESC LIMIT 12""",
+    """SELECT "bowler", SUM("runs_total") as runs_conceded, COUNT(*) as balls_bowled FROM ipl_balls
+       WHERE "over" >= 7 AND "over" <= 15 AND "bat_hand" = 'LHB' GROUP BY "bowler" ORDER BY runs_conceded LIMIT 12""",
+]
+
+
+def _same_rows(left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    columns = list(left.columns)
+    left = left.sort_values(columns).reset_index(drop=True)
+    right = right.sort_values(columns).reset_index(drop=True)
+    return left.astype(str).equals(right.astype(str))
+
+
+def verify_rewrites(engine, queries=None) -> bool:
+    """Run each query as written and as rewritten, and check both return identical rows"""
+    with engine.connect() as conn:
+        views = existing_summary_views(conn)
+        all_ok = True
+        for sql in queries or VERIFY_QUERIES:
+            rewritten, view_name = rewrite_query(sql, views)
+            if view_name is None:
+                print(f"⚪ not rewritten: {' '.join(sql.split())[:80]}...")
+                continue
+            original = pd.DataFrame(conn.exec_driver_sql(sql).mappings().all())
+            from_view = pd.DataFrame(conn.exec_driver_sql(rewritten).mappings().all())
+            ok = _same_rows(original, from_view)
+            all_ok = all_ok and ok
+            print(f"{'✅' if ok else '❌'} {view_name}: {' '.join(sql.split())[:80]}...")
+    return all_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite SQL onto summary views")
+    parser.add_argument('sql', nargs='?', help='query to rewrite and print')
+    parser.add_argument('--verify', action='store_true', help='compare original and rewritten results in the database')
+    args = parser.parse_args()
+
+    if args.sql:
+        rewritten, view_name = rewrite_query(args.sql)
+        print(f"-- answered from {view_name}" if view_name else "-- no covering view")
+        print(rewritten)
+    if args.verify:
+        from db import get_engine
+        load_dotenv()
+        if not verify_rewrites(get_engine(os.getenv('DATABASE_URL'))):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()